@@ -1,21 +1,28 @@
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-
-# Import WebSocket routing modules
-import votes.routing
-import polls.routing
 
 # Set correct Django settings module
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "vote_x_backend.settings")
 
+# Set up Django (app registry, settings) before anything imports models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+
+# Import WebSocket routing modules
+import votes.routing  # noqa: E402
+import polls.routing  # noqa: E402
+from core.channels_auth import JWTAuthMiddleware  # noqa: E402
+
 # ASGI application
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(
-            votes.routing.websocket_urlpatterns + polls.routing.websocket_urlpatterns
+        JWTAuthMiddleware(
+            URLRouter(
+                votes.routing.websocket_urlpatterns + polls.routing.websocket_urlpatterns
+            )
         )
     ),
 })
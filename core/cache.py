@@ -0,0 +1,132 @@
+"""
+Stampede-protected caching on top of the Django cache.
+
+`get_or_compute` keeps one entry per key and guarantees that when it goes
+stale only one caller (across all workers) recomputes it:
+
+- single-flight: recomputation is guarded by a `cache.add` lock, which is
+  an atomic SET NX on Redis;
+- stale-while-revalidate: callers that lose the lock race get the previous
+  value for up to `stale_ttl` seconds instead of hitting the database;
+- probabilistic early expiration ("XFetch"): a fresh entry is refreshed
+  slightly before its TTL, more eagerly the longer it took to compute, so
+  hot keys rarely expire at all;
+- versioning: an entry computed for another `version` counts as stale, which
+  lets callers invalidate by bumping a counter.
+
+Per-process hit/miss/stale counters are available from `get_stats()`.
+"""
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.core.cache import cache
+
+HIT = "hit"
+MISS = "miss"
+STALE = "stale"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(name, event):
+    with _stats_lock:
+        _stats[f"{name}.{event}"] += 1
+
+
+def get_stats():
+    """Snapshot of {"<name>.<event>": count} for this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _is_fresh(entry, version, beta, now):
+    if entry["version"] != version or now >= entry["expires_at"]:
+        return False
+    # XFetch: -delta * beta * log(rand) is an exponentially distributed
+    # head start; expensive entries get refreshed earlier
+    return now - entry["delta"] * beta * math.log(random.random() or 1e-12) < entry["expires_at"]
+
+
+def _compute_and_store(key, compute, version, ttl, stale_ttl):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+
+    cache.set(
+        key,
+        {
+            "value": value,
+            "version": version,
+            "delta": delta,
+            "expires_at": time.time() + ttl,
+        },
+        timeout=ttl + stale_ttl,
+    )
+    return value
+
+
+def get_or_compute(
+    key,
+    compute,
+    ttl,
+    stale_ttl=30,
+    version=None,
+    beta=1.0,
+    lock_timeout=10,
+    wait_timeout=2.0,
+    name="cache",
+):
+    """
+    Return (value, status) for `key`, calling `compute()` at most once
+    across workers when the entry is missing or stale. `status` is one of
+    HIT, MISS (computed by this call) or STALE (previous value served while
+    another worker recomputes).
+    """
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None and _is_fresh(entry, version, beta, now):
+        _record(name, HIT)
+        return entry["value"], HIT
+
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+
+    if cache.add(lock_key, token, timeout=lock_timeout):
+        try:
+            value = _compute_and_store(key, compute, version, ttl, stale_ttl)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        _record(name, MISS)
+        return value, MISS
+
+    # Someone else is recomputing
+    if entry is not None:
+        _record(name, STALE)
+        return entry["value"], STALE
+
+    # Cold miss: wait briefly for the winner rather than piling on
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry["version"] == version:
+            _record(name, HIT)
+            return entry["value"], HIT
+
+    # Winner is too slow (or died); compute without the lock
+    _record(name, "wait_timeout")
+    value = _compute_and_store(key, compute, version, ttl, stale_ttl)
+    _record(name, MISS)
+    return value, MISS
@@ -0,0 +1,68 @@
+"""
+django-redis backend that degrades instead of failing.
+
+Every call goes through the "cache" circuit breaker. While Redis is slow
+or down, reads behave as misses and writes are dropped, so callers fall
+back to computing from the database instead of piling up connections.
+"""
+from django_redis.cache import RedisCache
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+from core.circuit_breaker import get_breaker
+
+CACHE_ERRORS = (RedisError, ConnectionInterrupted, OSError)
+
+
+class ResilientRedisCache(RedisCache):
+
+    @property
+    def breaker(self):
+        return get_breaker("cache")
+
+    def _guarded(self, method, fallback, *args, **kwargs):
+        return self.breaker.call(
+            getattr(super(), method), *args, fallback=fallback, exceptions=CACHE_ERRORS, **kwargs
+        )
+
+    def get(self, key, default=None, version=None, client=None):
+        return self._guarded("get", default, key, default=default, version=version, client=client)
+
+    def get_many(self, *args, **kwargs):
+        return self._guarded("get_many", {}, *args, **kwargs)
+
+    def has_key(self, *args, **kwargs):
+        return self._guarded("has_key", False, *args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        return self._guarded("set", False, *args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        return self._guarded("set_many", [], *args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        # Report success so single-flight callers go ahead and compute
+        # from the database rather than waiting on a lock nobody holds
+        return self._guarded("add", True, *args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        return self._guarded("touch", False, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._guarded("delete", False, *args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        return self._guarded("delete_many", 0, *args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        result = self._guarded("incr", None, *args, **kwargs)
+        if result is None:
+            # Same contract as a missing key
+            raise ValueError("Cache unavailable")
+        return result
+
+    def decr(self, *args, **kwargs):
+        result = self._guarded("decr", None, *args, **kwargs)
+        if result is None:
+            raise ValueError("Cache unavailable")
+        return result
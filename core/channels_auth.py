@@ -0,0 +1,36 @@
+"""
+JWT authentication for WebSocket connections.
+
+Browsers can't set an Authorization header on a WebSocket handshake, so
+the access token is passed as a query parameter: ?token=<access token>.
+Without a token the user resolved by the session middleware is kept.
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+
+@database_sync_to_async
+def get_user_for_token(raw_token):
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get("query_string", b"").decode())
+        token = query.get("token", [None])[0]
+
+        if token:
+            scope = dict(scope)
+            scope["user"] = await get_user_for_token(token)
+
+        return await super().__call__(scope, receive, send)
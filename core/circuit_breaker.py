@@ -0,0 +1,139 @@
+"""
+Per-process circuit breakers for Redis / cache access.
+
+CLOSED    → calls go through; `failure_threshold` consecutive failures open it.
+OPEN      → calls are short-circuited to their fallback for `reset_timeout`s.
+HALF_OPEN → one probe call is let through; success closes the breaker,
+            failure opens it again.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.calls = 0
+        self.total_failures = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+        self.last_error = None
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.short_circuited += 1
+                    return False
+                self.state = HALF_OPEN
+
+            # HALF_OPEN: a single probe at a time
+            if self._probe_in_flight:
+                self.short_circuited += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Circuit breaker %s closed", self.name)
+            self.state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, exc=None):
+        with self._lock:
+            self._failures += 1
+            self.total_failures += 1
+            self.last_error = repr(exc) if exc else None
+            self._probe_in_flight = False
+
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                    logger.warning("Circuit breaker %s opened: %r", self.name, exc)
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, func, *args, fallback=None, exceptions=(Exception,), **kwargs):
+        """
+        Run func through the breaker; return `fallback` if the breaker is
+        open or func raises one of `exceptions`. Other exceptions propagate
+        without counting as a failure.
+        """
+        if not self.allow_request():
+            return fallback
+
+        self.calls += 1
+        try:
+            result = func(*args, **kwargs)
+        except exceptions as exc:
+            self.record_failure(exc)
+            return fallback
+        except Exception:
+            self.record_success()
+            raise
+
+        self.record_success()
+        return result
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "calls": self.calls,
+                "failures": self.total_failures,
+                "short_circuited": self.short_circuited,
+                "times_opened": self.times_opened,
+                "last_error": self.last_error,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.CACHE_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.CACHE_BREAKER_RESET_TIMEOUT,
+            )
+        return _breakers[name]
+
+
+def all_metrics():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.metrics() for b in breakers}
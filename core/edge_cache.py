@@ -0,0 +1,157 @@
+"""
+Shared caching of public responses by a reverse proxy / CDN.
+
+Responses that are the same for every visitor (guest poll list pages,
+guest share links, results of public polls) are marked cacheable by
+shared caches for SHARED_CACHE_MAX_AGE seconds, served stale for up to
+SHARED_CACHE_STALE_WHILE_REVALIDATE more while the proxy revalidates
+(with the ETag, see core.etags), and tagged with Surrogate-Key headers:
+
+    poll-<id>           responses showing that poll (list pages included)
+    polls               every poll list page
+    polls-page-<n>      one page of the numbered list
+    polls-category-<c>  list pages filtered on a category
+
+Committed changes purge the keys they affect through SURROGATE_PURGER
+(a dotted path to a BasePurger subclass; unset disables purging). Purges
+are batched per process for SURROGATE_PURGE_INTERVAL seconds; keys still
+pending when a process exits are covered by the max age.
+"""
+import functools
+import logging
+import threading
+import urllib.parse
+import urllib.request
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+LIST_KEY = "polls"
+
+
+def poll_key(poll_id):
+    return f"poll-{poll_id}"
+
+
+def list_keys(poll_ids, page=None, category=None):
+    keys = [LIST_KEY]
+    if page is not None:
+        keys.append(f"polls-page-{urllib.parse.quote(str(page))}")
+    if category:
+        keys.append(f"polls-category-{urllib.parse.quote(category)}")
+    return keys + [poll_key(pk) for pk in poll_ids]
+
+
+# ---------------------------------------------
+# RESPONSES
+# ---------------------------------------------
+def share(response, keys=()):
+    """
+    Let shared caches store `response`, tagged with `keys`. A 304 may
+    leave them out: the proxy keeps those of the response it revalidated.
+    """
+    response["Cache-Control"] = (
+        f"public, max-age=0, s-maxage={settings.SHARED_CACHE_MAX_AGE}, "
+        f"stale-while-revalidate={settings.SHARED_CACHE_STALE_WHILE_REVALIDATE}"
+    )
+    if keys:
+        response["Surrogate-Key"] = " ".join(dict.fromkeys(keys))
+    return response
+
+
+# ---------------------------------------------
+# PURGERS
+# ---------------------------------------------
+class BasePurger:
+    def purge(self, keys):
+        """Evict every cached response tagged with any of `keys`."""
+        raise NotImplementedError
+
+
+class HTTPPurger(BasePurger):
+    """
+    POSTs to SURROGATE_PURGE_URL with the keys in a Surrogate-Key header
+    (Fastly's bulk purge API, or a proxy-side purge endpoint), at most
+    `max_keys` per request. SURROGATE_PURGE_TOKEN is sent in `token_header`.
+    """
+    max_keys = 256
+    token_header = "Fastly-Key"
+
+    def purge(self, keys):
+        for start in range(0, len(keys), self.max_keys):
+            request = urllib.request.Request(
+                settings.SURROGATE_PURGE_URL,
+                method="POST",
+                headers={"Surrogate-Key": " ".join(keys[start:start + self.max_keys])},
+            )
+            if settings.SURROGATE_PURGE_TOKEN:
+                request.add_header(self.token_header, settings.SURROGATE_PURGE_TOKEN)
+            with urllib.request.urlopen(request, timeout=settings.SURROGATE_PURGE_TIMEOUT):
+                pass
+
+
+@functools.lru_cache(maxsize=None)
+def _load_purger(path):
+    return import_string(path)()
+
+
+def get_purger():
+    if not settings.SURROGATE_PURGER:
+        return None
+    return _load_purger(settings.SURROGATE_PURGER)
+
+
+# ---------------------------------------------
+# PURGING
+# ---------------------------------------------
+_pending = set()
+_pending_lock = threading.Lock()
+_timer = None
+
+
+def purge(keys):
+    """Purge `keys` from shared caches, batched per SURROGATE_PURGE_INTERVAL."""
+    global _timer
+
+    if not keys or get_purger() is None:
+        return
+
+    interval = settings.SURROGATE_PURGE_INTERVAL
+    if interval <= 0:
+        _send(set(keys))
+        return
+
+    with _pending_lock:
+        _pending.update(keys)
+        if _timer is not None:
+            return
+        _timer = threading.Timer(interval, flush)
+        _timer.daemon = True
+        _timer.start()
+
+
+def flush():
+    """Send the pending purges now."""
+    global _timer
+
+    with _pending_lock:
+        keys = set(_pending)
+        _pending.clear()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if keys:
+        _send(keys)
+
+
+def _send(keys):
+    purger = get_purger()
+    if purger is None:
+        return
+    try:
+        purger.purge(sorted(keys))
+    except Exception:
+        # Responses still expire after SHARED_CACHE_MAX_AGE; never fail the caller
+        logger.warning("Surrogate-key purge of %d keys failed", len(keys), exc_info=True)
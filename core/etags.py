@@ -0,0 +1,61 @@
+"""
+Conditional GETs from version counters.
+
+Views build a strong ETag from counters they can read without rendering
+anything (see votes.results: per-poll and poll list versions) instead of
+hashing the response body, and answer a matching If-None-Match with 304
+before any serializer runs.
+
+Responses still revalidate on every use (`no-cache`). Endpoints whose
+payload depends on the caller vary on Authorization, and their responses
+to authenticated users are `private`.
+
+A counter that can't be read (cache unreachable) yields no tag at all:
+those responses carry no validator and are `no-store`, since a constant
+tag would keep validating copies across changes.
+"""
+import hashlib
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """Strong, quoted ETag from the values a response was built from."""
+    return quote_etag(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest())
+
+
+def is_not_modified(request, etag):
+    """Whether the request's If-None-Match matches `etag` (never for None)."""
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if etag is None or not header:
+        return False
+    # If-None-Match uses the weak comparison
+    tags = [tag.removeprefix("W/") for tag in parse_etags(header)]
+    return "*" in tags or etag in tags
+
+
+def set_validators(response, request, etag, per_user=False):
+    """ETag and caching headers of a conditional GET response."""
+    if etag is not None:
+        response["ETag"] = etag
+    if per_user:
+        patch_vary_headers(response, ["Authorization"])
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, per_user=False):
+    return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), request, etag, per_user)
+
+
+def no_store(response):
+    """A response built without a validator: no one may keep it."""
+    if response.has_header("ETag"):
+        del response["ETag"]
+    patch_cache_control(response, private=True, no_store=True)
+    return response
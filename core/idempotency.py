@@ -0,0 +1,166 @@
+"""
+Idempotency-Key support for create endpoints.
+
+A POST carrying an `Idempotency-Key` header runs once. Its response is
+kept in the shared cache for IDEMPOTENCY_KEY_TTL and replayed, marked
+`Idempotent-Replayed: true`, to retries with the same key. That covers
+2xx and 4xx responses; a 5xx is not stored, so the next retry runs
+again. Replays are answered before authentication, throttling or any
+database access.
+
+Keys are scoped to the caller's credentials (the Authorization header,
+or the client IP for guests) and the path. A retry arriving while the
+first request is still running waits for its response, up to
+IDEMPOTENCY_WAIT seconds, then gets a 409. Reusing a key with a
+different body is a 422.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from core.utils import get_client_ip
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# Response headers replayed along with the body
+STORED_HEADERS = ("Location",)
+
+POLL_INTERVAL = 0.05
+
+
+class IdempotencyKeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = "idempotency_key_in_progress"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used with a different request."
+    default_code = "idempotency_key_reused"
+
+
+class IdempotentRequest:
+
+    def __init__(self, request, key):
+        credentials = request.headers.get("Authorization") or f"ip:{get_client_ip(request)}"
+        scope = hashlib.sha256(f"{credentials}|{request.path}|{key}".encode()).hexdigest()
+
+        self.response_key = f"votex:idempotency:{scope}"
+        self.lock_key = f"{self.response_key}:lock"
+        self.fingerprint = hashlib.sha256(request.body).hexdigest()
+
+    @classmethod
+    def from_request(cls, request):
+        """None unless this is a POST with an Idempotency-Key."""
+        key = request.headers.get(HEADER)
+        if request.method != "POST" or not key:
+            return None
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({HEADER: [f"Must be at most {MAX_KEY_LENGTH} characters."]})
+        return cls(request, key)
+
+    def stored_response(self):
+        """
+        The stored response for this key, waiting while another request
+        holds it. None once nobody holds the key and nothing was stored.
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        while True:
+            stored = cache.get(self.response_key)
+            if stored is not None:
+                if stored["fingerprint"] != self.fingerprint:
+                    raise IdempotencyKeyReused()
+                return stored
+
+            if cache.get(self.lock_key) is None:
+                return None
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInProgress()
+            time.sleep(POLL_INTERVAL)
+
+    def acquire(self):
+        return cache.add(self.lock_key, 1, timeout=settings.IDEMPOTENCY_LOCK_TTL)
+
+    def release(self):
+        cache.delete(self.lock_key)
+
+    def store(self, response):
+        cache.set(
+            self.response_key,
+            {
+                "fingerprint": self.fingerprint,
+                "status": response.status_code,
+                "data": response.data,
+                "headers": {h: response[h] for h in STORED_HEADERS if response.has_header(h)},
+            },
+            timeout=settings.IDEMPOTENCY_KEY_TTL,
+        )
+
+
+def replay(stored):
+    response = Response(stored["data"], status=stored["status"], headers=stored["headers"])
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+class IdempotentCreateMixin:
+    """
+    Honours Idempotency-Key on a generic view's create(). Replays skip
+    authentication, permission and throttle checks: the key is already
+    scoped to the credentials that made the original request.
+    """
+
+    idempotency = None
+    _replay = None
+
+    def initial(self, request, *args, **kwargs):
+        self.idempotency = IdempotentRequest.from_request(request)
+        if self.idempotency is not None:
+            self._replay = self.idempotency.stored_response()
+        super().initial(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        if self._replay is None:
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        if self._replay is None:
+            super().check_permissions(request)
+
+    def check_throttles(self, request):
+        if self._replay is None:
+            super().check_throttles(request)
+
+    def create(self, request, *args, **kwargs):
+        if self.idempotency is None:
+            return super().create(request, *args, **kwargs)
+        if self._replay is not None:
+            return replay(self._replay)
+
+        # Another retry got the key first: wait for its outcome
+        while not self.idempotency.acquire():
+            stored = self.idempotency.stored_response()
+            if stored is not None:
+                return replay(stored)
+
+        try:
+            try:
+                response = super().create(request, *args, **kwargs)
+            except Exception as exc:
+                # A validation error is the outcome too; anything
+                # unhandled is re-raised here and not stored
+                response = self.handle_exception(exc)
+
+            if response.status_code < 500:
+                self.idempotency.store(response)
+            return response
+        finally:
+            self.idempotency.release()
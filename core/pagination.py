@@ -0,0 +1,262 @@
+"""
+Pagination for large tables.
+
+Keyset pagination: pages are delimited by the ordering values of their
+first/last row instead of an OFFSET, and there is no COUNT: page 1000
+costs the same as page 1 as long as an index matches `ordering`. The
+ordering must end with a unique field so every row has a distinct position.
+
+Estimated counts: page-number pagination (DRF and the admin) whose total
+comes from planner statistics or a cached count once a result set is
+large, and is flagged as approximate.
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Response shape matches DRF's CursorPagination:
+        {"next": <url>, "previous": <url>, "results": [...]}
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.fields = [
+            (name.lstrip("-"), name.startswith("-")) for name in self.ordering
+        ]
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        if reverse:
+            queryset = queryset.order_by(*self._flip(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+
+        # One extra row tells whether there is a page beyond this one
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            # Ran off an end: only the way back is left
+            self.next_position = position if reverse else None
+            self.previous_position = position if not reverse else None
+        elif reverse:
+            self.next_position = self._position(rows[-1])
+            self.previous_position = self._position(rows[0]) if has_more else None
+        else:
+            self.next_position = self._position(rows[-1]) if has_more else None
+            self.previous_position = self._position(rows[0]) if position is not None else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self._link(self.next_position, reverse=False),
+            "previous": self._link(self.previous_position, reverse=True),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    # ---------------------------------------------
+    # CURSORS
+    # ---------------------------------------------
+    def decode_cursor(self, request, model):
+        """(position, reverse) of the requested page; (None, False) for the first."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = payload["v"]
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+            return position, bool(payload.get("r"))
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload = {"v": [self._jsonable(value) for value in position]}
+        if reverse:
+            payload["r"] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+    def _link(self, position, reverse):
+        if position is None:
+            return None
+        return replace_query_param(
+            remove_query_param(self.base_url, self.cursor_query_param),
+            self.cursor_query_param,
+            self.encode_cursor(position, reverse),
+        )
+
+    @staticmethod
+    def _jsonable(value):
+        return value.isoformat() if hasattr(value, "isoformat") else value
+
+    def _position(self, row):
+        return [getattr(row, name) for name, _ in self.fields]
+
+    @staticmethod
+    def _flip(ordering):
+        return [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+
+    def _after(self, position, reverse):
+        """
+        Rows strictly after `position` in the walk direction:
+        (a < x) OR (a = x AND b < y) ..., plus a plain bound on the
+        leading field so the index scan starts at the cursor.
+        """
+        def op(descending):
+            return "lt" if descending != reverse else "gt"
+
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, position):
+            condition |= equal & Q(**{f"{name}__{op(descending)}": value})
+            equal &= Q(**{name: value})
+
+        leading, descending = self.fields[0]
+        bound = Q(**{f"{leading}__{op(descending)}e": position[0]})
+        return bound & condition
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django paginator whose `count` stays cheap on large tables:
+
+    * result sets smaller than ESTIMATED_COUNT_THRESHOLD are counted
+      exactly, with a COUNT bounded by the threshold;
+    * a whole table (no filter) on Postgres is estimated from pg_class.reltuples;
+    * any other large result set is counted once and the total is cached
+      for ESTIMATED_COUNT_CACHE_TTL seconds.
+
+    `approximate` tells whether `count` is an estimate.
+    """
+    approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        threshold = settings.ESTIMATED_COUNT_THRESHOLD
+
+        if not queryset.query.where:
+            estimate = self._table_estimate(queryset)
+            if estimate is not None and estimate >= threshold:
+                self.approximate = True
+                return estimate
+
+        # Small sets: exact, and the COUNT stops at the threshold
+        bounded = queryset.order_by()[:threshold + 1].count()
+        if bounded <= threshold:
+            return bounded
+
+        self.approximate = True
+        sql, params = queryset.order_by().query.sql_with_params()
+        key = "votex:count:" + hashlib.md5(f"{sql}|{params}".encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.order_by().count()
+            cache.set(key, count, timeout=settings.ESTIMATED_COUNT_CACHE_TTL)
+        return count
+
+    @staticmethod
+    def _table_estimate(queryset):
+        """Planner row estimate of the queryset's table; None if unknown."""
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1: never vacuumed / analyzed
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Page numbers with an EstimatedCountPaginator; adds `count_is_approximate`."""
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["count_is_approximate"] = self.page.paginator.approximate
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_approximate"] = {"type": "boolean"}
+        return response_schema
+
+
+class PageNumberOrKeysetPagination(EstimatedCountPagination):
+    """
+    Page numbers by default (with a count, for existing clients); keyset
+    pages when the request carries a `cursor`, or `?pagination=cursor`
+    for the first page.
+    """
+    keyset_class = KeysetPagination
+    mode_query_param = "pagination"
+
+    @classmethod
+    def wants_keyset(cls, request):
+        return bool(
+            request.query_params.get(cls.keyset_class.cursor_query_param)
+            or request.query_params.get(cls.mode_query_param) == "cursor"
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.wants_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,85 @@
+"""
+Streaming parsers for bulk uploads.
+
+`request.data` is a generator: items are decoded from the request body
+as they are consumed, so an upload is never held in memory as a whole.
+"""
+import json
+
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+# Longest accepted JSONL line / msgpack item, in bytes
+MAX_ITEM_SIZE = 64 * 1024
+
+READ_SIZE = 64 * 1024
+
+
+class JSONLinesParser(BaseParser):
+    """
+    One JSON document per line. A malformed line is yielded as a
+    ParseError instance so the caller can report it and carry on.
+    """
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return iter(())
+        return self._items(stream)
+
+    def _items(self, stream):
+        line_no = 0
+        while True:
+            line = stream.readline(MAX_ITEM_SIZE + 1)
+            if not line:
+                return
+            line_no += 1
+
+            if len(line) > MAX_ITEM_SIZE and not line.endswith(b"\n"):
+                # Skip the rest of the oversized line
+                while line and not line.endswith(b"\n"):
+                    line = stream.readline(READ_SIZE)
+                yield ParseError(f"Line {line_no}: longer than {MAX_ITEM_SIZE} bytes.")
+                continue
+
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield ParseError(f"Line {line_no}: invalid JSON.")
+
+
+class JSONLinesAliasParser(JSONLinesParser):
+    media_type = "application/jsonl"
+
+
+class MessagePackParser(BaseParser):
+    """
+    A stream of concatenated msgpack objects. A corrupt stream can't be
+    resynchronised: the error is yielded as a ParseError and parsing stops.
+    """
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return iter(())
+        return self._items(stream)
+
+    def _items(self, stream):
+        unpacker = msgpack.Unpacker(
+            stream,
+            read_size=READ_SIZE,
+            max_buffer_size=MAX_ITEM_SIZE + READ_SIZE,
+            raw=False,
+        )
+        try:
+            yield from unpacker
+        except (msgpack.UnpackException, ValueError) as exc:
+            yield ParseError(f"Invalid msgpack stream: {exc}")
+
+
+class MessagePackAliasParser(MessagePackParser):
+    media_type = "application/x-msgpack"
@@ -0,0 +1,33 @@
+import redis
+from django.conf import settings
+
+from core.circuit_breaker import get_breaker
+
+_client = None
+
+
+def get_redis():
+    """
+    Shared Redis client for the project.
+    Returns None when REDIS_URL is not configured.
+    """
+    global _client
+
+    if _client is None and settings.REDIS_URL:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        )
+    return _client
+
+
+def guarded(func, *args, fallback=None, **kwargs):
+    """
+    Run a Redis operation through the "redis" circuit breaker,
+    returning `fallback` while Redis is failing.
+    """
+    return get_breaker("redis").call(
+        func, *args, fallback=fallback, exceptions=(redis.RedisError, OSError), **kwargs
+    )
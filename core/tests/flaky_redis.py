@@ -0,0 +1,56 @@
+"""
+fakeredis connection that can inject latency and failures, for testing
+how the project degrades when Redis browns out.
+"""
+import time
+
+import fakeredis
+import redis
+
+
+class FlakyConnection(fakeredis.FakeRedisConnection):
+    latency = 0.0
+    fail = False
+
+    @classmethod
+    def reset(cls):
+        cls.latency = 0.0
+        cls.fail = False
+
+    def send_command(self, *args, **kwargs):
+        if self.latency:
+            # Behave like a real socket timeout when Redis is slower than allowed
+            if self.socket_timeout and self.latency > self.socket_timeout:
+                time.sleep(self.socket_timeout)
+                raise redis.TimeoutError("Timeout reading from socket")
+            time.sleep(self.latency)
+        if self.fail:
+            raise redis.ConnectionError("Injected Redis failure")
+        return super().send_command(*args, **kwargs)
+
+
+def flaky_client(server=None, **kwargs):
+    """A redis-py client backed by fakeredis through FlakyConnection."""
+    pool = redis.ConnectionPool(
+        connection_class=FlakyConnection,
+        server=server or fakeredis.FakeServer(),
+        **kwargs,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def flaky_cache_settings(server=None, socket_timeout=0.05):
+    """CACHES setting for ResilientRedisCache on top of FlakyConnection."""
+    return {
+        "default": {
+            "BACKEND": "core.cache_backends.ResilientRedisCache",
+            "LOCATION": "redis://flaky:6379/0",
+            "OPTIONS": {
+                "SOCKET_TIMEOUT": socket_timeout,
+                "CONNECTION_POOL_KWARGS": {
+                    "connection_class": FlakyConnection,
+                    "server": server or fakeredis.FakeServer(),
+                },
+            },
+        }
+    }
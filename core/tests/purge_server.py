@@ -0,0 +1,46 @@
+"""
+Local HTTP stand-in for a CDN purge API, recording the Surrogate-Key
+purges it receives, for testing core.edge_cache.HTTPPurger end to end.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class PurgeServer:
+    def __init__(self):
+        self.purges = []  # one {"keys": [...], "headers": {...}} per request
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                server.purges.append({
+                    "keys": self.headers.get("Surrogate-Key", "").split(),
+                    "headers": dict(self.headers),
+                })
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{"status": "ok"}')
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/purge"
+
+    @property
+    def keys(self):
+        """Every key purged so far."""
+        return {key for purge in self.purges for key in purge["keys"]}
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
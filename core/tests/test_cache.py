@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.cache import HIT, MISS, STALE, get_or_compute, get_stats, reset_stats
+
+
+class TestGetOrCompute(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_hit_after_miss(self):
+        self.assertEqual(get_or_compute("k", self.compute, ttl=60), (1, MISS))
+        self.assertEqual(get_or_compute("k", self.compute, ttl=60), (1, HIT))
+        self.assertEqual(get_stats(), {"cache.miss": 1, "cache.hit": 1})
+
+    def test_version_change_recomputes(self):
+        get_or_compute("k", self.compute, ttl=60, version=1)
+        self.assertEqual(get_or_compute("k", self.compute, ttl=60, version=2), (2, MISS))
+
+    def test_stale_value_served_while_another_worker_recomputes(self):
+        get_or_compute("k", self.compute, ttl=60, version=1)
+        cache.add("k:lock", "other-worker")
+
+        value, status = get_or_compute("k", self.compute, ttl=60, version=2)
+        self.assertEqual((value, status), (1, STALE))
+        self.assertEqual(self.calls, 1)
+
+    def test_cold_miss_waits_then_computes_if_winner_never_finishes(self):
+        cache.add("k:lock", "other-worker")
+        with mock.patch("core.cache.time.sleep"):
+            value, status = get_or_compute("k", self.compute, ttl=60, wait_timeout=0.01)
+        self.assertEqual((value, status), (1, MISS))
+        self.assertEqual(get_stats()["cache.wait_timeout"], 1)
+
+    def test_expensive_entries_refresh_early(self):
+        get_or_compute("k", self.compute, ttl=60)
+        entry = cache.get("k")
+        entry["delta"] = 1e9  # "took forever to compute"
+        cache.set("k", entry)
+
+        self.assertEqual(get_or_compute("k", self.compute, ttl=60), (2, MISS))
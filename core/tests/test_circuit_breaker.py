@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker
+from core.tests.flaky_redis import FlakyConnection, flaky_cache_settings, flaky_client
+from polls.models import Poll, Option
+from users.models import User
+
+
+class TestCircuitBreaker(APITestCase):
+
+    def fail(self):
+        raise ConnectionError("down")
+
+    def test_opens_after_threshold_and_short_circuits(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+        self.assertEqual(breaker.call(self.fail, fallback="fb"), "fb")
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.call(self.fail)
+        self.assertEqual(breaker.state, OPEN)
+
+        called = mock.Mock()
+        self.assertEqual(breaker.call(called, fallback="fb"), "fb")
+        called.assert_not_called()
+        self.assertEqual(breaker.metrics()["short_circuited"], 1)
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+        breaker.call(self.fail)
+        self.assertEqual(breaker.state, OPEN)
+
+        # Only one probe at a time while half-open
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, CLOSED)
+
+
+@override_settings(CACHES=flaky_cache_settings())
+class TestCacheOutage(APITestCase):
+
+    def setUp(self):
+        FlakyConnection.reset()
+        self.addCleanup(FlakyConnection.reset)
+        cache.clear()
+
+        self.breaker = get_breaker("cache")
+        self.breaker.reset()
+        self.breaker.failure_threshold = 3
+        self.breaker.reset_timeout = 60
+
+        self.admin = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="admin123",
+            role="admin",
+        )
+        self.poll = Poll.objects.create(owner=self.admin, title="Languages")
+        Option.objects.create(poll=self.poll, text="Python")
+        self.url = f"/api/votes/results/{self.poll.id}/"
+
+    def test_results_fall_back_to_database_when_redis_is_down(self):
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+
+        FlakyConnection.fail = True
+        for _ in range(3):
+            res = self.client.get(self.url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data["title"], "Languages")
+
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.client.force_authenticate(self.admin)
+        health = self.client.get("/api/health/cache/")
+        self.assertEqual(health.data["breakers"]["cache"]["state"], OPEN)
+
+    def test_slow_redis_trips_the_breaker(self):
+        FlakyConnection.latency = 1.0  # > SOCKET_TIMEOUT
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreaterEqual(self.breaker.metrics()["failures"], 1)
+
+    def test_recovers_through_half_open_probe(self):
+        FlakyConnection.fail = True
+        self.client.get(self.url)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        FlakyConnection.fail = False
+        self.breaker.reset_timeout = 0
+        self.client.get(self.url)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+@override_settings(VOTE_COUNTER_BACKEND="redis")
+class TestRedisCounterOutage(APITestCase):
+
+    def setUp(self):
+        FlakyConnection.reset()
+        self.addCleanup(FlakyConnection.reset)
+        cache.clear()
+        get_breaker("redis").reset()
+
+        patcher = mock.patch("core.redis._client", flaky_client(decode_responses=True))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+        self.poll = Poll.objects.create(owner=self.voter, title="Languages")
+        self.option = Option.objects.create(poll=self.poll, text="Python")
+
+    def test_votes_count_in_postgres_while_redis_is_down(self):
+        FlakyConnection.fail = True
+        self.client.force_authenticate(self.voter)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/votes/", {"option": self.option.id})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+        self.option.refresh_from_db()
+        self.assertEqual(self.option.vote_count, 1)
+        self.assertEqual(self.client.get(f"/api/votes/results/{self.poll.id}/").data["total_votes"], 1)
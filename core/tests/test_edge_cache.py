@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from core import edge_cache
+from core.tests.purge_server import PurgeServer
+
+
+@override_settings(SHARED_CACHE_MAX_AGE=60, SHARED_CACHE_STALE_WHILE_REVALIDATE=300)
+class TestSharedCacheHeaders(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.poll = Poll.objects.create(owner=self.owner, title="Lunch", category="food")
+        Option.objects.create(poll=self.poll, text="Pizza")
+        self.hidden = Poll.objects.create(owner=self.owner, title="Board", visibility="restricted")
+
+    def get(self, url, user=None, **params):
+        client = self.client_class()
+        if user is not None:
+            client.force_authenticate(user)
+        res = client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def assertShared(self, res, *keys):
+        self.assertEqual(res["Cache-Control"], "public, max-age=0, s-maxage=60, stale-while-revalidate=300")
+        self.assertTrue(set(keys) <= set(res["Surrogate-Key"].split()), res["Surrogate-Key"])
+
+    def assertNotShared(self, res):
+        self.assertNotIn("public", res["Cache-Control"])
+        self.assertFalse(res.has_header("Surrogate-Key"))
+
+    def test_guest_list_pages(self):
+        poll_key = edge_cache.poll_key(self.poll.pk)
+
+        res = self.get("/api/polls/")
+        self.assertShared(res, "polls", "polls-page-1", poll_key)
+        self.assertNotIn(edge_cache.poll_key(self.hidden.pk), res["Surrogate-Key"])
+
+        res = self.get("/api/polls/", category="food")
+        self.assertShared(res, "polls", "polls-category-food", poll_key)
+
+        res = self.get("/api/polls/", pagination="cursor")
+        self.assertShared(res, "polls", poll_key)
+        self.assertNotIn("polls-page", res["Surrogate-Key"])
+
+        # Revalidation keeps the shared headers, and the keys already stored
+        res = self.client_class().get("/api/polls/", {"pagination": "cursor"}, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn("s-maxage=60", res["Cache-Control"])
+
+        self.assertNotShared(self.get("/api/polls/", self.owner))
+
+    def test_share_links(self):
+        url = f"/api/polls/share/{self.poll.shareable_id}/"
+        self.assertShared(self.get(url), edge_cache.poll_key(self.poll.pk))
+        self.assertNotShared(self.get(url, self.owner))
+
+    def test_results_of_public_polls(self):
+        res = self.get(f"/api/votes/results/{self.poll.pk}/")
+        self.assertShared(res, edge_cache.poll_key(self.poll.pk))
+        self.assertShared(self.get(f"/api/votes/results/{self.poll.pk}/", self.owner))
+
+        self.assertNotShared(self.get(f"/api/votes/results/{self.hidden.pk}/"))
+
+
+class TestSurrogatePurge(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.server = PurgeServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        settings = override_settings(
+            SURROGATE_PURGER="core.edge_cache.HTTPPurger",
+            SURROGATE_PURGE_URL=self.server.url,
+            SURROGATE_PURGE_TOKEN="secret",
+            SURROGATE_PURGE_INTERVAL=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll = Poll.objects.create(owner=self.owner, title="Lunch", allow_guest_votes=True)
+            self.option = Option.objects.create(poll=self.poll, text="Pizza")
+        self.server.purges.clear()
+
+    def test_votes_purge_the_poll(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/votes/", {"option": self.option.pk})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+        self.assertEqual(self.server.keys, {edge_cache.poll_key(self.poll.pk)})
+        self.assertEqual(self.server.purges[0]["headers"]["Fastly-Key"], "secret")
+
+    def test_option_changes_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Option.objects.create(poll=self.poll, text="Sushi")
+        self.assertEqual(self.server.keys, {edge_cache.poll_key(self.poll.pk)})
+
+        self.server.purges.clear()
+        poll_id = self.poll.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.delete()
+        self.assertEqual(self.server.keys, {edge_cache.poll_key(poll_id), edge_cache.LIST_KEY})
+
+    def test_purges_are_batched(self):
+        with override_settings(SURROGATE_PURGE_INTERVAL=60):
+            edge_cache.purge(["poll-1"])
+            edge_cache.purge(["poll-2", "polls"])
+            self.assertEqual(self.server.purges, [])
+            edge_cache.flush()
+
+        self.assertEqual(len(self.server.purges), 1)
+        self.assertEqual(self.server.purges[0]["keys"], ["poll-1", "poll-2", "polls"])
+
+    def test_purge_failures_are_logged(self):
+        with override_settings(SURROGATE_PURGE_URL="http://127.0.0.1:9/purge"), \
+                self.assertLogs("core.edge_cache", "WARNING"):
+            edge_cache.purge(["poll-1"])
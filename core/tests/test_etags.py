@@ -0,0 +1,208 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from core.circuit_breaker import get_breaker
+from core.tests.flaky_redis import FlakyConnection, flaky_cache_settings
+
+
+class TestConditionalGet(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+        self.poll = Poll.objects.create(owner=self.owner, title="Lunch", allow_guest_votes=True)
+        self.option = Option.objects.create(poll=self.poll, text="Pizza")
+
+        self.detail_url = f"/api/polls/{self.poll.pk}/"
+        self.results_url = f"/api/votes/results/{self.poll.pk}/"
+
+    def get(self, url, user=None, etag=None):
+        client = self.client_class()
+        if user is not None:
+            client.force_authenticate(user)
+        if etag is None:
+            return client.get(url)
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def revalidate(self, url, user=None):
+        """ETag of a fresh 200, after checking it is answered with a 304."""
+        first = self.get(url, user)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        etag = first["ETag"]
+
+        res = self.get(url, user, etag=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(res.content, b"")
+        return etag
+
+    def vote(self):
+        client = self.client_class()
+        client.force_authenticate(self.voter)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = client.post("/api/votes/", {"option": self.option.pk})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+    def test_unchanged_responses_are_not_modified(self):
+        for url in (self.results_url, "/api/polls/"):
+            with self.subTest(url=url):
+                self.revalidate(url)
+        for url in (self.detail_url, self.results_url, "/api/polls/"):
+            with self.subTest(url=url):
+                self.revalidate(url, self.voter)
+
+        # Weak forms and lists of tags match too
+        etag = self.get(self.results_url)["ETag"]
+        res = self.get(self.results_url, etag=f'"other", W/{etag}')
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_not_modified_runs_no_query(self):
+        detail = self.revalidate(self.detail_url, self.voter)
+        listing = self.revalidate("/api/polls/", self.voter)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.detail_url, self.voter, detail).status_code, 304)
+            self.assertEqual(self.get("/api/polls/", self.voter, listing).status_code, 304)
+
+    def test_votes_change_every_tag(self):
+        urls = (self.detail_url, self.results_url, "/api/polls/")
+        etags = {url: self.revalidate(url, self.owner) for url in urls}
+
+        self.vote()
+
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                res = self.get(url, self.owner, etag=etag)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertNotEqual(res["ETag"], etag)
+
+    def test_poll_and_option_changes_change_the_tags(self):
+        detail = self.revalidate(self.detail_url, self.voter)
+        results = self.revalidate(self.results_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Option.objects.create(poll=self.poll, text="Sushi")
+
+        res = self.get(self.detail_url, self.voter, etag=detail)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["options"]), 2)
+        detail = res["ETag"]
+
+        res = self.get(self.results_url, etag=results)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["options"]), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.title = "Dinner"
+            self.poll.save()
+
+        res = self.get(self.detail_url, self.voter, etag=detail)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["title"], "Dinner")
+
+    def test_personalized_responses_vary_on_the_user(self):
+        owner = self.get(self.detail_url, self.owner)
+        voter = self.get(self.detail_url, self.voter)
+        self.assertTrue(owner.data["is_owner"])
+        self.assertNotEqual(owner["ETag"], voter["ETag"])
+
+        # The owner's tag doesn't validate another viewer's copy
+        res = self.get(self.detail_url, self.voter, etag=owner["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertIn("Authorization", owner["Vary"])
+        self.assertIn("private", owner["Cache-Control"])
+
+        listing = self.get("/api/polls/", self.voter)
+        self.assertIn("Authorization", listing["Vary"])
+        self.assertIn("no-cache", listing["Cache-Control"])
+        self.assertIn("private", listing["Cache-Control"])
+
+        # Results are the same for everyone
+        results = self.get(self.results_url, self.owner)
+        self.assertNotIn("Authorization", results["Vary"])
+        self.assertNotIn("private", results["Cache-Control"])
+
+    def test_allow_list_changes_change_the_owners_tag(self):
+        self.poll.visibility = "restricted"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.save()
+            self.poll.allowed_users.add(self.owner)
+        etag = self.revalidate(self.detail_url, self.owner)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.allowed_users.add(self.voter)
+
+        res = self.get(self.detail_url, self.owner, etag=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["allowed_users"]), 2)
+
+    def test_access_is_checked_before_the_tag(self):
+        self.poll.visibility = "private"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.save()
+        etag = self.revalidate(self.detail_url, self.owner)
+
+        res = self.get(self.detail_url, self.voter, etag=etag)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(CACHES=flaky_cache_settings())
+class TestConditionalGetCacheDown(APITestCase):
+    """Without readable versions there is nothing to validate against."""
+
+    def setUp(self):
+        FlakyConnection.reset()
+        self.addCleanup(FlakyConnection.reset)
+        poll_cache.l1.clear()
+        breaker = get_breaker("cache")
+        breaker.reset()
+        self.addCleanup(breaker.reset)
+
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+        self.poll = Poll.objects.create(owner=self.voter, title="Lunch")
+        self.option = Option.objects.create(poll=self.poll, text="Pizza")
+        FlakyConnection.fail = True
+
+    def assertUncacheable(self, res):
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.has_header("ETag"))
+        self.assertIn("no-store", res["Cache-Control"])
+        self.assertNotIn("public", res["Cache-Control"])
+
+    def test_responses_carry_no_validator(self):
+        results_url = f"/api/votes/results/{self.poll.pk}/"
+        self.assertUncacheable(self.client.get(results_url))
+        self.assertUncacheable(self.client.get("/api/polls/"))
+
+        self.client.force_authenticate(self.voter)
+        self.assertUncacheable(self.client.get(f"/api/polls/{self.poll.pk}/"))
+        self.assertUncacheable(self.client.get("/api/polls/"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/votes/", {"option": self.option.pk})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+        res = self.client.get(results_url, HTTP_IF_NONE_MATCH="*")
+        self.assertUncacheable(res)
+        self.assertEqual(res.data["total_votes"], 1)
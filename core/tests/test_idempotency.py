@@ -0,0 +1,101 @@
+import threading
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from votes.models import Vote
+from core.idempotency import REPLAYED_HEADER, IdempotentRequest
+
+
+class TestIdempotencyKey(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.poll = Poll.objects.create(owner=self.owner, title="Retry", allow_guest_votes=True)
+        self.option = Option.objects.create(poll=self.poll, text="Yes")
+
+    def vote(self, key, option=None):
+        return self.client.post(
+            "/api/votes/",
+            {"option": (option or self.option).pk},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retried_vote_replays_without_the_database(self):
+        first = self.vote("vote-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED, first.data)
+        self.assertFalse(first.has_header(REPLAYED_HEADER))
+
+        with self.assertNumQueries(0):
+            retry = self.vote("vote-1")
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry[REPLAYED_HEADER], "true")
+        self.assertEqual(Vote.objects.count(), 1)
+
+        # A new key is a new request
+        again = self.vote("vote-2")
+        self.assertEqual(again.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retried_poll_create_creates_one_poll(self):
+        self.client.force_authenticate(self.owner)
+        payload = {"title": "Lunch?", "options": ["Pizza", "Sushi"]}
+
+        first = self.client.post("/api/polls/", payload, format="json", HTTP_IDEMPOTENCY_KEY="poll-1")
+        retry = self.client.post("/api/polls/", payload, format="json", HTTP_IDEMPOTENCY_KEY="poll-1")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED, first.data)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry[REPLAYED_HEADER], "true")
+        self.assertEqual(Poll.objects.filter(title="Lunch?").count(), 1)
+
+    def test_key_reused_with_another_body(self):
+        self.vote("vote-1")
+        other = Option.objects.create(poll=self.poll, text="No")
+
+        res = self.vote("vote-1", other)
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_concurrent_retry_waits_for_the_first_response(self):
+        first = self.vote("vote-1")
+        stored = cache.get(self._response_key("vote-1"))
+
+        # Pretend the first request is still running, then finishes
+        cache.delete(self._response_key("vote-1"))
+        cache.add(self._response_key("vote-1") + ":lock", 1)
+        finish = threading.Timer(0.2, cache.set, args=(self._response_key("vote-1"), stored))
+        finish.start()
+        self.addCleanup(finish.cancel)
+
+        retry = self.vote("vote-1")
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Vote.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT=0.1)
+    def test_concurrent_retry_gives_up_after_the_wait(self):
+        cache.add(self._response_key("vote-1") + ":lock", 1)
+
+        res = self.vote("vote-1")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Vote.objects.exists())
+
+    def _response_key(self, key):
+        # Same scoping as a guest request from the test client
+        request = APIRequestFactory().post(
+            "/api/votes/", {"option": self.option.pk}, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+        return IdempotentRequest(request, key).response_key
@@ -0,0 +1,120 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from votes.models import Vote
+from core.pagination import EstimatedCountPaginator
+
+
+@override_settings(ESTIMATED_COUNT_THRESHOLD=5)
+class TestEstimatedCountPaginator(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        for i in range(8):
+            Poll.objects.create(owner=self.owner, title=f"Poll {i}", category="food" if i < 3 else "")
+
+    def test_small_sets_are_counted_exactly(self):
+        paginator = EstimatedCountPaginator(Poll.objects.filter(category="food").order_by("pk"), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.approximate)
+
+    def test_large_sets_reuse_a_cached_count(self):
+        queryset = Poll.objects.filter(is_active=True).order_by("pk")
+        paginator = EstimatedCountPaginator(queryset, 2)
+        self.assertEqual(paginator.count, 8)
+        self.assertTrue(paginator.approximate)
+
+        Poll.objects.create(owner=self.owner, title="Late")
+
+        # Bounded COUNT, then the cached total
+        paginator = EstimatedCountPaginator(queryset, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 8)
+
+    def test_whole_tables_use_planner_statistics(self):
+        with mock.patch.object(EstimatedCountPaginator, "_table_estimate", return_value=1_000_000):
+            paginator = EstimatedCountPaginator(Poll.objects.order_by("pk"), 2)
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.count, 1_000_000)
+        self.assertTrue(paginator.approximate)
+
+        # Statistics below the threshold: exact
+        with mock.patch.object(EstimatedCountPaginator, "_table_estimate", return_value=3), \
+                override_settings(ESTIMATED_COUNT_THRESHOLD=10):
+            paginator = EstimatedCountPaginator(Poll.objects.order_by("pk"), 2)
+            self.assertEqual(paginator.count, 8)
+        self.assertFalse(paginator.approximate)
+
+
+class TestEstimatedCountEndpoints(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.poll = Poll.objects.create(owner=self.owner, title="Poll", allow_guest_votes=True)
+        option = Option.objects.create(poll=self.poll, text="Yes")
+        for i in range(3):
+            Vote.objects.create(option=option, guest_ip=f"10.0.0.{i}")
+
+    def test_poll_list_flags_the_count(self):
+        self.client.force_authenticate(self.owner)
+
+        res = self.client.get("/api/polls/")
+        self.assertEqual(res.data["count"], 1)
+        self.assertFalse(res.data["count_is_approximate"])
+
+        with override_settings(ESTIMATED_COUNT_THRESHOLD=0):
+            res = self.client.get("/api/polls/", {"page": 1})
+        self.assertTrue(res.data["count_is_approximate"])
+
+    def test_vote_admin_changelist(self):
+        admin = User.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            password="admin123",
+        )
+        self.client.force_login(admin)
+
+        res = self.client.get("/admin/votes/vote/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.context["cl"].paginator, EstimatedCountPaginator)
+        self.assertEqual(res.context["cl"].result_count, 3)
+
+        # Read-only: edits would bypass the counters and voted sets
+        vote = Vote.objects.first()
+        self.assertEqual(self.client.get("/admin/votes/vote/add/").status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            self.client.get(f"/admin/votes/vote/{vote.pk}/delete/").status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.client.post(
+            "/admin/votes/vote/",
+            {"action": "delete_selected", "_selected_action": [vote.pk], "post": "yes"},
+        )
+        self.assertEqual(Vote.objects.count(), 3)
+
+        # The counters only follow votes
+        res = self.client.get(f"/admin/polls/poll/{vote.poll_id}/change/")
+        self.assertNotIn("total_votes", res.context["adminform"].form.fields)
+        for formset in res.context["inline_admin_formsets"]:
+            self.assertNotIn("vote_count", formset.formset.form.base_fields)
+        res = self.client.get(f"/admin/polls/option/{vote.option_id}/change/")
+        self.assertNotIn("vote_count", res.context["adminform"].form.fields)
@@ -0,0 +1,147 @@
+"""
+Two-tier cache: a bounded per-process LRU in front of the shared Django
+cache (Redis in production).
+
+L1 entries live for a few seconds only. Invalidations delete the L2 entry
+and are broadcast over Redis pub/sub so every worker drops its L1 copy;
+the short L1 TTL bounds staleness if a broadcast is missed.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from core.redis import get_redis, guarded
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "votex:cache-invalidate"
+
+
+class LRUCache:
+    """Thread-safe bounded LRU with per-entry expiry."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+    _registry = {}
+    _listener = None
+    _listener_lock = threading.Lock()
+
+    def __init__(self, namespace, l1_size=1024, l1_ttl=2, l2_ttl=300):
+        self.namespace = namespace
+        self.l1 = LRUCache(l1_size, l1_ttl)
+        self.l2_ttl = l2_ttl
+        TieredCache._registry[namespace] = self
+
+    def _key(self, key):
+        return f"votex:{self.namespace}:{key}"
+
+    def get(self, key):
+        self._ensure_listener()
+
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+
+        value = cache.get(self._key(key))
+        if value is not None:
+            self.l1.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.l1.set(key, value)
+        cache.set(self._key(key), value, timeout=self.l2_ttl)
+
+    def invalidate(self, *keys):
+        """Drop keys from L2 and from the L1 of every worker."""
+        cache.delete_many([self._key(k) for k in keys])
+        for key in keys:
+            self.l1.delete(key)
+
+        r = get_redis()
+        if r is None:
+            return
+        for key in keys:
+            # Other workers' L1 copies expire on their own if this fails
+            guarded(r.publish, INVALIDATION_CHANNEL, f"{self.namespace}|{key}")
+
+    # ---------------------------------------------
+    # BROADCAST LISTENER (one thread per process)
+    # ---------------------------------------------
+    @classmethod
+    def handle_message(cls, message):
+        namespace, _, key = str(message).partition("|")
+        tiered = cls._registry.get(namespace)
+        if tiered is not None:
+            tiered.l1.delete(key)
+
+    @classmethod
+    def _ensure_listener(cls):
+        if cls._listener is not None:
+            return
+        r = get_redis()
+        if r is None:
+            return
+
+        with cls._listener_lock:
+            if cls._listener is not None:
+                return
+            cls._listener = threading.Thread(
+                target=cls._listen, args=(r,), name="tiered-cache-invalidation", daemon=True
+            )
+            cls._listener.start()
+
+    @classmethod
+    def _listen(cls, r):
+        while True:
+            try:
+                pubsub = r.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                while True:
+                    # Poll rather than block: the shared client has a
+                    # short socket timeout
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        cls.handle_message(message["data"])
+            except Exception:
+                logger.warning("Cache invalidation listener disconnected", exc_info=True)
+
+            # Anything published while disconnected was missed
+            for tiered in cls._registry.values():
+                tiered.l1.clear()
+            time.sleep(1)
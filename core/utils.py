@@ -1,6 +1,51 @@
 # Shared helper functions will live here later.
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv4_address
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils.ipv6 import clean_ipv6_address
+
+
+def clean_ip(value):
+    """`value` as GenericIPAddressField stores it, or None if it isn't an IP address."""
+    try:
+        value = value.strip()
+        if ":" in value:
+            return clean_ipv6_address(value)
+        validate_ipv4_address(value)
+        return value
+    except (AttributeError, ValidationError):
+        return None
+
+
 def get_client_ip(request):
     x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
     if x_forwarded_for:
-        return x_forwarded_for.split(",")[0]
-    return request.META.get("REMOTE_ADDR")
+        # Client-supplied: ignored unless it is an address
+        ip = clean_ip(x_forwarded_for.split(",")[0])
+        if ip is not None:
+            return ip
+    return clean_ip(request.META.get("REMOTE_ADDR"))
+
+
+def bulk_increment(model, field, deltas):
+    """
+    Add deltas to an integer column in a single UPDATE.
+    `deltas` maps primary key → amount.
+    """
+    if not deltas:
+        return
+    model.objects.filter(pk__in=deltas).update(**{
+        field: F(field) + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    })
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
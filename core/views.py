@@ -0,0 +1,20 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.cache import get_stats
+from core.circuit_breaker import all_metrics
+from users.permissions import IsAdmin
+
+
+# ---------------------------------------------
+# CACHE HEALTH  (/api/health/cache/)
+# ---------------------------------------------
+class CacheHealthView(APIView):
+    """Circuit breaker state and cache hit/miss counters for this worker."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({
+            "breakers": all_metrics(),
+            "cache": get_stats(),
+        })
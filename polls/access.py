@@ -0,0 +1,280 @@
+"""
+Who may see / vote on a poll.
+
+Allow-list membership is one indexed EXISTS on the allowed_users through
+table (unique on poll, user): allow-lists are never loaded to check a
+single viewer.
+
+With REDIS_URL set, membership is also kept in two kinds of Redis sets:
+per poll, the ids of its allowed users; per user, the ids of the polls
+whose allow-list they are on. Each set is loaded from the database on
+first use and marked complete; allow-list changes then update the loaded
+sets incrementally once they commit (see polls.signals). An incomplete
+set is a miss and the database answers.
+
+The sets answer denials on their own; grants are always confirmed by the
+database (the same EXISTS, or restricting it to the cached ids for poll
+lists). A removal whose Redis update is lost (Redis down or the breaker
+open when it commits) thus can't leave access behind: revocation fails
+closed, and the stale entry is dropped when it is next seen.
+
+A lost addition would leave a denial behind instead, so the sets a
+failed update touched are remembered by the process that committed it:
+while any are, its lookups go to the database, and they are deleted
+once Redis answers again. ACCESS_CACHE_VERIFY confirms denials too.
+"""
+import logging
+import threading
+import uuid
+
+import redis
+from django.conf import settings
+from django.db.models import Exists
+
+from core.redis import get_redis, guarded
+from .models import Poll
+
+logger = logging.getLogger(__name__)
+
+LOADED = "_loaded"
+LOAD_CHUNK = 5000
+
+# Above this, list filtering uses EXISTS rather than an IN list
+MAX_LISTED_POLL_IDS = 1000
+
+_MISS = object()
+
+# Keys of sets whose update was lost, not yet deleted from Redis
+_unsynced = set()
+_unsynced_lock = threading.Lock()
+
+
+def _poll_key(poll_id):
+    return f"votex:poll:{poll_id}:members"
+
+
+def _user_key(user_id):
+    return f"votex:user:{user_id}:allowed-polls"
+
+
+def _lock_key(key):
+    return f"{key}:loading"
+
+
+# ---------------------------------------------
+# DATABASE
+# ---------------------------------------------
+def membership(poll_id, user_id):
+    """Through rows linking `user_id` to `poll_id` (an id or an OuterRef)."""
+    return Poll.allowed_users.through.objects.filter(poll_id=poll_id, user_id=user_id)
+
+
+def member_exists(poll_id, user_id):
+    """EXISTS expression, to annotate a queryset with the membership check."""
+    return Exists(membership(poll_id, user_id))
+
+
+# ---------------------------------------------
+# LOOKUPS
+# ---------------------------------------------
+def _cached_member(poll_id, user_id):
+    found, loaded = get_redis().smismember(_poll_key(poll_id), [user_id, LOADED])
+    if found:
+        return True
+    if loaded:
+        return False
+    return _MISS
+
+
+def is_member(poll_id, user_id):
+    """Whether `user_id` is on the allow-list of `poll_id`."""
+    if get_redis() is None or not _resync():
+        return membership(poll_id, user_id).exists()
+
+    cached = guarded(_cached_member, poll_id, user_id, fallback=_MISS)
+    if cached is _MISS:
+        guarded(_load_poll, poll_id)
+        return membership(poll_id, user_id).exists()
+
+    if cached or settings.ACCESS_CACHE_VERIFY:
+        actual = membership(poll_id, user_id).exists()
+        if actual != cached:
+            logger.warning(
+                "Access cache disagreed with the database for poll %s / user %s", poll_id, user_id
+            )
+            forget(poll_ids=[poll_id], user_ids=[user_id])
+        return actual
+    return cached
+
+
+def _cached_poll_ids(user_id):
+    members = get_redis().smembers(_user_key(user_id))
+    if LOADED not in members:
+        return _MISS
+    return {int(pk) for pk in members if pk != LOADED}
+
+
+def allowed_poll_ids(user_id):
+    """
+    Ids of the polls whose allow-list `user_id` is on, or None when the
+    caller should filter with member_exists() alone (no Redis, Redis
+    failing, ACCESS_CACHE_VERIFY, or too many ids for an IN list). The
+    ids may include revoked polls: they narrow member_exists(), they
+    don't replace it (see Poll.objects.visible_to).
+    """
+    if get_redis() is None or settings.ACCESS_CACHE_VERIFY or not _resync():
+        return None
+
+    poll_ids = guarded(_cached_poll_ids, user_id, fallback=None)
+    if poll_ids is _MISS:
+        poll_ids = guarded(_load_user, user_id)
+
+    if poll_ids is None or len(poll_ids) > MAX_LISTED_POLL_IDS:
+        return None
+    return poll_ids
+
+
+def can_view(poll, user):
+    """
+    Visibility rules of the poll detail view. `poll` is a Poll or a
+    cached poll entry (a dict with id / visibility / owner_id).
+    """
+    if isinstance(poll, dict):
+        poll_id, visibility, owner_id = poll["id"], poll["visibility"], poll["owner_id"]
+    else:
+        poll_id, visibility, owner_id = poll.pk, poll.visibility, poll.owner_id
+
+    if visibility == "public":
+        return True
+    if user is None or not user.is_authenticated:
+        return False
+    if visibility == "private":
+        return owner_id == user.id
+    if visibility == "restricted":
+        return is_member(poll_id, user.id)
+    return True
+
+
+# ---------------------------------------------
+# LOADING
+# ---------------------------------------------
+def _load(key, ids):
+    """
+    Fill `key` from an iterable of ids and mark it complete. A removal
+    committed meanwhile deletes the load lock (see `removed`): the set
+    may then hold a stale id, so it is dropped instead of marked complete.
+    """
+    r = get_redis()
+    lock = _lock_key(key)
+    token = uuid.uuid4().hex
+    # One load per set at a time; the others use the database meanwhile
+    if not r.set(lock, token, nx=True, ex=60):
+        return None
+
+    try:
+        loaded = set()
+        chunk = []
+        for pk in ids:
+            loaded.add(pk)
+            chunk.append(pk)
+            if len(chunk) >= LOAD_CHUNK:
+                r.sadd(key, *chunk)
+                chunk = []
+        if chunk:
+            r.sadd(key, *chunk)
+
+        with r.pipeline() as pipe:
+            pipe.watch(lock)
+            if pipe.get(lock) != token:
+                pipe.unwatch()
+                r.delete(key)
+                return None
+            pipe.multi()
+            pipe.sadd(key, LOADED)
+            pipe.expire(key, settings.ACCESS_CACHE_TTL)
+            pipe.delete(lock)
+            pipe.execute()
+        return loaded
+    except redis.WatchError:
+        r.delete(key)
+        return None
+
+
+def _load_poll(poll_id):
+    through = Poll.allowed_users.through.objects
+    return _load(
+        _poll_key(poll_id),
+        through.filter(poll_id=poll_id).values_list("user_id", flat=True).iterator(chunk_size=LOAD_CHUNK),
+    )
+
+
+def _load_user(user_id):
+    through = Poll.allowed_users.through.objects
+    return _load(
+        _user_key(user_id),
+        through.filter(user_id=user_id).values_list("poll_id", flat=True).iterator(chunk_size=LOAD_CHUNK),
+    )
+
+
+# ---------------------------------------------
+# WRITES  (from transaction.on_commit)
+# ---------------------------------------------
+def _apply(pairs, add):
+    r = get_redis()
+    pipe = r.pipeline(transaction=False)
+    for poll_id, user_id in pairs:
+        for key, member in ((_poll_key(poll_id), user_id), (_user_key(user_id), poll_id)):
+            if add:
+                # On a set that isn't loaded this only adds to a miss
+                pipe.sadd(key, member)
+                pipe.expire(key, settings.ACCESS_CACHE_TTL)
+            else:
+                pipe.srem(key, member)
+                # Invalidates a load that may have read the row before it went
+                pipe.delete(_lock_key(key))
+    pipe.execute()
+    return True
+
+
+def added(pairs):
+    """Committed allow-list additions, given as (poll_id, user_id)."""
+    if pairs and get_redis() is not None:
+        if not guarded(_apply, pairs, True, fallback=False):
+            forget(poll_ids={p for p, _ in pairs}, user_ids={u for _, u in pairs})
+
+
+def removed(pairs):
+    """Committed allow-list removals, given as (poll_id, user_id)."""
+    if pairs and get_redis() is not None:
+        if not guarded(_apply, pairs, False, fallback=False):
+            forget(poll_ids={p for p, _ in pairs}, user_ids={u for _, u in pairs})
+
+
+def forget(poll_ids=(), user_ids=()):
+    """Drop sets; the next lookup reloads them from the database."""
+    keys = [_poll_key(pk) for pk in poll_ids] + [_user_key(pk) for pk in user_ids]
+    if keys and get_redis() is not None:
+        with _unsynced_lock:
+            _unsynced.update(keys)
+        _resync()
+
+
+def _delete(keys):
+    get_redis().delete(*keys, *map(_lock_key, keys))
+    return True
+
+
+def _resync():
+    """
+    Delete the sets whose update was lost. False while that still fails:
+    they may be stale, and this process must not trust any set.
+    """
+    if not _unsynced:
+        return True
+    with _unsynced_lock:
+        keys = list(_unsynced)
+    if not guarded(_delete, keys, fallback=False):
+        return False
+    with _unsynced_lock:
+        _unsynced.difference_update(keys)
+    return True
@@ -1,5 +1,27 @@
 from django.contrib import admin
+
+from core.pagination import EstimatedCountPaginator
 from .models import Poll, Option
 
-admin.site.register(Poll)
-admin.site.register(Option)
+
+# The counters are only moved by votes (see votes.counters); an edit
+# here would drift from the votes and the pending Redis increments
+class OptionInline(admin.TabularInline):
+    model = Option
+    readonly_fields = ("vote_count",)
+    extra = 0
+
+
+class PollAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ("total_votes",)
+    inlines = (OptionInline,)
+
+
+class OptionAdmin(admin.ModelAdmin):
+    readonly_fields = ("vote_count",)
+
+
+admin.site.register(Poll, PollAdmin)
+admin.site.register(Option, OptionAdmin)
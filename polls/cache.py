@@ -0,0 +1,161 @@
+"""
+Cached poll detail / share-link payloads.
+
+The cached entry holds everything that is the same for every viewer: the
+serialized poll plus the owner / visibility needed for access checks
+(allow-list membership is checked per viewer, see polls.access), and the
+poll version it was built at. Vote counts (from the results cache),
+`ends_in`, `is_owner` and the owner-only `allowed_users` are filled in
+per request by `render_poll`; `poll_etag` validates that output without
+rendering it.
+"""
+import copy
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404
+
+from core.etags import make_etag
+from core.tiered_cache import TieredCache
+from votes.results import bump_version, forget_version, get_results, get_version
+from users.models import User
+from .models import Poll
+from .serializers import PollDetailSerializer, SimpleUserSerializer, format_ends_in
+
+poll_cache = TieredCache(
+    "poll-detail",
+    l1_size=settings.POLL_CACHE_L1_SIZE,
+    l1_ttl=settings.POLL_CACHE_L1_TTL,
+    l2_ttl=settings.POLL_CACHE_TTL,
+)
+
+
+def _pk_key(pk):
+    return f"pk:{pk}"
+
+
+def _share_key(shareable_id):
+    return f"share:{shareable_id}"
+
+
+def _build_entry(poll, version):
+    data = dict(PollDetailSerializer(poll).data)
+    return {
+        "id": poll.pk,
+        "owner_id": poll.owner_id,
+        "visibility": poll.visibility,
+        "expires_at": poll.expires_at,
+        "version": version,
+        "data": data,
+    }
+
+
+# ---------------------------------------------
+# LOOKUPS
+# ---------------------------------------------
+def get_poll_entry(pk):
+    entry = poll_cache.get(_pk_key(pk))
+    if entry is not None:
+        return entry
+
+    # Read before the poll: a change committing meanwhile makes the
+    # entry look older than it is, never newer (404s unknown polls)
+    version = get_version(pk)
+    poll = Poll.objects.with_display_relations().filter(pk=pk).first()
+    if poll is None:
+        raise Http404("Poll not found.")
+
+    entry = _build_entry(poll, version)
+    poll_cache.set(_pk_key(pk), entry)
+    return entry
+
+
+def get_poll_entry_by_share_id(shareable_id):
+    # shareable_id never changes, so the alias only goes away with the poll
+    pk = poll_cache.get(_share_key(shareable_id))
+    if pk is None:
+        try:
+            pk = (
+                Poll.objects.filter(shareable_id=shareable_id)
+                .values_list("pk", flat=True)
+                .first()
+            )
+        except (ValueError, ValidationError):
+            pk = None
+        if pk is None:
+            raise Http404("Invalid or expired link.")
+        poll_cache.set(_share_key(shareable_id), pk)
+
+    return get_poll_entry(pk)
+
+
+# ---------------------------------------------
+# PER-REQUEST RENDERING
+# ---------------------------------------------
+def render_poll(entry, request, results=None):
+    """
+    Cached payload + live counts and per-viewer fields. `results` is the
+    poll's results payload if the caller already has it.
+    """
+    data = copy.deepcopy(entry["data"])
+
+    if results is None:
+        results, _ = get_results(entry["id"])
+    counts = {o["id"]: o["vote_count"] for o in results["options"]}
+    for option in data["options"]:
+        option["votes"] = counts.get(option["id"], 0)
+    data["total_votes"] = results["total_votes"]
+
+    data["ends_in"] = format_ends_in(entry["expires_at"])
+
+    user = request.user
+    data["is_owner"] = user.is_authenticated and entry["owner_id"] == user.id
+    if data["is_owner"]:
+        data["allowed_users"] = SimpleUserSerializer(
+            User.objects.filter(allowed_polls=entry["id"]).only("id", "username", "email"),
+            many=True,
+        ).data
+    return data
+
+
+def poll_etag(entry, user, version):
+    """
+    Strong ETag of render_poll(entry) for `user`, with results at
+    `version`: it changes with the poll, its votes and `ends_in`, and
+    differs between the owner and everyone else. None when either
+    version is unknown (see core.etags).
+    """
+    if version is None or entry.get("version") is None:
+        return None
+    is_owner = user.is_authenticated and entry["owner_id"] == user.id
+    return make_etag(
+        "poll",
+        entry["id"],
+        entry.get("version"),
+        version,
+        format_ends_in(entry["expires_at"]),
+        is_owner,
+    )
+
+
+# ---------------------------------------------
+# INVALIDATION
+# ---------------------------------------------
+def invalidate_poll(poll_id, shareable_id=None, deleted=False):
+    """
+    Bump the poll's version (or drop it, for a `deleted` poll) and drop
+    its cached payload (every worker) once the transaction commits.
+    """
+    keys = [_pk_key(poll_id)]
+    if shareable_id is not None:
+        keys.append(_share_key(shareable_id))
+
+    def commit():
+        if deleted:
+            forget_version(poll_id)
+        else:
+            bump_version(poll_id)
+        poll_cache.invalidate(*keys)
+
+    transaction.on_commit(commit)
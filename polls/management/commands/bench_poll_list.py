@@ -0,0 +1,148 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from users.models import User
+from polls.models import Poll
+
+
+def legacy_queryset(user):
+    """The list filter before EXISTS: an M2M join fanned out, then DISTINCT."""
+    return (
+        Poll.objects.filter(is_active=True)
+        .filter(
+            Q(visibility="public")
+            | Q(visibility="private", owner=user)
+            | Q(visibility="restricted", allowed_users=user)
+        )
+        .distinct()
+    )
+
+
+def exists_queryset(user):
+    return Poll.objects.filter(is_active=True).visible_to(user)
+
+
+VARIANTS = {"legacy": legacy_queryset, "exists": exists_queryset}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the authenticated poll list filter (OR + M2M join + DISTINCT "
+        "vs EXISTS) on a generated table: prints the query plans and first-page "
+        "latency. Run against Postgres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--polls", type=int, default=1_000_000)
+        parser.add_argument(
+            "--members",
+            type=int,
+            default=50,
+            help="Allow-list size of each restricted poll.",
+        )
+        parser.add_argument(
+            "--restricted",
+            type=float,
+            default=0.3,
+            help="Share of restricted polls (10%% are private, the rest public).",
+        )
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write(self.style.WARNING(
+                "Not Postgres: plans and timings won't reflect production."
+            ))
+
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(username=f"bench-{tag}", email=f"bench-{tag}@example.com")
+        members = User.objects.bulk_create([
+            User(username=f"bench-{tag}-{i}", email=f"bench-{tag}-{i}@example.com")
+            for i in range(options["members"])
+        ])
+        # The viewer is on every allow-list, as the last member added
+        viewer = members[-1]
+
+        try:
+            self._populate(owner, members, options)
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE polls_poll")
+                    cursor.execute("ANALYZE polls_poll_allowed_users")
+
+            self.stdout.write(f"{'variant':>8} {'query':>6} {'median ms':>10} {'p95 ms':>8}")
+            for name, build in VARIANTS.items():
+                queryset = build(viewer)
+                page = queryset.order_by("-created_at", "-id")
+
+                self._time(name, "page", lambda: list(page[:10]), options["runs"])
+                self._time(name, "count", queryset.count, options["runs"])
+                self._explain(name, page[:10])
+        finally:
+            self._cleanup(owner, members, options["batch_size"])
+
+    def _populate(self, owner, members, options):
+        total = options["polls"]
+        batch_size = options["batch_size"]
+        through = Poll.allowed_users.through
+        restricted_every = max(1, round(1 / options["restricted"])) if options["restricted"] else 0
+
+        started = time.perf_counter()
+        for start in range(0, total, batch_size):
+            polls = []
+            for i in range(start, min(start + batch_size, total)):
+                if i % 10 == 0:
+                    visibility = "private"
+                elif restricted_every and i % restricted_every == 1:
+                    visibility = "restricted"
+                else:
+                    visibility = "public"
+                polls.append(Poll(owner=owner, title=f"Bench {i}", visibility=visibility))
+            polls = Poll.objects.bulk_create(polls)
+
+            through.objects.bulk_create(
+                [
+                    through(poll_id=poll.pk, user_id=member.pk)
+                    for poll in polls
+                    if poll.visibility == "restricted"
+                    for member in members
+                ],
+                batch_size=batch_size,
+            )
+        self.stdout.write(f"Created {total} polls in {time.perf_counter() - started:.1f}s")
+
+    def _time(self, name, label, run, runs):
+        run()  # warm up
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        self.stdout.write(f"{name:>8} {label:>6} {statistics.median(samples):>10.2f} {p95:>8.2f}")
+
+    def _explain(self, name, queryset):
+        if connection.vendor == "postgresql":
+            plan = queryset.explain(analyze=True, buffers=True)
+        else:
+            plan = queryset.explain()
+        self.stdout.write(f"\n--- {name} plan ---\n{plan}\n")
+
+    def _cleanup(self, owner, members, batch_size):
+        # Chunked: one cascading delete of the whole table would hold
+        # every collected row in memory
+        polls = Poll.objects.filter(owner=owner)
+        while True:
+            pks = list(polls.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            Poll.objects.filter(pk__in=pks).delete()
+        User.objects.filter(pk__in=[m.pk for m in members]).delete()
+        owner.delete()
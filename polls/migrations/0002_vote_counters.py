@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_counts(apps, schema_editor):
+    Option = apps.get_model("polls", "Option")
+    Poll = apps.get_model("polls", "Poll")
+    Vote = apps.get_model("votes", "Vote")
+
+    option_votes = (
+        Vote.objects.filter(option=OuterRef("pk"))
+        .values("option")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Option.objects.update(vote_count=Coalesce(Subquery(option_votes), Value(0)))
+
+    poll_votes = (
+        Vote.objects.filter(option__poll=OuterRef("pk"))
+        .values("option__poll")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Poll.objects.update(total_votes=Coalesce(Subquery(poll_votes), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0001_initial'),
+        ('votes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='option',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='poll',
+            name='total_votes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+    ]
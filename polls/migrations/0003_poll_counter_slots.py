@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0002_vote_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poll',
+            name='counter_slots',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
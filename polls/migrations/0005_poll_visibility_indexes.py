@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0004_poll_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['visibility', 'created_at', 'id'], name='poll_active_visibility_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(condition=models.Q(('is_active', True), ('visibility', 'private')), fields=['owner', 'created_at', 'id'], name='poll_active_private_idx'),
+        ),
+    ]
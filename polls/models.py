@@ -4,6 +4,50 @@ from django.utils import timezone
 import uuid
 
 
+class PollQuerySet(models.QuerySet):
+
+    def visible_to(self, user, allowed_poll_ids=None):
+        """
+        Polls `user` may see: public ones, their own private ones and
+        restricted ones they are allowed in. Allow-list membership is an
+        EXISTS probe on the (poll, user) unique index rather than a join,
+        so rows don't fan out and no DISTINCT is needed. When the caller
+        already knows the user's `allowed_poll_ids` (polls.access), an IN
+        on them limits the probe to those polls; the probe still runs, as
+        cached ids may include a revoked poll.
+        """
+        if not user.is_authenticated:
+            return self.filter(visibility="public")
+
+        member = Poll.allowed_users.through.objects.filter(
+            poll_id=models.OuterRef("pk"), user_id=user.id
+        )
+        restricted = models.Q(models.Exists(member), visibility="restricted")
+        if allowed_poll_ids is not None:
+            restricted &= models.Q(pk__in=allowed_poll_ids)
+
+        return self.filter(
+            models.Q(visibility="public")
+            | models.Q(visibility="private", owner_id=user.id)
+            | restricted
+        )
+
+    def with_display_relations(self):
+        """
+        What the poll serializers read, in one extra query for the whole
+        page: options with their denormalized vote counts. Totals come
+        from Poll.total_votes, so the query count doesn't grow with the
+        number of polls or options. Allow-lists are only loaded for their
+        owner (see PollTallyListSerializer).
+        """
+        return self.prefetch_related(
+            models.Prefetch(
+                "options",
+                queryset=Option.objects.only("id", "poll_id", "text", "vote_count").order_by("pk"),
+            ),
+        )
+
+
 class Poll(models.Model):
     VISIBILITY_CHOICES = [
         ("public", "Public"),
@@ -49,6 +93,33 @@ class Poll(models.Model):
         editable=False
     )
 
+    # Denormalized vote total, kept in sync with the Vote table
+    # (see votes.counters / `manage.py rebuild_vote_counts`)
+    total_votes = models.PositiveIntegerField(default=0)
+
+    # Counter rows per option for the "sharded" counter backend;
+    # raised automatically by compaction when the poll runs hot
+    counter_slots = models.PositiveSmallIntegerField(default=1)
+
+    objects = PollQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the poll list (newest first)
+            models.Index(fields=["created_at", "id"], name="poll_created_at_id_idx"),
+            # Each visibility branch of the list, newest first, over
+            # active polls only
+            models.Index(
+                fields=["visibility", "created_at", "id"],
+                condition=models.Q(is_active=True),
+                name="poll_active_visibility_idx",
+            ),
+            models.Index(
+                fields=["owner", "created_at", "id"],
+                condition=models.Q(is_active=True, visibility="private"),
+                name="poll_active_private_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -68,5 +139,8 @@ class Option(models.Model):
     )
     text = models.CharField(max_length=255)
 
+    # Denormalized vote count for this option
+    vote_count = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return f"{self.poll.title} - {self.text}"
@@ -0,0 +1,3 @@
+# Poll-level WebSocket routes.
+# The live results feed (ws/polls/<id>/results/) is served by votes.routing.
+websocket_urlpatterns = []
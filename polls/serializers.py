@@ -1,9 +1,11 @@
 from rest_framework import serializers
+from django.db import models
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 
 from .models import Poll, Option
-from votes.models import Vote
 from users.models import User
+from votes.counters import apply_tallies
 
 
 # ---------------------------------------------------
@@ -28,25 +30,22 @@ class OptionSerializer(serializers.ModelSerializer):
 
 class OptionWithVotesSerializer(serializers.ModelSerializer):
     """Option including vote count (for list/detail/results)."""
-    votes = serializers.SerializerMethodField()
+    votes = serializers.IntegerField(source="vote_count", read_only=True)
 
     class Meta:
         model = Option
         fields = ["id", "text", "votes"]
 
-    def get_votes(self, obj):
-        return Vote.objects.filter(option=obj).count()
-
 
 # ---------------------------------------------------
 # SHARED HELPERS
 # ---------------------------------------------------
 
-def _get_ends_in(obj: Poll) -> str:
-    if not obj.expires_at:
+def format_ends_in(expires_at) -> str:
+    if not expires_at:
         return "No deadline"
 
-    remaining = obj.expires_at - timezone.now()
+    remaining = expires_at - timezone.now()
     if remaining.total_seconds() <= 0:
         return "Expired"
 
@@ -55,8 +54,39 @@ def _get_ends_in(obj: Poll) -> str:
     return f"{days}d {hours}h"
 
 
-def _get_total_votes(obj: Poll) -> int:
-    return Vote.objects.filter(option__poll=obj).count()
+def viewer_id(serializer):
+    request = serializer.context.get("request")
+    if not request or not request.user.is_authenticated:
+        return None
+    return request.user.id
+
+
+def owner_allowed_users(serializer, poll):
+    """The allow-list, for the poll's owner only; everyone else gets []."""
+    if poll.owner_id != viewer_id(serializer):
+        return []
+    return SimpleUserSerializer(poll.allowed_users.all(), many=True).data
+
+
+class PollTallyListSerializer(serializers.ListSerializer):
+    """
+    Overlays live counter-tier tallies for the whole page in one go, and
+    loads allow-lists for the viewer's own polls only (one query).
+    """
+
+    def to_representation(self, data):
+        polls = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        apply_tallies(polls)
+
+        owned = [p for p in polls if p.owner_id == viewer_id(self)]
+        prefetch_related_objects(
+            owned,
+            models.Prefetch(
+                "allowed_users",
+                queryset=User.objects.only("id", "username", "email"),
+            ),
+        )
+        return super().to_representation(polls)
 
 
 # ---------------------------------------------------
@@ -65,10 +95,10 @@ def _get_total_votes(obj: Poll) -> int:
 
 class PollListSerializer(serializers.ModelSerializer):
     options = OptionWithVotesSerializer(many=True, read_only=True)
-    total_votes = serializers.SerializerMethodField()
+    total_votes = serializers.IntegerField(read_only=True)
     ends_in = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
-    allowed_users = SimpleUserSerializer(many=True, read_only=True)
+    allowed_users = serializers.SerializerMethodField()
 
     class Meta:
         model = Poll
@@ -89,12 +119,14 @@ class PollListSerializer(serializers.ModelSerializer):
             "allowed_users",
             "options",
         ]
+        list_serializer_class = PollTallyListSerializer
 
-    def get_total_votes(self, obj):
-        return _get_total_votes(obj)
+    def to_representation(self, instance):
+        apply_tallies([instance])
+        return super().to_representation(instance)
 
     def get_ends_in(self, obj):
-        return _get_ends_in(obj)
+        return format_ends_in(obj.expires_at)
 
     def get_is_owner(self, obj):
         request = self.context.get("request")
@@ -102,6 +134,9 @@ class PollListSerializer(serializers.ModelSerializer):
             return False
         return obj.owner_id == request.user.id
 
+    def get_allowed_users(self, obj):
+        return owner_allowed_users(self, obj)
+
 
 # ---------------------------------------------------
 # POLL DETAIL SERIALIZER
@@ -109,10 +144,10 @@ class PollListSerializer(serializers.ModelSerializer):
 
 class PollDetailSerializer(serializers.ModelSerializer):
     options = OptionWithVotesSerializer(many=True, read_only=True)
-    total_votes = serializers.SerializerMethodField()
+    total_votes = serializers.IntegerField(read_only=True)
     ends_in = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
-    allowed_users = SimpleUserSerializer(many=True, read_only=True)
+    allowed_users = serializers.SerializerMethodField()
 
     class Meta:
         model = Poll
@@ -134,11 +169,12 @@ class PollDetailSerializer(serializers.ModelSerializer):
             "total_votes",
         ]
 
-    def get_total_votes(self, obj):
-        return _get_total_votes(obj)
+    def to_representation(self, instance):
+        apply_tallies([instance])
+        return super().to_representation(instance)
 
     def get_ends_in(self, obj):
-        return _get_ends_in(obj)
+        return format_ends_in(obj.expires_at)
 
     def get_is_owner(self, obj):
         request = self.context.get("request")
@@ -146,6 +182,9 @@ class PollDetailSerializer(serializers.ModelSerializer):
             return False
         return obj.owner_id == request.user.id
 
+    def get_allowed_users(self, obj):
+        return owner_allowed_users(self, obj)
+
 
 # ---------------------------------------------------
 # POLL CREATE SERIALIZER
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core import edge_cache
+from . import access
+from .cache import invalidate_poll
+from .models import Poll, Option
+
+
+def _purge_lists():
+    # A poll appearing, moving or going away shifts every list page
+    transaction.on_commit(lambda: edge_cache.purge([edge_cache.LIST_KEY]))
+
+
+@receiver(post_save, sender=Poll)
+def poll_saved(sender, instance, **kwargs):
+    invalidate_poll(instance.pk)
+    _purge_lists()
+
+
+@receiver(post_delete, sender=Poll)
+def poll_deleted(sender, instance, **kwargs):
+    invalidate_poll(instance.pk, instance.shareable_id, deleted=True)
+    _purge_lists()
+
+
+@receiver(post_save, sender=Option)
+@receiver(post_delete, sender=Option)
+def option_changed(sender, instance, **kwargs):
+    invalidate_poll(instance.poll_id)
+
+
+@receiver(post_delete, sender=Poll)
+def poll_members_deleted(sender, instance, **kwargs):
+    access.forget(poll_ids=[instance.pk])
+
+
+@receiver(m2m_changed, sender=Poll.allowed_users.through)
+def allowed_users_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # clear() doesn't say who was removed: look before it happens
+    if action == "pre_clear":
+        through = sender.objects
+        if reverse:
+            instance._cleared_poll_ids = set(through.filter(user_id=instance.pk).values_list("poll_id", flat=True))
+        else:
+            instance._cleared_user_ids = set(through.filter(poll_id=instance.pk).values_list("user_id", flat=True))
+        return
+    if not action.startswith("post_"):
+        return
+
+    if action == "post_clear":
+        pk_set = getattr(instance, "_cleared_poll_ids" if reverse else "_cleared_user_ids", set())
+
+    # poll.allowed_users.add(...) vs user.allowed_polls.add(...)
+    if not reverse:
+        invalidate_poll(instance.pk)
+        pairs = [(instance.pk, user_id) for user_id in pk_set or ()]
+    else:
+        for poll_id in pk_set or ():
+            invalidate_poll(poll_id)
+        pairs = [(poll_id, instance.pk) for poll_id in pk_set or ()]
+
+    # Per-poll / per-user access sets follow the change once it commits
+    if action == "post_add":
+        transaction.on_commit(lambda: access.added(pairs))
+    else:
+        transaction.on_commit(lambda: access.removed(pairs))
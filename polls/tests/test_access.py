@@ -0,0 +1,257 @@
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from polls import access
+from core.circuit_breaker import get_breaker
+from core.tests.flaky_redis import FlakyConnection, flaky_client
+
+
+class TestRestrictedPollAccess(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.member = User.objects.create_user(
+            username="member",
+            email="member@example.com",
+            password="member123",
+        )
+        self.outsider = User.objects.create_user(
+            username="outsider",
+            email="outsider@example.com",
+            password="outsider123",
+        )
+        self.poll = Poll.objects.create(owner=self.owner, title="Corporate", visibility="restricted")
+        Option.objects.create(poll=self.poll, text="Yes")
+
+        crowd = User.objects.bulk_create([
+            User(username=f"crowd{i}", email=f"crowd{i}@example.com") for i in range(50)
+        ])
+        self.poll.allowed_users.add(self.member, *crowd)
+
+        self.url = f"/api/polls/{self.poll.pk}/"
+        self.share_url = f"/api/polls/share/{self.poll.shareable_id}/"
+
+    def get(self, url, user):
+        self.client.force_authenticate(user)
+        return self.client.get(url)
+
+    def test_membership_is_one_exists_query(self):
+        self.get(self.url, self.member)  # warm the poll cache
+
+        with self.assertNumQueries(1) as ctx:
+            res = self.get(self.url, self.member)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("LIMIT 1", ctx.captured_queries[0]["sql"])
+        self.assertNotIn("users_user", ctx.captured_queries[0]["sql"])
+
+        with self.assertNumQueries(2):  # share id alias + membership
+            self.assertEqual(self.get(self.share_url, self.member).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.get(self.url, self.outsider).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.get(self.share_url, self.outsider).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_allow_list_is_shown_to_the_owner_only(self):
+        # Restricted polls are only visible to their allow-list, owner included
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.allowed_users.add(self.owner)
+
+        self.assertEqual(self.get(self.url, self.member).data["allowed_users"], [])
+        self.assertEqual(len(self.get(self.url, self.owner).data["allowed_users"]), 52)
+
+        listed = self.get("/api/polls/", self.member).data["results"][0]
+        self.assertEqual(listed["allowed_users"], [])
+        listed = self.get("/api/polls/", self.owner).data["results"][0]
+        self.assertEqual(len(listed["allowed_users"]), 52)
+
+    def test_vote_checks_membership(self):
+        option = self.poll.options.get()
+
+        self.client.force_authenticate(self.outsider)
+        res = self.client.post("/api/votes/", {"option": option.pk})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("You are not allowed to vote here.", str(res.data))
+
+        self.client.force_authenticate(self.member)
+        res = self.client.post("/api/votes/", {"option": option.pk})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+
+class TestAccessCache(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+        FlakyConnection.reset()
+        self.addCleanup(FlakyConnection.reset)
+        get_breaker("redis").reset()
+        access._unsynced.clear()
+
+        self.redis = flaky_client(decode_responses=True)
+        patcher = mock.patch("core.redis._client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.member = User.objects.create_user(
+            username="member",
+            email="member@example.com",
+            password="member123",
+        )
+        self.newcomer = User.objects.create_user(
+            username="newcomer",
+            email="newcomer@example.com",
+            password="newcomer123",
+        )
+        self.poll = Poll.objects.create(owner=self.owner, title="Corporate", visibility="restricted")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.allowed_users.add(self.member)
+
+        self.url = f"/api/polls/{self.poll.pk}/"
+        self.members_url = f"/api/polls/{self.poll.pk}/allowed-users/"
+
+    def get(self, url, user):
+        self.client.force_authenticate(user)
+        return self.client.get(url)
+
+    @contextmanager
+    def assertNoMembershipQuery(self):
+        with CaptureQueriesContext(connection) as ctx:
+            yield
+        for query in ctx.captured_queries:
+            self.assertNotIn("polls_poll_allowed_users", query["sql"])
+
+    def change_members(self, method, email):
+        self.client.force_authenticate(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = getattr(self.client, method)(self.members_url, {"email": email}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+
+    def test_denials_are_answered_from_redis_once_loaded(self):
+        # A miss loads the poll's set
+        self.assertEqual(self.get(self.url, self.newcomer).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(self.redis.sismember(access._poll_key(self.poll.pk), access.LOADED))
+
+        with self.assertNoMembershipQuery():
+            self.assertEqual(self.get(self.url, self.newcomer).status_code, status.HTTP_403_FORBIDDEN)
+        # Grants are confirmed by the database
+        self.assertEqual(self.get(self.url, self.member).status_code, status.HTTP_200_OK)
+
+    def test_allow_list_changes_apply_immediately(self):
+        self.get(self.url, self.newcomer)  # load the poll's set
+        self.assertEqual(self.get("/api/polls/", self.newcomer).data["count"], 0)  # and the user's
+
+        self.change_members("post", "newcomer@example.com")
+        self.assertEqual(self.get(self.url, self.newcomer).status_code, status.HTTP_200_OK)
+        self.assertEqual(access.allowed_poll_ids(self.newcomer.pk), {self.poll.pk})
+        self.assertEqual(self.get("/api/polls/", self.newcomer).data["count"], 1)
+
+        self.change_members("delete", "newcomer@example.com")
+        with self.assertNoMembershipQuery():
+            self.assertEqual(self.get(self.url, self.newcomer).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(access.allowed_poll_ids(self.newcomer.pk), set())
+        self.assertEqual(self.get("/api/polls/", self.newcomer).data["count"], 0)
+
+    def test_poll_list_filters_by_the_cached_ids(self):
+        self.assertEqual(self.get("/api/polls/", self.member).data["count"], 1)
+
+        self.client.force_authenticate(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/polls/", {
+                "title": "Team lunch",
+                "visibility": "restricted",
+                "options": ["Pizza", "Sushi"],
+                "allowed_users": ["member@example.com"],
+            }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+        # COUNT, page, options: the user's poll ids come from Redis
+        # and narrow the membership probe
+        with self.assertNumQueries(3) as ctx:
+            res = self.get("/api/polls/", self.member)
+        self.assertEqual(res.data["count"], 2)
+        self.assertIn(f"IN ({self.poll.pk}, ", ctx.captured_queries[1]["sql"])
+
+    def test_a_removal_during_a_load_discards_it(self):
+        key = access._poll_key(self.poll.pk)
+
+        def ids():
+            yield self.member.pk
+            # Committed while the load was reading
+            access.removed([(self.poll.pk, self.member.pk)])
+
+        self.assertIsNone(access._load(key, ids()))
+        self.assertFalse(self.redis.exists(key))
+
+    @override_settings(ACCESS_CACHE_VERIFY=True)
+    def test_verify_prefers_the_database(self):
+        self.get(self.url, self.member)
+        key = access._poll_key(self.poll.pk)
+        self.redis.sadd(key, self.newcomer.pk)  # stale / corrupt entry
+
+        with self.assertLogs("polls.access", "WARNING"):
+            res = self.get(self.url, self.newcomer)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(self.redis.exists(key))
+
+    def test_database_answers_while_redis_is_down(self):
+        FlakyConnection.fail = True
+        self.assertEqual(self.get(self.url, self.member).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get(self.url, self.newcomer).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.get("/api/polls/", self.member).data["count"], 1)
+
+    def test_a_lost_removal_fails_closed(self):
+        self.assertEqual(self.get(self.url, self.member).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get("/api/polls/", self.member).data["count"], 1)
+
+        # Redis fails as the removal commits: neither the update nor the
+        # fallback reaches it
+        FlakyConnection.fail = True
+        self.change_members("delete", "member@example.com")
+        FlakyConnection.fail = False
+        get_breaker("redis").reset()
+        self.assertTrue(self.redis.sismember(access._poll_key(self.poll.pk), self.member.pk))
+
+        # As seen from another process, which doesn't know the update was lost
+        access._unsynced.clear()
+        with self.assertLogs("polls.access", "WARNING"):
+            self.assertFalse(access.is_member(self.poll.pk, self.member.pk))
+        self.assertEqual(self.get(self.url, self.member).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.get("/api/polls/", self.member).data["count"], 0)
+
+    def test_a_lost_addition_is_answered_by_the_database(self):
+        self.assertEqual(self.get(self.url, self.newcomer).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.get("/api/polls/", self.newcomer).data["count"], 0)
+
+        # Redis fails as the addition commits: the loaded sets still deny
+        FlakyConnection.fail = True
+        self.change_members("post", "newcomer@example.com")
+        self.assertTrue(access.can_view(self.poll, self.newcomer))
+        FlakyConnection.fail = False
+        get_breaker("redis").reset()
+
+        # The stale sets are dropped, then reloaded with the addition
+        self.assertTrue(access.can_view(self.poll, self.newcomer))
+        self.assertTrue(self.redis.sismember(access._poll_key(self.poll.pk), self.newcomer.pk))
+        self.assertEqual(self.get("/api/polls/", self.newcomer).data["count"], 1)
+        self.assertEqual(access.allowed_poll_ids(self.newcomer.pk), {self.poll.pk})
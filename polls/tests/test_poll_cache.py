@@ -0,0 +1,117 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from core.tiered_cache import TieredCache
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from users.models import User
+
+
+class TestPollDetailCache(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="public",
+        )
+        Option.objects.create(poll=self.poll, text="Python")
+        self.url = f"/api/polls/{self.poll.id}/"
+
+    def test_cached_detail_keeps_per_viewer_fields(self):
+        self.client.force_authenticate(self.owner)
+        self.assertTrue(self.client.get(self.url).data["is_owner"])
+
+        self.client.force_authenticate(self.voter)
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.data["is_owner"])
+
+    def test_share_link_uses_same_entry(self):
+        self.client.force_authenticate(self.voter)
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):  # share id → pk alias only
+            res = self.client.get(f"/api/polls/share/{self.poll.shareable_id}/")
+        self.assertEqual(res.data["id"], self.poll.id)
+
+        self.assertEqual(self.client.get("/api/polls/share/not-a-uuid/").status_code, 404)
+
+    def test_option_change_invalidates(self):
+        self.client.force_authenticate(self.owner)
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                f"/api/polls/{self.poll.id}/options/", {"text": "Rust"}, format="json"
+            )
+
+        res = self.client.get(self.url)
+        self.assertEqual(len(res.data["options"]), 2)
+
+    def test_allowed_users_change_invalidates_access(self):
+        Poll.objects.filter(pk=self.poll.pk).update(visibility="restricted")
+
+        self.client.force_authenticate(self.voter)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.allowed_users.add(self.voter)
+
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_broadcast_message_evicts_local_copy(self):
+        poll_cache.l1.set("pk:42", {"stale": True})
+        TieredCache.handle_message("poll-detail|pk:42")
+        self.assertIsNone(poll_cache.l1.get("pk:42"))
+
+    def test_public_list_is_shared_between_guests(self):
+        self.assertEqual(self.client.get("/api/polls/")["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/polls/")
+        self.assertEqual(res["X-Cache"], "HIT")
+        self.assertEqual(res.data["count"], 1)
+
+
+
+class TestWarmedPollList(APITransactionTestCase):
+    """warm_caches queries from pool threads: committed rows only."""
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        Poll.objects.bulk_create(
+            Poll(owner=owner, title=f"Poll {i}") for i in range(11)
+        )
+
+    @override_settings(ALLOWED_HOSTS=["localhost", "api.example.com"])
+    def test_warmed_list_is_hit_on_the_public_host(self):
+        call_command("warm_caches", "--top", "0", "--pages", "1", stdout=StringIO())
+
+        res = self.client.get("/api/polls/", HTTP_HOST="api.example.com", secure=True)
+        self.assertEqual(res["X-Cache"], "HIT")
+        self.assertEqual(res.data["next"], "https://api.example.com/api/polls/?page=2")
@@ -0,0 +1,210 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from votes.models import Vote
+from votes import counters
+
+
+class TestPollListQueries(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.member = User.objects.create_user(
+            username="member",
+            email="member@example.com",
+            password="member123",
+        )
+
+    def make_polls(self, n, options=3):
+        for i in range(n):
+            poll = Poll.objects.create(
+                owner=self.owner,
+                title=f"Poll {i}",
+                visibility="restricted" if i % 2 else "public",
+                allow_guest_votes=True,
+            )
+            poll.allowed_users.add(self.member)
+            for j in range(options):
+                option = Option.objects.create(poll=poll, text=f"Option {j}")
+                if j == 0:
+                    with self.captureOnCommitCallbacks(execute=True):
+                        Vote.objects.create(option=option, guest_ip="10.0.0.1")
+                        counters.record_vote(option)
+
+    def list_polls(self, user=None):
+        cache.clear()
+        client = self.client_class()
+        if user is not None:
+            client.force_authenticate(user)
+        return client.get("/api/polls/")
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        # COUNT for the paginator, the page, options (+ allow-lists of
+        # the owner's polls); from one poll with one option to a full
+        # page of ten options each
+        for n in (1, 10):
+            with self.subTest(polls=n):
+                Poll.objects.all().delete()
+                self.make_polls(n, options=n)
+
+                with self.assertNumQueries(3):
+                    res = self.list_polls(self.member)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(res.data["results"]), n)
+
+                with self.assertNumQueries(3):
+                    self.list_polls()
+
+                with self.assertNumQueries(4):
+                    self.list_polls(self.owner)
+
+    @override_settings(VOTE_COUNTER_BACKEND="sharded")
+    def test_counter_slots_are_read_once_per_page(self):
+        self.make_polls(10)
+
+        # One more query overlays the pending counter slots for the page
+        with self.assertNumQueries(4):
+            res = self.list_polls(self.member)
+
+        first = res.data["results"][0]
+        self.assertEqual(first["total_votes"], 1)
+        self.assertEqual([o["votes"] for o in first["options"]], [1, 0, 0])
+
+
+class TestPollListCursor(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        for i in range(25):
+            Poll.objects.create(owner=self.owner, title=f"Poll {i}", category="food" if i % 5 == 0 else "")
+
+        # Ties on created_at are broken by id
+        tied = list(Poll.objects.order_by("pk").values_list("pk", flat=True)[5:15])
+        Poll.objects.filter(pk__in=tied).update(created_at=Poll.objects.get(pk=tied[0]).created_at)
+
+        self.expected = list(Poll.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+        self.client.force_authenticate(self.owner)
+
+    def get(self, url, params=None):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res.data
+
+    def test_walks_every_poll_forward_and_back(self):
+        pages = []
+        data = self.get("/api/polls/", {"pagination": "cursor"})
+        self.assertNotIn("count", data)
+        self.assertIsNone(data["previous"])
+        pages.append([p["id"] for p in data["results"]])
+        while data["next"]:
+            data = self.get(data["next"])
+            pages.append([p["id"] for p in data["results"]])
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        # Back from the last page
+        data = self.get(data["previous"])
+        self.assertEqual([p["id"] for p in data["results"]], pages[1])
+        data = self.get(data["previous"])
+        self.assertEqual([p["id"] for p in data["results"]], pages[0])
+        self.assertIsNone(data["previous"])
+
+    def test_deep_pages_cost_the_same(self):
+        first = self.get("/api/polls/", {"pagination": "cursor"})
+        second = self.get(first["next"])
+
+        # The page, options, the owner's allow-lists: no COUNT, no OFFSET
+        with self.assertNumQueries(3) as ctx:
+            self.client.get(second["next"])
+        self.assertNotIn("OFFSET", ctx.captured_queries[0]["sql"].upper())
+
+    def test_filters_apply_to_both_modes(self):
+        food = [pk for pk in self.expected if Poll.objects.get(pk=pk).category == "food"]
+
+        data = self.get("/api/polls/", {"pagination": "cursor", "category": "food"})
+        self.assertEqual([p["id"] for p in data["results"]], food)
+
+        data = self.get("/api/polls/", {"category": "food"})
+        self.assertEqual(data["count"], len(food))
+
+    def test_page_numbers_still_work(self):
+        data = self.get("/api/polls/", {"page": 3})
+        self.assertEqual(data["count"], 25)
+        self.assertEqual(len(data["results"]), 5)
+
+    def test_tampered_cursor(self):
+        res = self.client.get("/api/polls/", {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestPollListVisibility(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.viewer = User.objects.create_user(
+            username="viewer",
+            email="viewer@example.com",
+            password="viewer123",
+        )
+        members = [
+            User.objects.create_user(username=f"m{i}", email=f"m{i}@example.com", password="x")
+            for i in range(5)
+        ]
+
+        def poll(title, owner=None, **fields):
+            return Poll.objects.create(owner=owner or self.owner, title=title, **fields)
+
+        poll("public")
+        poll("own private", owner=self.viewer, visibility="private")
+        poll("other private", visibility="private")
+        allowed = poll("allowed", visibility="restricted")
+        allowed.allowed_users.add(self.viewer, *members)
+        poll("not allowed", visibility="restricted").allowed_users.add(*members)
+        poll("inactive", is_active=False)
+
+    def titles(self, user=None):
+        client = self.client_class()
+        if user is not None:
+            client.force_authenticate(user)
+        res = client.get("/api/polls/")
+        return sorted(p["title"] for p in res.data["results"])
+
+    def test_each_poll_once_per_visibility_rule(self):
+        # A restricted poll with many members is still listed once
+        self.assertEqual(self.titles(self.viewer), ["allowed", "own private", "public"])
+        self.assertEqual(self.titles(), ["public"])
+
+    def test_no_join_or_distinct(self):
+        self.client.force_authenticate(self.viewer)
+        with self.assertNumQueries(4) as ctx:
+            self.client.get("/api/polls/")
+        page_sql = ctx.captured_queries[1]["sql"].upper()
+        self.assertIn("EXISTS", page_sql)
+        self.assertNotIn("DISTINCT", page_sql)
@@ -1,6 +1,11 @@
+import hashlib
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 
 from rest_framework import generics
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -16,15 +21,52 @@ from .serializers import (
     OptionSerializer,
     SimpleUserSerializer,
 )
+from . import access
+from .cache import get_poll_entry, get_poll_entry_by_share_id, poll_etag, render_poll
 from users.models import User
+from votes.results import get_list_version, get_results, get_version
+from core import edge_cache
+from core.cache import STALE, get_or_compute
+from core.etags import is_not_modified, make_etag, no_store, not_modified, set_validators
+from core.idempotency import IdempotentCreateMixin
+from core.pagination import PageNumberOrKeysetPagination
+
+
+def _poll_response(request, entry, shared=False):
+    """
+    render_poll behind a conditional GET (see core.etags); `shared` lets
+    reverse proxies cache it (see core.edge_cache).
+    """
+    version = get_version(entry["id"])
+    etag = poll_etag(entry, request.user, version)
+    if is_not_modified(request, etag):
+        response = not_modified(request, etag, per_user=True)
+    else:
+        results, cache_status = get_results(entry["id"], version=version)
+        response = Response(render_poll(entry, request, results))
+        # Stale results predate `version`: no validator for them
+        set_validators(response, request, None if cache_status == STALE else etag, per_user=True)
+
+    if etag is None:
+        return no_store(response)
+    if shared:
+        edge_cache.share(response, [edge_cache.poll_key(entry["id"])])
+    return response
 
 
 # --------------------------------------
 # LIST + CREATE POLLS  (/api/polls/)
 # --------------------------------------
-class PollListCreateView(generics.ListCreateAPIView):
+class PollListCreateView(IdempotentCreateMixin, generics.ListCreateAPIView):
+    """
+    GET supports ?category= and ?visibility= filters. Pages are numbered
+    (?page=) by default; ?pagination=cursor switches to keyset pages
+    ordered by (created_at, id), newest first, followed through the
+    `next` / `previous` links.
+    """
     permission_classes = [AllowAny]
     queryset = Poll.objects.all()
+    pagination_class = PageNumberOrKeysetPagination
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -37,24 +79,92 @@ class PollListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
 
+        # Serializers only read owner_id: no owner join. Newest first,
+        # the order of the (created_at, id) indexes
         base_qs = (
             Poll.objects.filter(is_active=True)
-            .select_related("owner")
-            .prefetch_related("options", "allowed_users")
+            .order_by("-created_at", "-id")
+            .with_display_relations()
         )
 
-        # Guests → only public polls
+        params = self.request.query_params
+        if params.get("category"):
+            base_qs = base_qs.filter(category=params["category"])
+        if params.get("visibility"):
+            base_qs = base_qs.filter(visibility=params["visibility"])
+
+        # Guests → only public polls; authenticated → public + ones
+        # they own or are allowed in (from the cached access set if any)
         if not user.is_authenticated:
-            return base_qs.filter(visibility="public")
-
-        # Authenticated → public + ones they own or are allowed in
-        return (
-            base_qs.filter(
-                Q(visibility="public")
-                | Q(visibility="private", owner=user)
-                | Q(visibility="restricted", allowed_users=user)
-            )
-            .distinct()
+            return base_qs.visible_to(user)
+        return base_qs.visible_to(user, access.allowed_poll_ids(user.id))
+
+    def list(self, request, *args, **kwargs):
+        # Any poll, option, allow-list change or vote bumps the list
+        # version. `ends_in` is rendered to the hour, so tags also roll
+        # over every minute
+        user = request.user
+        version = get_list_version()
+        etag = None if version is None else make_etag(
+            "list",
+            version,
+            user.id if user.is_authenticated else "",
+            request.get_full_path(),
+            int(time.time() // 60),
+        )
+        if is_not_modified(request, etag):
+            response = not_modified(request, etag, per_user=True)
+            return response if user.is_authenticated else edge_cache.share(response)
+
+        if user.is_authenticated:
+            response = super().list(request, *args, **kwargs)
+            set_validators(response, request, etag, per_user=True)
+            return response if etag is not None else no_store(response)
+
+        # Guests all see the same public pages → shared, stampede-protected
+        # cache, keyed and stored without the host (warm_caches fills it
+        # from a request that doesn't know the public one)
+        path = request.get_full_path()
+        data, cache_status = get_or_compute(
+            "votex:polls:public-list:" + hashlib.md5(path.encode()).hexdigest(),
+            lambda: self._relative_links(super(PollListCreateView, self).list(request, *args, **kwargs).data),
+            ttl=settings.POLL_LIST_CACHE_TTL,
+            stale_ttl=settings.POLL_LIST_CACHE_STALE_TTL,
+            version=version,
+            name="public-list",
+        )
+
+        response = Response(self._absolute_links(request, data))
+        response["X-Cache"] = cache_status.upper()
+        set_validators(response, request, None if cache_status == STALE else etag, per_user=True)
+        if etag is None:
+            return no_store(response)
+        return edge_cache.share(response, self.surrogate_keys(request, data))
+
+    @staticmethod
+    def _relative_links(data):
+        for name in ("next", "previous"):
+            if data.get(name):
+                url = urlsplit(data[name])
+                data[name] = url.path + (f"?{url.query}" if url.query else "")
+        return data
+
+    @staticmethod
+    def _absolute_links(request, data):
+        data = dict(data)
+        for name in ("next", "previous"):
+            if data.get(name):
+                data[name] = request.build_absolute_uri(data[name])
+        return data
+
+    def surrogate_keys(self, request, data):
+        """The page's polls, plus its page number and category filter."""
+        params = request.query_params
+        page = None if self.pagination_class.wants_keyset(request) else params.get("page", 1)
+        return edge_cache.list_keys(
+            [poll["id"] for poll in data["results"]],
+            page=page,
+            category=params.get("category"),
         )
 
     def perform_create(self, serializer):
@@ -66,30 +176,30 @@ class PollListCreateView(generics.ListCreateAPIView):
 # --------------------------------------
 class PollDetailView(generics.RetrieveAPIView):
     serializer_class = PollDetailSerializer
-    queryset = Poll.objects.select_related("owner").prefetch_related(
-        "options", "allowed_users"
-    )
+    queryset = Poll.objects.with_display_relations()
     lookup_field = "pk"
 
     def get(self, request, *args, **kwargs):
-        poll = self.get_object()
+        # Shared payload comes from the two-tier poll cache;
+        # access checks and per-viewer fields run on every request
+        entry = get_poll_entry(kwargs["pk"])
         user = request.user
 
         # Public → always viewable
-        if poll.visibility == "public":
-            return super().get(request, *args, **kwargs)
+        if entry["visibility"] == "public":
+            return _poll_response(request, entry)
 
         # Auth required for private/restricted
         if not user.is_authenticated:
             return Response({"detail": "Authentication required."}, status=403)
 
-        if poll.visibility == "private" and poll.owner != user:
+        if entry["visibility"] == "private" and entry["owner_id"] != user.id:
             return Response({"detail": "Access denied."}, status=403)
 
-        if poll.visibility == "restricted" and user not in poll.allowed_users.all():
+        if entry["visibility"] == "restricted" and not access.is_member(entry["id"], user.id):
             return Response({"detail": "Access restricted."}, status=403)
 
-        return super().get(request, *args, **kwargs)
+        return _poll_response(request, entry)
     
 # --------------------------------------
 # DELETE POLL  (/api/polls/<pk>/delete/)
@@ -135,30 +245,25 @@ class PollShareLinkView(APIView):
 
     def get(self, request, share_id):
         try:
-            poll = Poll.objects.select_related("owner").prefetch_related(
-                "options", "allowed_users"
-            ).get(shareable_id=share_id)
-        except Poll.DoesNotExist:
+            entry = get_poll_entry_by_share_id(share_id)
+        except Http404:
             return Response({"detail": "Invalid or expired link."}, status=404)
 
         user = request.user
 
-        if poll.visibility == "public":
-            return Response(
-                PollDetailSerializer(poll, context={"request": request}).data
-            )
+        # Public → the same for every guest: reverse proxies may cache it
+        if entry["visibility"] == "public":
+            return _poll_response(request, entry, shared=not user.is_authenticated)
 
-        if poll.visibility == "private":
-            if not user.is_authenticated or poll.owner != user:
+        if entry["visibility"] == "private":
+            if not user.is_authenticated or entry["owner_id"] != user.id:
                 return Response({"detail": "This poll is private."}, status=403)
 
-        if poll.visibility == "restricted":
-            if not user.is_authenticated or user not in poll.allowed_users.all():
+        if entry["visibility"] == "restricted":
+            if not user.is_authenticated or not access.is_member(entry["id"], user.id):
                 return Response({"detail": "Access restricted."}, status=403)
 
-        return Response(
-            PollDetailSerializer(poll, context={"request": request}).data
-        )
+        return _poll_response(request, entry)
 
 
 # --------------------------------------
@@ -174,10 +279,8 @@ class AllowedUsersView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get_poll(self, poll_id):
-        return get_object_or_404(
-            Poll.objects.prefetch_related("allowed_users"),
-            pk=poll_id
-        )
+        # The allow-list is only loaded once the owner check has passed
+        return get_object_or_404(Poll, pk=poll_id)
 
     def _check_owner(self, request, poll):
         if poll.owner != request.user:
@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from django.utils import timezone
+
+from polls.cache import get_poll_entry
+from polls.models import Poll
+from polls.views import PollListCreateView
+from votes.models import Vote
+from votes.results import get_results
+
+
+class Command(BaseCommand):
+    help = "Warm results, poll detail and public list caches for the most active polls"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=100, help="Number of polls to warm.")
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=60,
+            help="Rank polls by votes cast in the last N minutes.",
+        )
+        parser.add_argument("--pages", type=int, default=3, help="Public list pages to warm.")
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--budget",
+            type=float,
+            default=60,
+            help="Stop after this many seconds, even if not everything is warm.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        deadline = started + options["budget"]
+
+        poll_ids = self._top_polls(options["top"], options["window"])
+
+        tasks = [(self._warm_list_page, page) for page in range(1, options["pages"] + 1)]
+        for poll_id in poll_ids:
+            tasks.append((get_results, poll_id))
+            tasks.append((get_poll_entry, poll_id))
+
+        self._factory = RequestFactory()
+
+        def run(func, arg):
+            # Each pool thread gets its own DB connection; don't leak it
+            try:
+                if time.monotonic() >= deadline:
+                    return False
+                return func(arg) is not False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = [pool.submit(run, func, arg) for func, arg in tasks]
+            done, not_done = wait(futures, timeout=max(0, deadline - time.monotonic()))
+            for future in not_done:
+                future.cancel()
+
+        warmed = sum(1 for f in done if f.exception() is None and f.result())
+        failed = sum(1 for f in done if f.exception() is not None)
+        skipped = len(tasks) - warmed - failed
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {warmed} cache entries for {len(poll_ids)} poll(s) in {elapsed:.1f}s "
+            f"({failed} failed, {skipped} skipped: empty page or out of time budget)."
+        ))
+
+    def _top_polls(self, top, window_minutes):
+        since = timezone.now() - timedelta(minutes=window_minutes)
+        ranked = list(
+            Vote.objects.filter(created_at__gte=since)
+            .values("poll")
+            .annotate(n=Count("id"))
+            .order_by("-n")
+            .values_list("poll", flat=True)[:top]
+        )
+
+        # Quiet period: fall back to the newest active polls
+        if len(ranked) < top:
+            ranked += list(
+                Poll.objects.filter(is_active=True)
+                .exclude(pk__in=ranked)
+                .order_by("-created_at")
+                .values_list("pk", flat=True)[:top - len(ranked)]
+            )
+        return ranked
+
+    def _warm_list_page(self, page):
+        # The list cache is keyed on the path alone; any allowed host will do
+        path = "/api/polls/" if page == 1 else f"/api/polls/?page={page}"
+        request = self._factory.get(path, HTTP_HOST=settings.ALLOWED_HOSTS[0].lstrip("."))
+        return PollListCreateView.as_view()(request).status_code == 200
@@ -110,6 +110,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "vote_x_backend.wsgi.application"
+ASGI_APPLICATION = "asgi.application"
 # -------------------------------------------------------------------
 # Database (Neon via DATABASE_URL)
 # -------------------------------------------------------------------
@@ -122,29 +123,33 @@ TESTING = "test" in sys.argv
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
+# Test database: a file rather than shared-cache memory, so tests with
+# concurrent writers get real locking. Writers take the lock up front
+# and wait for it (up to `timeout` s) instead of failing
+TEST_SQLITE_DATABASE = {
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": ":memory:",
+    "OPTIONS": {
+        "timeout": 20,
+        "transaction_mode": "IMMEDIATE",
+        "init_command": "PRAGMA journal_mode=WAL;",
+    },
+    "TEST": {"NAME": str(BASE_DIR / ".test-db.sqlite3")},
+}
+
 # -------------------------------------------------------------------
 # CI TESTS — use SQLite (GitHub Actions)
 # -------------------------------------------------------------------
 if os.getenv("GITHUB_WORKFLOW"):
     print("⚙️ Using SQLite for GitHub Actions CI tests")
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.sqlite3",
-            "NAME": ":memory:",
-        }
-    }
+    DATABASES = {"default": TEST_SQLITE_DATABASE}
 
 # -------------------------------------------------------------------
 # LOCAL TESTS — use SQLite
 # -------------------------------------------------------------------
 elif TESTING:
     print("⚙️ Using SQLite for local tests")
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.sqlite3",
-            "NAME": ":memory:",
-        }
-    }
+    DATABASES = {"default": TEST_SQLITE_DATABASE}
 
 # -------------------------------------------------------------------
 # PRODUCTION / DEVELOPMENT — use DATABASE_URL
@@ -159,6 +164,175 @@ else:
     }
 
 
+# -------------------------------------------------------------------
+# Redis
+# -------------------------------------------------------------------
+# Example: REDIS_URL=redis://redis:6379/0
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Keep Redis timeouts short: a slow Redis should trip the circuit
+# breakers (core.circuit_breaker) and fall back to the database,
+# not hold request threads
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "0.25"))
+CACHE_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CACHE_BREAKER_FAILURE_THRESHOLD", "5"))
+CACHE_BREAKER_RESET_TIMEOUT = float(os.getenv("CACHE_BREAKER_RESET_TIMEOUT", "10"))
+
+# -------------------------------------------------------------------
+# Cache (Redis when configured, per-process memory otherwise)
+# -------------------------------------------------------------------
+# Results versions and ETags live in this cache: without REDIS_URL
+# only a single gunicorn worker may run (check votes.E001 refuses
+# WEB_CONCURRENCY > 1)
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache_backends.ResilientRedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SOCKET_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+                "SOCKET_CONNECT_TIMEOUT": REDIS_SOCKET_CONNECT_TIMEOUT,
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# -------------------------------------------------------------------
+# Channel layer (WebSocket fan-out across workers)
+# -------------------------------------------------------------------
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [REDIS_URL]},
+        }
+    }
+elif TESTING:
+    # No live fan-out unless a test enables a layer
+    CHANNEL_LAYERS = {}
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+
+# Live results are pushed at most once per poll per interval (seconds);
+# 0 pushes on every committed vote
+RESULTS_BROADCAST_INTERVAL = float(os.getenv("RESULTS_BROADCAST_INTERVAL", "1"))
+
+# Server-Sent Events results stream: heartbeat when quiet (seconds),
+# versions kept per poll for Last-Event-ID resumes, client retry delay
+RESULTS_STREAM_HEARTBEAT = float(os.getenv("RESULTS_STREAM_HEARTBEAT", "15"))
+RESULTS_STREAM_HISTORY = int(os.getenv("RESULTS_STREAM_HISTORY", "64"))
+RESULTS_STREAM_RETRY_MS = int(os.getenv("RESULTS_STREAM_RETRY_MS", "3000"))
+
+# Poll results cache: entries are invalidated by a per-poll version bumped
+# on every committed vote and poll / option / allow-list change (also the
+# ETag validator); the TTL bounds staleness if a bump is ever lost.
+# While one worker recomputes, others may serve the previous results for
+# up to the stale TTL (see core.cache).
+RESULTS_CACHE_TTL = int(os.getenv("RESULTS_CACHE_TTL", "5"))
+RESULTS_CACHE_STALE_TTL = int(os.getenv("RESULTS_CACHE_STALE_TTL", "30"))
+# Lifetime of a per-poll version key (it restarts from a later value)
+RESULTS_VERSION_TTL = int(os.getenv("RESULTS_VERSION_TTL", str(7 * 24 * 3600)))
+
+# Public (guest) poll list pages
+POLL_LIST_CACHE_TTL = int(os.getenv("POLL_LIST_CACHE_TTL", "5"))
+POLL_LIST_CACHE_STALE_TTL = int(os.getenv("POLL_LIST_CACHE_STALE_TTL", "30"))
+
+# Shared caches (reverse proxy / CDN) in front of public responses, see
+# core.edge_cache. Raise the max age once SURROGATE_PURGER is set: purges
+# then evict changed responses. SURROGATE_PURGE_URL alone selects the
+# HTTP purger (Fastly-style Surrogate-Key POST)
+SHARED_CACHE_MAX_AGE = int(os.getenv("SHARED_CACHE_MAX_AGE", "5"))
+SHARED_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("SHARED_CACHE_STALE_WHILE_REVALIDATE", "30"))
+SURROGATE_PURGE_URL = os.getenv("SURROGATE_PURGE_URL", "")
+SURROGATE_PURGE_TOKEN = os.getenv("SURROGATE_PURGE_TOKEN", "")
+SURROGATE_PURGER = os.getenv(
+    "SURROGATE_PURGER", "core.edge_cache.HTTPPurger" if SURROGATE_PURGE_URL else ""
+)
+SURROGATE_PURGE_INTERVAL = float(os.getenv("SURROGATE_PURGE_INTERVAL", "1"))
+SURROGATE_PURGE_TIMEOUT = float(os.getenv("SURROGATE_PURGE_TIMEOUT", "2"))
+
+# Page-number totals (poll list, admin changelists): result sets above
+# the threshold report an estimated or cached count, flagged as
+# approximate (see core.pagination.EstimatedCountPaginator)
+ESTIMATED_COUNT_THRESHOLD = int(os.getenv("ESTIMATED_COUNT_THRESHOLD", "10000"))
+ESTIMATED_COUNT_CACHE_TTL = int(os.getenv("ESTIMATED_COUNT_CACHE_TTL", "60"))
+
+# Poll detail / share-link payloads: per-worker LRU (L1) in front of
+# the shared cache (L2). L1 TTL bounds staleness if an invalidation
+# broadcast is missed.
+POLL_CACHE_TTL = int(os.getenv("POLL_CACHE_TTL", "300"))
+POLL_CACHE_L1_TTL = int(os.getenv("POLL_CACHE_L1_TTL", "2"))
+POLL_CACHE_L1_SIZE = int(os.getenv("POLL_CACHE_L1_SIZE", "1024"))
+
+# Idempotency-Key on POST /api/votes/ and /api/polls/ (core.idempotency):
+# responses are replayed to retries for the TTL; a retry racing the first
+# request waits up to IDEMPOTENCY_WAIT seconds for its response
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_LOCK_TTL = int(os.getenv("IDEMPOTENCY_LOCK_TTL", "30"))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+
+# "Already voted" sets (votes.voted): per-poll Redis hash of voters,
+# used for duplicate-vote checks when REDIS_URL is set. Refreshed on
+# every vote; the TTL bounds the effect of a lost write
+VOTED_SET_TTL = int(os.getenv("VOTED_SET_TTL", str(7 * 24 * 3600)))
+# Load a poll's hash from a background thread after its first miss
+# (answered by the database); off, the backfill runs in that request
+VOTED_BACKFILL_BACKGROUND = os.getenv("VOTED_BACKFILL_BACKGROUND", "1") == "1"
+
+# Restricted-poll access sets (polls.access): per-poll members and
+# per-user allowed polls in Redis, updated as allow-lists change.
+# Grants are always confirmed against the database; VERIFY re-checks
+# cached denials too
+ACCESS_CACHE_TTL = int(os.getenv("ACCESS_CACHE_TTL", "86400"))
+ACCESS_CACHE_VERIFY = os.getenv("ACCESS_CACHE_VERIFY", "0") == "1"
+
+# Vote counter tier:
+#   "db"      → counters updated in the vote transaction (default)
+#   "redis"   → increments go to Redis, flushed to Postgres by
+#               `manage.py flush_vote_counters`
+#   "sharded" → increments go to N counter slot rows per option, folded
+#               back by `manage.py compact_vote_counters`
+VOTE_COUNTER_BACKEND = os.getenv("VOTE_COUNTER_BACKEND", "db")
+VOTE_COUNTER_FLUSH_INTERVAL = float(os.getenv("VOTE_COUNTER_FLUSH_INTERVAL", "2"))
+VOTE_COUNTER_FLUSH_BATCH_SIZE = int(os.getenv("VOTE_COUNTER_FLUSH_BATCH_SIZE", "500"))
+
+# Sharded counters: a poll that folds this many votes in one compaction
+# run gets its slot count doubled, up to VOTE_COUNTER_MAX_SLOTS
+VOTE_COUNTER_HOT_THRESHOLD = int(os.getenv("VOTE_COUNTER_HOT_THRESHOLD", "1000"))
+VOTE_COUNTER_MAX_SLOTS = int(os.getenv("VOTE_COUNTER_MAX_SLOTS", "32"))
+
+# Vote ingestion:
+#   "sync"  → POST /api/votes/ validates and inserts in the request (default)
+#   "async" → cheap checks against the poll cache, then the vote is queued
+#             (Redis stream, or an in-process queue without Redis) and
+#             acknowledged with 202 + a receipt id; `manage.py ingest_votes`
+#             inserts queued votes in batches
+VOTE_INGEST_MODE = os.getenv("VOTE_INGEST_MODE", "sync")
+VOTE_INGEST_BATCH_SIZE = int(os.getenv("VOTE_INGEST_BATCH_SIZE", "1000"))
+VOTE_INGEST_INTERVAL = float(os.getenv("VOTE_INGEST_INTERVAL", "0.2"))
+VOTE_INGEST_RECEIPT_TTL = int(os.getenv("VOTE_INGEST_RECEIPT_TTL", "86400"))
+# Unacked stream entries older than this are re-delivered to another consumer
+VOTE_INGEST_CLAIM_IDLE_MS = int(os.getenv("VOTE_INGEST_CLAIM_IDLE_MS", "60000"))
+# Entries the database refuses even on their own go to a capped stream
+VOTE_INGEST_DEAD_LETTER_MAXLEN = int(os.getenv("VOTE_INGEST_DEAD_LETTER_MAXLEN", "10000"))
+# Without Redis, drain the in-process queue from a background thread
+VOTE_INGEST_LOCAL_WORKER = os.getenv("VOTE_INGEST_LOCAL_WORKER", "1") == "1"
+
+# Bulk vote uploads (POST /api/votes/bulk/): items validated and
+# inserted per transaction
+VOTE_BULK_CHUNK_SIZE = int(os.getenv("VOTE_BULK_CHUNK_SIZE", "1000"))
+
+
 # -------------------------------------------------------------------
 # Password validation
 # -------------------------------------------------------------------
@@ -276,12 +450,21 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "idempotency-key",
+    "if-none-match",
     "origin",
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
 ]
 
+# Response headers the frontend may read
+CORS_EXPOSE_HEADERS = [
+    "x-cache",
+    "idempotent-replayed",
+    "etag",
+]
+
 # CSRF (only relevant if you ever use cookies / forms)
 CSRF_TRUSTED_ORIGINS = [
     "https://vote-x-backend.onrender.com",
@@ -13,6 +13,8 @@ from django.conf.urls.static import static
 # Exception handling imports
 from django.http import JsonResponse
 
+from core.views import CacheHealthView
+
 # Swagger schema view
 schema_view = get_schema_view(
     openapi.Info(
@@ -40,6 +42,9 @@ urlpatterns = [
     # Voting management
     path("api/votes/", include("votes.urls")),
 
+    # Cache / circuit breaker metrics (admin only)
+    path("api/health/cache/", CacheHealthView.as_view(), name="cache-health"),
+
     # Swagger
     path("api/docs/", schema_view.with_ui("swagger", cache_timeout=0), name="swagger-ui"),
     path("api/redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="redoc-ui"),
@@ -1,3 +1,27 @@
 from django.contrib import admin
 
-# Register your models here.
+from core.pagination import EstimatedCountPaginator
+from .models import Vote
+
+
+@admin.register(Vote)
+class VoteAdmin(admin.ModelAdmin):
+    list_display = ("id", "poll", "option", "user", "guest_ip", "created_at")
+    list_select_related = ("poll", "option__poll", "user")
+    list_filter = ("created_at",)
+    raw_id_fields = ("poll", "option", "user")
+
+    # The vote table is the largest one: no exact COUNT(*) per changelist page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Votes are only written through the vote services, which keep the
+    # counters, voted sets and results versions in step: browse only here
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
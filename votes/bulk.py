@@ -0,0 +1,186 @@
+"""
+Bulk vote uploads (POST /api/votes/bulk/) from kiosks and offline
+collectors.
+
+Items are read from the request stream and handled in chunks of
+VOTE_BULK_CHUNK_SIZE: each chunk is validated against poll metadata
+fetched once for the whole chunk, inserted with one statement and
+counted with one counter update, in its own transaction. Results are
+yielded per chunk, so memory stays bounded whatever the upload size.
+
+Each item is a guest vote, {"option": 12, "guest_ip": "10.0.0.5"}, plus
+an optional "ref" echoed back in its result. Votes of registered users
+can't be uploaded: an uploader could cast them in anyone's name (and
+keep them from voting). Only the poll's owner (or staff) may upload
+votes for it. A voter already recorded on the poll with the same option
+counts as persisted, so a failed upload can simply be sent again.
+"""
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from core.utils import clean_ip
+from polls.models import Poll, Option
+from .models import Vote
+from .ingest import PERSISTED, REJECTED
+from . import counters, live, results, voted
+
+
+def _check_item(item):
+    """Shape check of one uploaded item. Returns (vote, error)."""
+    if isinstance(item, Exception):
+        # Malformed line from the parser
+        return None, str(getattr(item, "detail", item))
+    if not isinstance(item, dict):
+        return None, "Expected an object."
+
+    option = item.get("option")
+    if type(option) is not int:
+        return None, "option: a valid integer is required."
+
+    if "user" in item:
+        return None, "user: only guest votes can be uploaded."
+    guest_ip = item.get("guest_ip")
+    if guest_ip is None:
+        return None, "guest_ip: this field is required."
+    # Stored normalized, as the duplicate check compares it
+    guest_ip = clean_ip(guest_ip) if isinstance(guest_ip, str) else None
+    if guest_ip is None:
+        return None, "guest_ip: enter a valid IPv4 or IPv6 address."
+
+    return {"option": option, "guest_ip": guest_ip}, None
+
+
+def _poll_error(poll, uploader):
+    """The VoteSerializer rules for a guest, applied to an uploaded vote."""
+    if poll.owner_id != uploader.id and not uploader.is_staff:
+        return "You cannot upload votes for this poll."
+    if poll.is_expired:
+        return "This poll has expired."
+    if poll.visibility != "public":
+        return "Login required to vote."
+    if not poll.allow_guest_votes:
+        return "Guest voting disabled."
+    return None
+
+
+def persist_chunk(items, uploader):
+    """
+    Validate and insert one chunk of uploaded items, given as
+    [(index, item), ...]. Returns one result dict per item, in order.
+    """
+    outcomes = {}
+    votes = {}
+    for index, item in items:
+        vote, error = _check_item(item)
+        if error:
+            outcomes[index] = (REJECTED, error)
+        else:
+            votes[index] = vote
+
+    with transaction.atomic():
+        option_polls = dict(
+            Option.objects.filter(pk__in={v["option"] for v in votes.values()})
+            .values_list("pk", "poll_id")
+        )
+        for vote in votes.values():
+            vote["poll"] = option_polls.get(vote["option"])
+
+        # Locked like an ingestion batch, so the duplicate check below
+        # sees every committed vote
+        polls = {
+            poll.pk: poll
+            for poll in Poll.objects.select_for_update()
+            .filter(pk__in={v["poll"] for v in votes.values() if v["poll"]})
+            .order_by("pk")
+            .only("id", "owner_id", "visibility", "expires_at", "allow_guest_votes")
+        }
+
+        seen = {}
+        existing = (
+            Vote.objects.filter(poll_id__in=polls, user__isnull=True)
+            .filter(guest_ip__in={v["guest_ip"] for v in votes.values()})
+            .values_list("poll_id", "option_id", "guest_ip")
+        )
+        for poll_id, option_id, guest_ip in existing:
+            seen[Vote.make_voter_key(poll_id, None, guest_ip)] = option_id
+
+        new_votes = {}
+        for index, vote in votes.items():
+            poll = polls.get(vote["poll"])
+            if poll is None:
+                outcomes[index] = (REJECTED, "Invalid option.")
+                continue
+            error = _poll_error(poll, uploader)
+            if error:
+                outcomes[index] = (REJECTED, error)
+                continue
+
+            key = Vote.make_voter_key(poll.pk, None, vote["guest_ip"])
+            if key in seen:
+                if seen[key] == vote["option"]:
+                    outcomes[index] = (PERSISTED, None)
+                else:
+                    outcomes[index] = (REJECTED, "Guest already voted.")
+                continue
+
+            seen[key] = vote["option"]
+            new_votes[index] = Vote(poll_id=poll.pk, option_id=vote["option"], guest_ip=vote["guest_ip"])
+
+        # The polls are locked: conflicts can only come from a vote
+        # inserted through the synchronous path in the meantime. Only
+        # the rows that went in are counted
+        Vote.objects.insert_many(list(new_votes.values()))
+        inserted = []
+        deltas = Counter()
+        for index, row in new_votes.items():
+            if row.pk is None:
+                outcomes[index] = (REJECTED, "Guest already voted.")
+                continue
+            inserted.append((row.poll_id, row.option_id, None, row.guest_ip))
+            deltas[(row.poll_id, row.option_id)] += 1
+            outcomes[index] = (PERSISTED, None)
+        counters.record_votes(deltas)
+
+        touched = sorted({poll_id for poll_id, _ in deltas})
+
+        def after_commit():
+            for poll_id in touched:
+                results.bump_version(poll_id)
+                live.schedule_broadcast(poll_id)
+            voted.record_many(inserted)
+
+        transaction.on_commit(after_commit)
+
+    report = []
+    for index, item in items:
+        status, detail = outcomes[index]
+        result = {"index": index, "status": status}
+        if isinstance(item, dict) and "ref" in item:
+            result["ref"] = item["ref"]
+        if detail:
+            result["detail"] = detail
+        report.append(result)
+    return report
+
+
+def process(items, uploader, chunk_size=None):
+    """
+    Persist an iterable of uploaded items chunk by chunk. Yields one
+    result per item, then {"summary": {"persisted": n, "rejected": n}}.
+    """
+    chunk_size = chunk_size or settings.VOTE_BULK_CHUNK_SIZE
+    totals = Counter({PERSISTED: 0, REJECTED: 0})
+    items = enumerate(iter(items))
+
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            break
+        for result in persist_chunk(chunk, uploader):
+            totals[result["status"]] += 1
+            yield result
+
+    yield {"summary": dict(totals)}
@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.core import checks
+
+PER_PROCESS_CACHES = {"django.core.cache.backends.locmem.LocMemCache"}
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_results_cache(app_configs, **kwargs):
+    """
+    Results versions, the ETags derived from them and the cached entries
+    keyed on them live in the default cache. A per-process cache gives
+    each gunicorn worker its own counters, so one worker could answer
+    304 for results another worker changed: refuse to start more than
+    one (gunicorn reads its worker count from WEB_CONCURRENCY).
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    workers = int(os.environ.get("WEB_CONCURRENCY") or 1)
+    if backend in PER_PROCESS_CACHES and workers > 1:
+        return [
+            checks.Error(
+                f"WEB_CONCURRENCY={workers} with a per-process cache ({backend}).",
+                hint="Set REDIS_URL so workers share results versions, or run a single worker.",
+                id="votes.E001",
+            )
+        ]
+    return []
@@ -0,0 +1,85 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.http import Http404
+
+from polls.access import can_view
+from polls.cache import get_poll_entry
+from .live import results_group
+from .results import get_results, get_version
+
+# Application close codes (4000-4999)
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+# --------------------------------------
+# LIVE RESULTS  (ws/polls/<poll_id>/results/)
+# --------------------------------------
+class PollResultsConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Sends the poll's results on connect, then every (coalesced) update.
+    Subscribing follows the same visibility rules as the poll detail view;
+    they are checked again whenever a change could revoke access.
+    """
+
+    group_name = None
+
+    async def connect(self):
+        poll_id = self.scope["url_route"]["kwargs"]["poll_id"]
+
+        # Accept first so the client gets a meaningful close code
+        await self.accept()
+
+        if not await self._check_access(poll_id):
+            return
+
+        self.group_name = results_group(poll_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+
+        version = await database_sync_to_async(get_version)(poll_id)
+        data, _ = await database_sync_to_async(get_results)(poll_id)
+        await self.send_json({"type": "results", "version": version, "results": data})
+
+    async def dispatch(self, message):
+        # Pushes don't touch the database: skip the per-message
+        # close_old_connections() thread hop channels does by default
+        if message["type"] == "results.update":
+            await self.results_update(message)
+            return
+        await super().dispatch(message)
+
+    async def _check_access(self, poll_id):
+        """Close the socket, and return False, if the user can't view the poll."""
+        try:
+            entry = await database_sync_to_async(get_poll_entry)(poll_id)
+        except Http404:
+            await self.close(code=CLOSE_NOT_FOUND)
+            return False
+
+        if not await database_sync_to_async(can_view)(entry, self.scope.get("user")):
+            await self.close(code=CLOSE_FORBIDDEN)
+            return False
+        return True
+
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Read-only feed
+        pass
+
+    async def results_update(self, event):
+        await self.send_json({
+            "type": "results",
+            "version": event.get("version"),
+            "results": event["results"],
+        })
+
+    async def results_access(self, event):
+        # The poll changed visibility, was deleted or lost allow-list
+        # members (votes.live.recheck_access)
+        poll_id = self.scope["url_route"]["kwargs"]["poll_id"]
+        if not await self._check_access(poll_id):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            self.group_name = None
@@ -0,0 +1,237 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, prefetch_related_objects
+
+from core.redis import get_redis, guarded
+from core.utils import bulk_increment
+from polls.models import Poll, Option
+from .models import Vote, OptionCounterSlot
+from . import redis_counters, sharded_counters
+
+
+def get_backend():
+    """The active counter backend: "db", "redis" or "sharded"."""
+    backend = settings.VOTE_COUNTER_BACKEND
+    if backend == "redis" and get_redis() is None:
+        return "db"
+    return backend
+
+
+def redis_enabled():
+    return get_backend() == "redis"
+
+
+# ---------------------------------------------
+# WRITE PATH
+# ---------------------------------------------
+def record_vote(option):
+    """
+    Bump the counters for a freshly inserted vote.
+    Must run inside the same transaction as the Vote insert.
+    """
+    backend = get_backend()
+
+    if backend == "redis":
+        # Only count votes that actually commit; the flusher
+        # writes them back to the columns below.
+        poll_id, option_id = option.poll_id, option.pk
+        transaction.on_commit(lambda: _redis_incr(poll_id, option_id))
+        return
+
+    if backend == "sharded":
+        sharded_counters.incr(option.pk, option.poll.counter_slots)
+        return
+
+    _db_incr(option.poll_id, option.pk)
+
+
+def record_votes(deltas):
+    """
+    Bump the counters for a batch of freshly inserted votes, given as
+    {(poll_id, option_id): votes}. Same transaction rules as record_vote.
+    """
+    deltas = {key: n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+    backend = get_backend()
+
+    if backend == "redis":
+        def incr_all():
+            for (poll_id, option_id), n in deltas.items():
+                _redis_incr(poll_id, option_id, n)
+
+        transaction.on_commit(incr_all)
+        return
+
+    if backend == "sharded":
+        slots = dict(
+            Poll.objects.filter(pk__in={poll_id for poll_id, _ in deltas})
+            .values_list("pk", "counter_slots")
+        )
+        for (poll_id, option_id), n in deltas.items():
+            sharded_counters.incr(option_id, slots.get(poll_id, 1), n)
+        return
+
+    _db_incr_many(deltas)
+
+
+def record_deletions(deltas):
+    """
+    Take deleted votes, given as {(poll_id, option_id): votes}, off the
+    counters. Must run inside the transaction deleting them.
+    """
+    deltas = {key: -n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+
+    if get_backend() == "sharded":
+        # Slots can't go below zero: fold them into the columns first
+        sharded_counters.compact(poll_ids={poll_id for poll_id, _ in deltas})
+        _db_incr_many(deltas)
+        return
+
+    # The Redis tier keeps negative deltas like any other until the flush
+    record_votes(deltas)
+
+
+def _db_incr_many(deltas):
+    poll_deltas = Counter()
+    for (poll_id, _), n in deltas.items():
+        poll_deltas[poll_id] += n
+    bulk_increment(Option, "vote_count", {option_id: n for (_, option_id), n in deltas.items()})
+    bulk_increment(Poll, "total_votes", poll_deltas)
+
+
+def _db_incr(poll_id, option_id, n=1):
+    Option.objects.filter(pk=option_id).update(vote_count=F("vote_count") + n)
+    Poll.objects.filter(pk=poll_id).update(total_votes=F("total_votes") + n)
+
+
+def _redis_incr(poll_id, option_id, n=1):
+    if not guarded(redis_counters.incr, poll_id, option_id, n, fallback=False):
+        # Redis is down: count straight into the columns instead
+        _db_incr(poll_id, option_id, n)
+
+
+# ---------------------------------------------
+# READ PATH
+# ---------------------------------------------
+def pending_deltas(poll_ids):
+    """
+    Increments not yet folded into the counter columns:
+    {poll_id: {"total": n, option_id: n, ...}}
+    """
+    backend = get_backend()
+    if backend == "redis":
+        # Without Redis, readers get the flushed columns only
+        return guarded(redis_counters.pending_deltas, poll_ids, fallback={})
+    if backend == "sharded":
+        return sharded_counters.pending_deltas(poll_ids)
+    return {}
+
+
+def apply_tallies(polls):
+    """
+    Overlay increments still sitting in the Redis tier or the counter
+    slots onto the in-memory Poll.total_votes / Option.vote_count of
+    `polls`. No-op with the "db" backend.
+    """
+    polls = [p for p in polls if not getattr(p, "_tallies_applied", False)]
+    if not polls or get_backend() == "db":
+        return
+
+    prefetch_related_objects(polls, "options")
+    deltas = pending_deltas([p.pk for p in polls])
+
+    for poll in polls:
+        poll._tallies_applied = True
+        delta = deltas.get(poll.pk)
+        if not delta:
+            continue
+        poll.total_votes += delta.get("total", 0)
+        for option in poll.options.all():
+            option.vote_count += delta.get(option.pk, 0)
+
+
+# ---------------------------------------------
+# REBUILD / RECONCILE
+# ---------------------------------------------
+def _rebuild_chunk(chunk, dry_run):
+    chunk_ids = [pk for pk, _ in chunk]
+
+    # Hold the counter slots while recounting so no slotted vote
+    # lands between the recount and the reset below
+    slots = list(
+        OptionCounterSlot.objects.select_for_update(of=("self",))
+        .filter(option__poll_id__in=chunk_ids, count__gt=0)
+        .values_list("pk", flat=True)
+    )
+
+    actual = dict(
+        Vote.objects.filter(poll_id__in=chunk_ids)
+        .values("option_id")
+        .annotate(n=Count("id"))
+        .values_list("option_id", "n")
+    )
+
+    poll_totals = {pk: 0 for pk in chunk_ids}
+    stale_options = []
+    for option in Option.objects.filter(poll_id__in=chunk_ids).only(
+        "id", "poll_id", "vote_count"
+    ):
+        count = actual.get(option.id, 0)
+        poll_totals[option.poll_id] += count
+        if option.vote_count != count:
+            option.vote_count = count
+            stale_options.append(option)
+
+    stale_polls = [
+        Poll(pk=pk, total_votes=poll_totals[pk])
+        for pk, stored in chunk
+        if stored != poll_totals[pk]
+    ]
+
+    if not dry_run:
+        Option.objects.bulk_update(stale_options, ["vote_count"])
+        Poll.objects.bulk_update(stale_polls, ["total_votes"])
+        OptionCounterSlot.objects.filter(pk__in=slots).update(count=0)
+
+    return len(stale_options), len(stale_polls)
+
+
+def rebuild_counts(poll_ids=None, chunk_size=500, dry_run=False):
+    """
+    Recount votes from the Vote table and fix any drifted counters.
+    Works through polls in chunks so it can run against a live table.
+
+    Counter slots of the recounted polls are reset in the same
+    transaction. With the "redis" backend, run `flush_vote_counters --once`
+    first: increments still pending in Redis would otherwise be counted twice.
+
+    Returns a tuple (options_fixed, polls_fixed).
+    """
+    polls = Poll.objects.order_by("pk")
+    if poll_ids:
+        polls = polls.filter(pk__in=poll_ids)
+
+    options_fixed = 0
+    polls_fixed = 0
+    last_pk = 0
+
+    while True:
+        chunk = list(
+            polls.filter(pk__gt=last_pk).values_list("pk", "total_votes")[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+
+        with transaction.atomic():
+            fixed = _rebuild_chunk(chunk, dry_run)
+
+        options_fixed += fixed[0]
+        polls_fixed += fixed[1]
+
+    return options_fixed, polls_fixed
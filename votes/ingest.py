@@ -0,0 +1,451 @@
+"""
+Asynchronous vote ingestion (VOTE_INGEST_MODE = "async").
+
+POST /api/votes/ only runs the checks that can be answered from the poll
+cache (VoteIngestSerializer), appends the vote to a queue and answers
+202 with a receipt id. A consumer drains the queue in large batches:
+one transaction per batch, one duplicate check per batch, one
+`bulk_create`, one counter update.
+
+Queue: a Redis stream read through a consumer group. Entries are acked
+(and deleted) only once their batch has committed, so the batch of a
+consumer that dies mid-way is claimed by another one after
+VOTE_INGEST_CLAIM_IDLE_MS. Without Redis, an in-process queue drained
+by a background thread stands in for development.
+
+One vote per poll is enforced by the consumer, under a row lock on the
+batch's polls; the unique constraints on Vote stay the final guard: rows
+they turn away (a racing synchronous vote) are reported as duplicates and
+never counted. Receipt statuses live in the shared cache for
+VOTE_INGEST_RECEIPT_TTL.
+
+A batch the database refuses (bad data) is retried one entry at a time;
+entries that still fail are dead-lettered (VOTE_INGEST_DEAD_LETTER_KEY on
+Redis, logged either way) and their receipts rejected, so one bad entry
+neither holds its batch back nor comes back forever.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+
+from core.redis import get_redis, guarded
+from core.utils import clean_ip
+from polls.models import Poll, Option
+from .models import Vote
+from . import counters, live, results, voted
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "votex:votes:ingest"
+DEAD_LETTER_KEY = "votex:votes:ingest:dead"
+GROUP = "votex-ingest"
+
+QUEUED = "queued"
+PERSISTED = "persisted"
+REJECTED = "rejected"
+DUPLICATE = "duplicate"
+
+# Errors caused by an entry itself rather than by the database being down
+BAD_ENTRY_ERRORS = (DataError, IntegrityError, KeyError, TypeError, ValueError)
+
+
+def _receipt_key(receipt_id):
+    return f"votex:vote-receipt:{receipt_id}"
+
+
+def _option_poll_key(option_id):
+    return f"votex:option:{option_id}:poll"
+
+
+def ingest_enabled():
+    return settings.VOTE_INGEST_MODE == "async"
+
+
+def consumer_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+# ---------------------------------------------
+# QUEUES
+# ---------------------------------------------
+class RedisStreamQueue:
+    """Redis stream + consumer group; entries are deleted once acked."""
+
+    def __init__(self, client):
+        self.r = client
+        self._group_ready = False
+
+    def append(self, fields):
+        self.r.xadd(STREAM_KEY, fields)
+        return True
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.r.xgroup_create(STREAM_KEY, GROUP, id="0", mkstream=True)
+        except redis.ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+        self._group_ready = True
+
+    def read(self, consumer, count):
+        self._ensure_group()
+
+        # Entries a dead consumer read but never acked come first
+        claimed = self.r.xautoclaim(
+            STREAM_KEY,
+            GROUP,
+            consumer,
+            min_idle_time=settings.VOTE_INGEST_CLAIM_IDLE_MS,
+            start_id="0-0",
+            count=count,
+        )[1]
+        claimed = [(msg_id, fields) for msg_id, fields in claimed if fields]
+        if claimed:
+            return claimed
+
+        # Non-blocking: the shared client's socket timeout is short
+        response = self.r.xreadgroup(GROUP, consumer, {STREAM_KEY: ">"}, count=count)
+        return response[0][1] if response else []
+
+    def ack(self, msg_ids):
+        if not msg_ids:
+            return
+        pipe = self.r.pipeline(transaction=False)
+        pipe.xack(STREAM_KEY, GROUP, *msg_ids)
+        pipe.xdel(STREAM_KEY, *msg_ids)
+        pipe.execute()
+
+    def dead_letter(self, fields):
+        self.r.xadd(DEAD_LETTER_KEY, fields, maxlen=settings.VOTE_INGEST_DEAD_LETTER_MAXLEN, approximate=True)
+
+
+class LocalQueue:
+    """
+    In-process stand-in for the stream. Votes still in it are lost if
+    the process dies: development and tests only.
+    """
+
+    def __init__(self):
+        self._items = deque()
+        # Read but not acked yet: handed out again until they are
+        self._pending = {}
+        self.dead = deque(maxlen=1000)
+
+    def append(self, fields):
+        self._items.append((uuid.uuid4().hex, fields))
+
+    def read(self, consumer, count):
+        batch = list(self._pending.items())[:count]
+        while self._items and len(batch) < count:
+            msg_id, fields = self._items.popleft()
+            self._pending[msg_id] = fields
+            batch.append((msg_id, fields))
+        return batch
+
+    def ack(self, msg_ids):
+        for msg_id in msg_ids:
+            self._pending.pop(msg_id, None)
+
+    def dead_letter(self, fields):
+        self.dead.append(fields)
+
+    def clear(self):
+        self._items.clear()
+        self._pending.clear()
+        self.dead.clear()
+
+    def __len__(self):
+        return len(self._items) + len(self._pending)
+
+
+local_queue = LocalQueue()
+
+
+def get_queue():
+    client = get_redis()
+    return RedisStreamQueue(client) if client is not None else local_queue
+
+
+# ---------------------------------------------
+# ENQUEUE
+# ---------------------------------------------
+def poll_id_for_option(option_id):
+    """Cached option → poll lookup (an option never moves). None if unknown."""
+    key = _option_poll_key(option_id)
+    poll_id = cache.get(key)
+    if poll_id is None:
+        poll_id = (
+            Option.objects.filter(pk=option_id)
+            .values_list("poll_id", flat=True)
+            .first()
+        )
+        if poll_id is None:
+            return None
+        cache.set(key, poll_id, timeout=None)
+    return poll_id
+
+
+def enqueue(poll_id, option_id, user_id=None, guest_ip=None):
+    """
+    Queue a validated vote and return its receipt id, or None if the
+    queue is unavailable (the caller falls back to the synchronous path).
+    Raises ValueError for a `guest_ip` that isn't an IP address.
+    """
+    if guest_ip is not None:
+        cleaned = clean_ip(guest_ip)
+        if cleaned is None:
+            raise ValueError(f"Invalid guest IP: {guest_ip!r}")
+        guest_ip = cleaned
+
+    receipt_id = uuid.uuid4().hex
+    fields = {
+        "receipt": receipt_id,
+        "poll": poll_id,
+        "option": option_id,
+        "user": user_id or "",
+        "guest_ip": guest_ip or "",
+    }
+
+    # Recorded before the append so a fast consumer's status isn't overwritten
+    set_receipt(receipt_id, QUEUED, poll=poll_id, option=option_id)
+
+    queue = get_queue()
+    if isinstance(queue, RedisStreamQueue):
+        if not guarded(queue.append, fields, fallback=False):
+            cache.delete(_receipt_key(receipt_id))
+            return None
+    else:
+        queue.append(fields)
+        start_local_worker()
+
+    return receipt_id
+
+
+# ---------------------------------------------
+# RECEIPTS
+# ---------------------------------------------
+def set_receipt(receipt_id, status, **extra):
+    cache.set(
+        _receipt_key(receipt_id),
+        {"status": status, **extra},
+        timeout=settings.VOTE_INGEST_RECEIPT_TTL,
+    )
+
+
+def get_receipt(receipt_id):
+    """{"status": ..., "poll": ..., "option": ...[, "detail": ...]} or None."""
+    return cache.get(_receipt_key(receipt_id))
+
+
+# ---------------------------------------------
+# CONSUMER
+# ---------------------------------------------
+def _decode(fields):
+    return {
+        "receipt": fields["receipt"],
+        "poll": int(fields["poll"]),
+        "option": int(fields["option"]),
+        "user": int(fields["user"]) if fields.get("user") else None,
+        "guest_ip": fields.get("guest_ip") or None,
+    }
+
+
+def _voter_key(vote):
+    return Vote.make_voter_key(vote["poll"], vote["user"], vote["guest_ip"])
+
+
+def _already_voted(vote):
+    return "You already voted." if vote["user"] is not None else "Guest already voted."
+
+
+def persist_batch(entries):
+    """
+    Insert one batch of queued votes. Returns {receipt_id: (status, detail)}.
+
+    A voter already recorded for the poll with the same option counts as
+    persisted (a retried request); with another option it is rejected.
+    A vote the constraints turn away at insert time is a duplicate.
+    """
+    votes = [_decode(fields) for fields in entries]
+    poll_ids = sorted({v["poll"] for v in votes})
+    outcomes = {}
+
+    with transaction.atomic():
+        # Consumers working on the same polls queue here, so the
+        # duplicate check below sees every committed vote
+        live_polls = set(
+            Poll.objects.select_for_update()
+            .filter(pk__in=poll_ids)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        option_polls = dict(
+            Option.objects.filter(pk__in={v["option"] for v in votes})
+            .values_list("pk", "poll_id")
+        )
+
+        user_ids = {v["user"] for v in votes if v["user"] is not None}
+        guest_ips = {v["guest_ip"] for v in votes if v["user"] is None}
+        existing = (
+            Vote.objects.filter(poll_id__in=live_polls)
+            .filter(Q(user_id__in=user_ids) | Q(user__isnull=True, guest_ip__in=guest_ips))
+            .values_list("poll_id", "option_id", "user_id", "guest_ip")
+        )
+        seen = {}
+        for poll_id, option_id, user_id, guest_ip in existing:
+            seen[Vote.make_voter_key(poll_id, user_id, guest_ip)] = option_id
+
+        new_votes = {}
+        for vote in votes:
+            receipt_id = vote["receipt"]
+            if vote["poll"] not in live_polls:
+                outcomes[receipt_id] = (REJECTED, "Poll not found.")
+                continue
+            if option_polls.get(vote["option"]) != vote["poll"]:
+                outcomes[receipt_id] = (REJECTED, "Invalid option.")
+                continue
+
+            key = _voter_key(vote)
+            # Guests without an address are never duplicates (see votes.voted)
+            if vote["user"] is None and vote["guest_ip"] is None:
+                key = ("receipt", receipt_id)
+            if key in seen:
+                if seen[key] == vote["option"]:
+                    outcomes[receipt_id] = (PERSISTED, None)
+                else:
+                    outcomes[receipt_id] = (REJECTED, _already_voted(vote))
+                continue
+
+            seen[key] = vote["option"]
+            new_votes[receipt_id] = Vote(
+                poll_id=vote["poll"],
+                option_id=vote["option"],
+                user_id=vote["user"],
+                guest_ip=vote["guest_ip"],
+            )
+
+        # Conflicts can only come from a racing synchronous insert (queue
+        # fallback): only the rows that went in are counted and persisted
+        Vote.objects.insert_many(list(new_votes.values()))
+        inserted = []
+        deltas = Counter()
+        votes_by_receipt = {v["receipt"]: v for v in votes}
+        for receipt_id, row in new_votes.items():
+            if row.pk is None:
+                outcomes[receipt_id] = (DUPLICATE, _already_voted(votes_by_receipt[receipt_id]))
+                continue
+            inserted.append((row.poll_id, row.option_id, row.user_id, row.guest_ip))
+            deltas[(row.poll_id, row.option_id)] += 1
+            outcomes[receipt_id] = (PERSISTED, None)
+        counters.record_votes(deltas)
+
+        touched = sorted({poll_id for poll_id, _ in deltas})
+
+        def after_commit():
+            for poll_id in touched:
+                results.bump_version(poll_id)
+                live.schedule_broadcast(poll_id)
+            voted.record_many(inserted)
+            cache.set_many(
+                {
+                    _receipt_key(receipt_id): {
+                        "status": status,
+                        "poll": votes_by_receipt[receipt_id]["poll"],
+                        "option": votes_by_receipt[receipt_id]["option"],
+                        **({"detail": detail} if detail else {}),
+                    }
+                    for receipt_id, (status, detail) in outcomes.items()
+                },
+                timeout=settings.VOTE_INGEST_RECEIPT_TTL,
+            )
+
+        transaction.on_commit(after_commit)
+
+    return outcomes
+
+
+def consume(queue=None, consumer=None, batch_size=None):
+    """
+    Read, persist and ack one batch. Returns the number of entries handled;
+    fewer than batch_size means the queue is drained for now.
+    """
+    queue = queue or get_queue()
+    consumer = consumer or consumer_name()
+    batch_size = batch_size or settings.VOTE_INGEST_BATCH_SIZE
+
+    messages = queue.read(consumer, batch_size)
+    if not messages:
+        return 0
+
+    try:
+        persist_batch([fields for _, fields in messages])
+    except BAD_ENTRY_ERRORS:
+        logger.warning("Vote batch of %d failed; retrying its entries one by one", len(messages), exc_info=True)
+        for _, fields in messages:
+            _persist_or_dead_letter(queue, fields)
+    queue.ack([msg_id for msg_id, _ in messages])
+    return len(messages)
+
+
+def _persist_or_dead_letter(queue, fields):
+    try:
+        persist_batch([fields])
+    except BAD_ENTRY_ERRORS:
+        logger.error("Dead-lettering queued vote %r", fields, exc_info=True)
+        queue.dead_letter(fields)
+        if fields.get("receipt"):
+            set_receipt(fields["receipt"], REJECTED, detail="Vote could not be recorded.")
+
+
+def drain(queue=None, consumer=None, batch_size=None):
+    """Consume until the queue is empty. Returns the number of entries handled."""
+    batch_size = batch_size or settings.VOTE_INGEST_BATCH_SIZE
+    handled = 0
+    while True:
+        n = consume(queue, consumer, batch_size)
+        handled += n
+        if n < batch_size:
+            return handled
+
+
+# ---------------------------------------------
+# LOCAL WORKER (no Redis)
+# ---------------------------------------------
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _run_local_worker():
+    while True:
+        try:
+            if not drain(local_queue):
+                time.sleep(settings.VOTE_INGEST_INTERVAL)
+        except Exception:
+            # The batch stays pending and is retried
+            logger.exception("Local vote ingestion worker failed a batch")
+            time.sleep(settings.VOTE_INGEST_INTERVAL)
+        finally:
+            close_old_connections()
+
+
+def start_local_worker():
+    global _worker
+
+    if _worker is not None or not settings.VOTE_INGEST_LOCAL_WORKER:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_local_worker, name="vote-ingest", daemon=True)
+            _worker.start()
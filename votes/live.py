@@ -0,0 +1,122 @@
+"""
+Live results broadcasts for the WebSocket feed (votes.consumers).
+
+Committed votes schedule a push of the poll's results to its channel
+group. Pushes are coalesced to at most one per poll per
+RESULTS_BROADCAST_INTERVAL: the first vote of a window claims a shared
+flag (cache.add, so this holds across workers) and sends the latest
+results when the window closes; votes arriving meanwhile ride along.
+A per-process flag is claimed first, so while the cache is unavailable
+(cache.add then always succeeds) each worker still keeps one timer per
+poll.
+
+Subscribers are only checked against the poll's visibility when they
+join: a change that can take access away (poll saved or deleted, users
+leaving its allow-list) asks every subscriber to check again.
+"""
+import logging
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+
+from core.cache import STALE
+from .results import compute_results, get_results, get_version
+
+logger = logging.getLogger(__name__)
+
+
+def results_group(poll_id):
+    return f"poll_{poll_id}_results"
+
+
+def _pending_key(poll_id):
+    return f"votex:poll:{poll_id}:broadcast-pending"
+
+
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def schedule_broadcast(poll_id):
+    """Push results for poll_id to subscribers, coalesced per interval."""
+    if get_channel_layer() is None:
+        return
+
+    interval = settings.RESULTS_BROADCAST_INTERVAL
+    if interval <= 0:
+        broadcast(poll_id)
+        return
+
+    with _pending_lock:
+        if poll_id in _pending:
+            return
+        _pending.add(poll_id)
+
+    try:
+        # The flag outlives the window so a stalled timer can't block
+        # broadcasts for long; it's cleared as soon as the timer fires
+        if not cache.add(_pending_key(poll_id), 1, timeout=int(interval) + 5):
+            _release(poll_id)
+            return
+
+        timer = threading.Timer(interval, _broadcast_later, args=(poll_id,))
+        timer.daemon = True
+        timer.start()
+    except BaseException:
+        _release(poll_id)
+        raise
+
+
+def _release(poll_id):
+    with _pending_lock:
+        _pending.discard(poll_id)
+
+
+def _broadcast_later(poll_id):
+    try:
+        broadcast(poll_id)
+    finally:
+        connection.close()
+
+
+def broadcast(poll_id):
+    # Clear the flags first: votes committed while we read the results
+    # schedule the next push instead of being dropped
+    _release(poll_id)
+    cache.delete(_pending_key(poll_id))
+
+    try:
+        # Read the version first: the results are at least that fresh
+        version = get_version(poll_id)
+        data, status = get_results(poll_id)
+        if status == STALE:
+            # Another worker is recomputing; don't label the previous
+            # results with the new version
+            data = compute_results(poll_id)
+    except Http404:
+        return
+
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            results_group(poll_id),
+            {"type": "results.update", "version": version, "results": data},
+        )
+    except Exception:
+        # Subscribers catch up on the next vote; never fail the caller
+        logger.warning("Results broadcast for poll %s failed", poll_id, exc_info=True)
+
+
+def recheck_access(poll_id):
+    """Have poll_id's subscribers re-check they may still view it."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(results_group(poll_id), {"type": "results.access"})
+    except Exception:
+        logger.warning("Access re-check for poll %s failed", poll_id, exc_info=True)
@@ -0,0 +1,75 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users.models import User
+from polls.models import Poll, Option
+from votes.models import Vote
+from votes import sharded_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark vote throughput on a single hot option with 1 counter "
+        "slot vs many, using parallel workers. Run against Postgres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--votes", type=int, default=200, help="Votes per worker.")
+        parser.add_argument(
+            "--slots",
+            type=int,
+            nargs="+",
+            default=[1, 16],
+            help="Slot counts to compare.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING(
+                "SQLite serializes all writes; numbers will not reflect row-lock contention."
+            ))
+
+        owner = User.objects.create_user(
+            username=f"bench-{uuid.uuid4().hex[:8]}",
+            email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+        )
+        try:
+            self.stdout.write(f"{'slots':>6} {'workers':>8} {'votes':>8} {'seconds':>9} {'votes/s':>10}")
+            for slots in options["slots"]:
+                elapsed, total = self._run(owner, slots, options["workers"], options["votes"])
+                self.stdout.write(
+                    f"{slots:>6} {options['workers']:>8} {total:>8} {elapsed:>9.2f} {total / elapsed:>10.1f}"
+                )
+        finally:
+            owner.delete()  # cascades to the bench polls, options and votes
+
+    def _run(self, owner, slots, workers, votes_per_worker):
+        poll = Poll.objects.create(
+            owner=owner, title="Counter slot benchmark", counter_slots=slots
+        )
+        option = Option.objects.create(poll=poll, text="Hot option")
+        barrier = threading.Barrier(workers)
+
+        def worker(n):
+            try:
+                barrier.wait()
+                for i in range(votes_per_worker):
+                    # Same shape as a vote: insert + counter bump, one transaction
+                    with transaction.atomic():
+                        Vote.objects.create(option=option, guest_ip=f"fd00::{n:x}:{i:x}")
+                        sharded_counters.incr(option.pk, slots)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(worker, range(workers)))
+        elapsed = time.perf_counter() - started
+
+        return elapsed, workers * votes_per_worker
@@ -0,0 +1,381 @@
+import asyncio
+import bisect
+import gc
+import json
+import os
+import platform
+import resource
+import time
+import uuid
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from core.utils import percentile
+from users.models import User
+from polls.models import Poll, Option
+from votes.live import results_group
+from votes.results import get_version
+from votes.views import VoteCreateView
+
+# Metrics compared against --baseline, and which direction is worse
+COMPARED = {
+    "latency_p50_ms": "higher",
+    "latency_p99_ms": "higher",
+    "messages_per_sec": "lower",
+    "delivery_ratio": "lower",
+    "memory_per_connection_kib": "higher",
+}
+
+
+class LoopTimer:
+    """
+    threading.Timer for votes.live, firing on the bench's event loop (the
+    callback itself runs in a worker thread, as under the ASGI server):
+    the in-memory channel layer only wakes receivers on its own loop.
+    """
+    loop = None
+    pending = set()  # timers started and not done yet
+
+    def __init__(self, interval, function, args=()):
+        self.interval, self.function, self.args = interval, function, args
+        self.daemon = True
+
+    def start(self):
+        self.loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        done = self.loop.create_future()
+        self.pending.add(done)
+        done.add_done_callback(self.pending.discard)
+        self.loop.call_later(self.interval, self._fire, done)
+
+    def _fire(self, done):
+        task = asyncio.ensure_future(sync_to_async(self.function, thread_sensitive=False)(*self.args))
+        task.add_done_callback(lambda _: done.set_result(None))
+
+    @classmethod
+    async def join(cls):
+        while cls.pending:
+            await asyncio.gather(*cls.pending)
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the live results WebSocket: open many in-process subscribers "
+        "through the ASGI routing, cast paced guest votes through POST /api/votes/ "
+        "so results are pushed by the coalescing broadcaster, and report "
+        "vote-to-subscriber latency, message rate and memory per connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=1000)
+        parser.add_argument("--votes", type=int, default=100, help="Votes to cast.")
+        parser.add_argument("--rate", type=float, default=20, help="Votes per second.")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.RESULTS_BROADCAST_INTERVAL,
+            help="RESULTS_BROADCAST_INTERVAL for the run (0 pushes on every vote).",
+        )
+        parser.add_argument("--layer", choices=["memory", "redis"], default="memory")
+        parser.add_argument(
+            "--redis-url",
+            default=settings.REDIS_URL or "redis://localhost:6379/0",
+            help="Channel layer Redis for --layer redis.",
+        )
+        parser.add_argument(
+            "--connect-batch",
+            type=int,
+            default=200,
+            help="Subscribers connecting concurrently.",
+        )
+        parser.add_argument(
+            "--drain",
+            type=float,
+            default=5,
+            help="Seconds a subscriber waits for a missing push before giving up.",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=5,
+            help="Leading votes cast but left out of the statistics.",
+        )
+        parser.add_argument("--json", dest="json_path", help="Write the report to this file.")
+        parser.add_argument("--baseline", help="Compare against a report written by --json.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.10,
+            help="Relative change vs the baseline flagged as a regression.",
+        )
+
+    def handle(self, *args, **options):
+        if options["subscribers"] < 1 or options["votes"] < 1 or options["rate"] <= 0:
+            raise CommandError("--subscribers, --votes and --rate must be positive.")
+        if options["interval"] < 0:
+            raise CommandError("--interval can't be negative.")
+
+        if options["layer"] == "redis":
+            layers = {
+                "default": {
+                    "BACKEND": "channels_redis.core.RedisChannelLayer",
+                    "CONFIG": {"hosts": [options["redis_url"]]},
+                }
+            }
+        else:
+            layers = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+        owner = User.objects.create_user(
+            username=f"bench-{uuid.uuid4().hex[:8]}",
+            email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+        )
+        try:
+            poll = Poll.objects.create(owner=owner, title="Live results benchmark", allow_guest_votes=True)
+            option_ids = [Option.objects.create(poll=poll, text=text).pk for text in "ABCD"]
+
+            with override_settings(CHANNEL_LAYERS=layers, RESULTS_BROADCAST_INTERVAL=options["interval"]), \
+                    mock.patch("votes.live.threading.Timer", LoopTimer):
+                metrics = asyncio.run(self._bench(poll.pk, option_ids, options))
+        finally:
+            owner.delete()  # cascades to the bench poll, options and votes
+
+        report = {
+            "params": {
+                key: options[key]
+                for key in ("subscribers", "votes", "rate", "interval", "layer", "connect_batch", "warmup")
+            },
+            "env": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "database": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+            },
+            "metrics": metrics,
+        }
+        self._print(report)
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Report written to {options['json_path']}")
+
+        if options["baseline"]:
+            self._compare(report, options["baseline"], options["tolerance"])
+
+    # ---------------------------------------------
+    # RUN
+    # ---------------------------------------------
+    async def _bench(self, poll_id, option_ids, options):
+        from asgi import application
+
+        LoopTimer.loop = asyncio.get_running_loop()
+        path = f"/ws/polls/{poll_id}/results/"
+        n = options["subscribers"]
+        warmup = options["warmup"]
+        total_votes = warmup + options["votes"]
+
+        gc.collect()
+        rss_before = rss_bytes()
+
+        # Connect in batches; every subscriber gets its snapshot first
+        communicators = []
+        connect_started = time.perf_counter()
+        for start in range(0, n, options["connect_batch"]):
+            batch = [
+                WebsocketCommunicator(application, path)
+                for _ in range(min(options["connect_batch"], n - start))
+            ]
+            results = await asyncio.gather(*(c.connect(timeout=30) for c in batch))
+            if not all(connected for connected, _ in results):
+                raise CommandError("A subscriber was refused; is the bench poll visible?")
+            await asyncio.gather(*(c.receive_json_from(timeout=30) for c in batch))
+            communicators.extend(batch)
+        connect_seconds = time.perf_counter() - connect_started
+
+        gc.collect()
+        rss_connected = rss_bytes()
+
+        # Vote i started at voted_at[i] and left the poll at versions[i]
+        voted_at = []
+        versions = []
+
+        async def subscriber(communicator):
+            received = []
+            try:
+                while True:
+                    message = await communicator.receive_json_from(timeout=options["drain"])
+                    if message["version"] is None:
+                        break  # end of the run
+                    received.append((time.perf_counter(), message["version"]))
+            except asyncio.TimeoutError:
+                pass
+            return received
+
+        view = VoteCreateView.as_view(throttle_classes=())
+        factory = APIRequestFactory()
+
+        def cast(i):
+            request = factory.post(
+                "/api/votes/",
+                {"option": option_ids[i % len(option_ids)]},
+                format="json",
+                REMOTE_ADDR=f"fd00::{i:x}",  # one guest per vote
+            )
+            response = view(request)
+            if response.status_code != 201:
+                raise CommandError(f"Vote failed ({response.status_code}): {response.data}")
+            return get_version(poll_id)
+
+        def close():
+            connection.close()
+
+        async def drive():
+            interval = 1 / options["rate"]
+            started = time.perf_counter()
+            try:
+                for i in range(total_votes):
+                    # Fixed schedule, so a slow fan-out shows up as latency
+                    # rather than as a lower offered rate
+                    delay = started + i * interval - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    voted_at.append(time.perf_counter())
+                    versions.append(await sync_to_async(cast)(i))
+            finally:
+                await sync_to_async(close)()
+
+            # Once the last coalesced push is out, tell subscribers to stop
+            await LoopTimer.join()
+            await get_channel_layer().group_send(
+                results_group(poll_id), {"type": "results.update", "version": None, "results": None}
+            )
+
+        # Collector pauses would show up as latency spikes
+        gc.disable()
+        try:
+            listeners = [asyncio.create_task(subscriber(c)) for c in communicators]
+            await drive()
+            received = await asyncio.gather(*listeners)
+        finally:
+            gc.enable()
+
+        for communicator in communicators:
+            try:
+                await communicator.disconnect(timeout=1)
+            except (Exception, asyncio.CancelledError):
+                pass  # timed-out subscribers were already torn down
+
+        # A push shows every vote up to its version: each vote's latency
+        # is until the first push to a subscriber that includes it
+        latencies = []
+        messages = 0
+        last_receive = None
+        for pushes in received:
+            seen = 0
+            for received_at, version in pushes:
+                covered = bisect.bisect_right(versions, version)
+                latencies.extend(received_at - voted_at[i] for i in range(max(seen, warmup), covered))
+                seen = max(seen, covered)
+                if covered > warmup:
+                    messages += 1
+                    last_receive = received_at if last_receive is None else max(last_receive, received_at)
+
+        latencies.sort()
+        expected = n * options["votes"]
+        elapsed = (last_receive - voted_at[warmup]) if last_receive else None
+        # Keeping up, the last push goes out one interval after the last vote
+        on_time = (options["votes"] - 1) / options["rate"] + options["interval"]
+
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "connect_seconds": round(connect_seconds, 3),
+            "connects_per_sec": round(n / connect_seconds, 1),
+            "expected_deliveries": expected,
+            "deliveries": len(latencies),
+            "delivery_ratio": round(len(latencies) / expected, 4),
+            "messages": messages,
+            "messages_per_vote": round(messages / expected, 4),
+            "messages_per_sec": round(messages / elapsed, 1) if elapsed else None,
+            "lag_seconds": round(elapsed - on_time, 3) if elapsed else None,
+            "latency_p50_ms": ms(percentile(latencies, 50)),
+            "latency_p90_ms": ms(percentile(latencies, 90)),
+            "latency_p99_ms": ms(percentile(latencies, 99)),
+            "latency_max_ms": ms(latencies[-1] if latencies else None),
+            "memory_per_connection_kib": round((rss_connected - rss_before) / n / 1024, 2),
+        }
+
+    # ---------------------------------------------
+    # REPORTING
+    # ---------------------------------------------
+    def _print(self, report):
+        params, m = report["params"], report["metrics"]
+        self.stdout.write(
+            f"{params['subscribers']} subscribers, {params['votes']} votes @ {params['rate']}/s, "
+            f"pushed every {params['interval']}s over the {params['layer']} channel layer"
+        )
+        self.stdout.write(f"  connect     {m['connect_seconds']:.2f}s ({m['connects_per_sec']}/s)")
+        self.stdout.write(
+            f"  delivered   {m['deliveries']}/{m['expected_deliveries']} votes "
+            f"({m['delivery_ratio']:.2%}) in {m['messages']} messages "
+            f"({m['messages_per_vote']} per vote), {m['messages_per_sec']} msg/s"
+        )
+        self.stdout.write(
+            f"  latency ms  p50 {m['latency_p50_ms']}  p90 {m['latency_p90_ms']}  "
+            f"p99 {m['latency_p99_ms']}  max {m['latency_max_ms']}"
+        )
+        self.stdout.write(f"  memory      {m['memory_per_connection_kib']} KiB / connection")
+
+        # Past saturation latency is queueing delay and swings run to run
+        if m["lag_seconds"] and m["lag_seconds"] > 0.1 * (params["votes"] / params["rate"] + params["interval"]):
+            self.stdout.write(self.style.WARNING(
+                f"  saturated: the last push trailed the votes by {m['lag_seconds']}s; "
+                "lower --rate or --subscribers for comparable latency numbers."
+            ))
+
+    def _compare(self, report, baseline_path, tolerance):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        if baseline.get("params") != report["params"]:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was run with different parameters ({baseline.get('params')}); "
+                "numbers are not directly comparable."
+            ))
+
+        regressions = 0
+        self.stdout.write(f"{'metric':<28} {'baseline':>12} {'current':>12} {'change':>9}")
+        for name, worse in COMPARED.items():
+            before = baseline.get("metrics", {}).get(name)
+            after = report["metrics"].get(name)
+            if not before or after is None:
+                continue
+
+            change = (after - before) / before
+            regressed = change > tolerance if worse == "higher" else change < -tolerance
+            regressions += regressed
+            line = f"{name:<28} {before:>12} {after:>12} {change:>+9.1%}"
+            self.stdout.write(self.style.ERROR(line + "  REGRESSION") if regressed else line)
+
+        if regressions:
+            self.stdout.write(self.style.ERROR(f"{regressions} metric(s) regressed beyond {tolerance:.0%}."))
+        else:
+            self.stdout.write(self.style.SUCCESS("No regressions beyond tolerance."))
@@ -0,0 +1,151 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from core.utils import percentile
+from users.models import User
+from polls.models import Poll, Option
+from votes import ingest
+from votes.models import Vote
+from votes.views import VoteCreateView
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark sustained vote throughput through POST /api/votes/: the "
+        "synchronous path vs async ingestion (queue + batched inserts). "
+        "Run against Postgres; uses the Redis stream when REDIS_URL is set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16, help="Concurrent voters.")
+        parser.add_argument("--votes", type=int, default=200, help="Votes per worker.")
+        parser.add_argument(
+            "--modes",
+            nargs="+",
+            choices=["sync", "async"],
+            default=["sync", "async"],
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Consumer batch size in async mode.",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["votes"] < 1:
+            raise CommandError("--workers and --votes must be positive.")
+        if connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING(
+                "SQLite serializes all writes; numbers will not reflect Postgres."
+            ))
+
+        owner = User.objects.create_user(
+            username=f"bench-{uuid.uuid4().hex[:8]}",
+            email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+        )
+        try:
+            self.stdout.write(
+                f"{'mode':>6} {'votes':>8} {'accept/s':>10} {'votes/s':>10} "
+                f"{'p50 ms':>8} {'p99 ms':>8}"
+            )
+            for mode in options["modes"]:
+                m = self._run(owner, mode, options)
+                self.stdout.write(
+                    f"{mode:>6} {m['votes']:>8} {m['accepted_per_sec']:>10.1f} "
+                    f"{m['persisted_per_sec']:>10.1f} {m['p50_ms']:>8.2f} {m['p99_ms']:>8.2f}"
+                )
+        finally:
+            owner.delete()  # cascades to the bench polls, options and votes
+
+    def _run(self, owner, mode, options):
+        workers, per_worker = options["workers"], options["votes"]
+        total = workers * per_worker
+
+        poll = Poll.objects.create(
+            owner=owner, title=f"Vote ingestion benchmark ({mode})", allow_guest_votes=True
+        )
+        option_ids = [Option.objects.create(poll=poll, text=text).pk for text in "ABCD"]
+
+        # The endpoint itself, minus the daily throttles
+        view = VoteCreateView.as_view(throttle_classes=())
+        factory = APIRequestFactory()
+        barrier = threading.Barrier(workers)
+        latencies = []
+
+        def voter(n):
+            try:
+                barrier.wait()
+                for i in range(per_worker):
+                    request = factory.post(
+                        "/api/votes/",
+                        {"option": option_ids[i % len(option_ids)]},
+                        format="json",
+                        REMOTE_ADDR=f"fd00::{n:x}:{i:x}",  # one guest per vote
+                    )
+                    started = time.perf_counter()
+                    response = view(request)
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code not in (201, 202):
+                        raise CommandError(f"Vote failed ({response.status_code}): {response.data}")
+            finally:
+                connection.close()
+
+        # Async: one consumer keeps draining while the votes come in
+        done = threading.Event()
+        persisted_at = []
+
+        def consumer():
+            queue = ingest.get_queue()
+            handled = 0
+            try:
+                while handled < total and not done.is_set():
+                    n = ingest.consume(queue, batch_size=options["batch_size"])
+                    handled += n
+                    if not n:
+                        time.sleep(0.01)
+                persisted_at.append(time.perf_counter())
+            finally:
+                connection.close()
+
+        with override_settings(VOTE_INGEST_MODE=mode, VOTE_INGEST_LOCAL_WORKER=False):
+            started = time.perf_counter()
+            drain = None
+            if mode == "async":
+                drain = threading.Thread(target=consumer)
+                drain.start()
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    list(pool.map(voter, range(workers)))
+                accepted = time.perf_counter() - started
+            except BaseException:
+                # Don't wait for votes that will never come
+                done.set()
+                raise
+            finally:
+                if drain is not None:
+                    drain.join(timeout=300)
+                    done.set()
+
+        # Sync votes are persisted by the time they are accepted
+        persisted = persisted_at[0] - started if persisted_at else accepted
+
+        stored = Vote.objects.filter(poll=poll).count()
+        if stored != total:
+            raise CommandError(f"{mode}: expected {total} votes stored, found {stored}.")
+
+        latencies.sort()
+        return {
+            "votes": total,
+            "accepted_per_sec": total / accepted,
+            "persisted_per_sec": total / persisted,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
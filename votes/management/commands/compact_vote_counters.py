@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from votes.sharded_counters import compact
+
+
+class Command(BaseCommand):
+    help = "Fold sharded vote counter slots back into the option/poll counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            type=int,
+            action="append",
+            dest="poll_ids",
+            help="Only compact this poll (can be repeated).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Number of polls folded per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        folded, raised = compact(
+            poll_ids=options["poll_ids"],
+            chunk_size=options["chunk_size"],
+            hot_threshold=settings.VOTE_COUNTER_HOT_THRESHOLD,
+            max_slots=settings.VOTE_COUNTER_MAX_SLOTS,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Folded {folded} vote(s); raised counter slots on {raised} hot poll(s)."
+        ))
@@ -0,0 +1,72 @@
+import signal
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from votes import redis_counters
+from votes.counters import redis_enabled
+
+
+class Command(BaseCommand):
+    help = "Write-behind flusher: apply Redis vote counters to Postgres in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Flush everything pending once and exit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.VOTE_COUNTER_FLUSH_INTERVAL,
+            help="Seconds between flushes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.VOTE_COUNTER_FLUSH_BATCH_SIZE,
+            help="Polls written per DB transaction.",
+        )
+
+    def handle(self, *args, **options):
+        if not redis_enabled():
+            self.stdout.write(self.style.WARNING(
+                "Redis counter tier is disabled (VOTE_COUNTER_BACKEND / REDIS_URL); nothing to flush."
+            ))
+            return
+
+        interval = options["interval"]
+        batch_size = options["batch_size"]
+        lock_ttl = max(30, int(interval * 10))
+        token = uuid.uuid4().hex
+
+        if not redis_counters.acquire_lock(token, lock_ttl):
+            raise CommandError("Another vote counter flusher is already running.")
+
+        # SIGTERM (docker stop) / SIGINT just wake the loop up;
+        # the final drain happens in the finally block below.
+        stopping = threading.Event()
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+            signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+        flushed = 0
+        ticks = 0
+        try:
+            while not options["once"] and not stopping.is_set():
+                flushed += redis_counters.flush(batch_size)
+                ticks += 1
+                if ticks % 1000 == 0:
+                    redis_counters.prune_ledger()
+                if not redis_counters.refresh_lock(token, lock_ttl):
+                    raise CommandError("Lost the flusher lock; exiting.")
+                stopping.wait(interval)
+        finally:
+            # Drain whatever is still pending before exiting
+            flushed += redis_counters.flush(batch_size)
+            redis_counters.release_lock(token)
+
+        self.stdout.write(self.style.SUCCESS(f"Flushed pending counters for {flushed} poll(s)."))
@@ -0,0 +1,72 @@
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.redis import get_redis
+from votes import ingest
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Async vote ingestion: insert votes queued on the Redis stream in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the stream once and exit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.VOTE_INGEST_INTERVAL,
+            help="Seconds to wait when the stream is empty.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.VOTE_INGEST_BATCH_SIZE,
+            help="Votes inserted per DB transaction.",
+        )
+
+    def handle(self, *args, **options):
+        if get_redis() is None:
+            self.stdout.write(self.style.WARNING(
+                "REDIS_URL is not set: queued votes live in the web process "
+                "and are drained there; nothing to consume."
+            ))
+            return
+
+        queue = ingest.get_queue()
+        consumer = ingest.consumer_name()
+        batch_size = options["batch_size"]
+
+        # SIGTERM (docker stop) / SIGINT just wake the loop up;
+        # the final drain happens in the finally block below.
+        stopping = threading.Event()
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+            signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+        handled = 0
+        try:
+            while not options["once"] and not stopping.is_set():
+                try:
+                    n = ingest.consume(queue, consumer, batch_size)
+                except Exception:
+                    # Database or Redis unavailable: the batch stays
+                    # pending on the stream and is read again
+                    logger.exception("Vote ingestion failed a batch")
+                    stopping.wait(options["interval"])
+                    continue
+                handled += n
+                if n < batch_size:
+                    stopping.wait(options["interval"])
+        finally:
+            handled += ingest.drain(queue, consumer, batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Ingested {handled} queued vote(s)."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from votes.counters import rebuild_counts
+
+
+class Command(BaseCommand):
+    help = "Rebuild or reconcile the denormalized vote counters from the Vote table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            type=int,
+            action="append",
+            dest="poll_ids",
+            help="Only reconcile this poll (can be repeated).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of polls recounted per batch.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted counters without fixing them.",
+        )
+
+    def handle(self, *args, **options):
+        options_fixed, polls_fixed = rebuild_counts(
+            poll_ids=options["poll_ids"],
+            chunk_size=options["chunk_size"],
+            dry_run=options["dry_run"],
+        )
+
+        verb = "Found" if options["dry_run"] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {options_fixed} option counter(s) and {polls_fixed} poll counter(s)."
+        ))
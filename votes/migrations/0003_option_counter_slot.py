@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0003_poll_counter_slots'),
+        ('votes', '0002_counter_flush'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptionCounterSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_slots', to='polls.option')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('option', 'slot'), name='unique_counter_slot_per_option')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0003_poll_counter_slots'),
+        ('votes', '0003_option_counter_slot'),
+    ]
+
+    operations = [
+        # Nullable first: adding it is a metadata-only change on Postgres.
+        # 0005 fills it in, 0006 makes it NOT NULL.
+        migrations.AddField(
+            model_name='vote',
+            name='poll',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='polls.poll'),
+        ),
+    ]
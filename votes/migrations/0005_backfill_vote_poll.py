@@ -0,0 +1,72 @@
+"""
+Fill Vote.poll from Vote.option on a live table: pk ranges of CHUNK rows,
+one short transaction each, so no lock is held for long. Safe to re-run.
+
+Then drop the votes that break "one vote per poll" (the old constraints
+were only per option), keeping each voter's earliest vote and taking
+the removed ones off the counter columns. Guest votes without an IP
+are left alone: the new constraint doesn't cover them either.
+"""
+from django.db import migrations, transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Subquery
+
+CHUNK = 10000
+
+
+def backfill_poll(apps, schema_editor):
+    Vote = apps.get_model("votes", "Vote")
+    Option = apps.get_model("polls", "Option")
+
+    poll_of_option = Subquery(
+        Option.objects.filter(pk=OuterRef("option_id")).values("poll_id")[:1]
+    )
+    max_pk = Vote.objects.aggregate(m=Max("pk"))["m"] or 0
+
+    for start in range(0, max_pk, CHUNK):
+        with transaction.atomic():
+            Vote.objects.filter(
+                pk__gt=start, pk__lte=start + CHUNK, poll__isnull=True
+            ).update(poll_id=poll_of_option)
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    Vote = apps.get_model("votes", "Vote")
+    Option = apps.get_model("polls", "Option")
+    Poll = apps.get_model("polls", "Poll")
+
+    for voter, extra in (
+        ("user", {"user__isnull": False}),
+        # NULLs are distinct under the unique index
+        ("guest_ip", {"user__isnull": True, "guest_ip__isnull": False}),
+    ):
+        duplicates = (
+            Vote.objects.filter(**extra)
+            .values("poll_id", voter)
+            .annotate(n=Count("id"), keep=Min("id"))
+            .filter(n__gt=1)
+            .order_by()
+        )
+        for row in list(duplicates):
+            with transaction.atomic():
+                extra_votes = Vote.objects.filter(
+                    poll_id=row["poll_id"], **{voter: row[voter]}, **extra
+                ).exclude(pk=row["keep"])
+
+                for option_id, n in extra_votes.values_list("option_id").annotate(n=Count("id")).order_by():
+                    Option.objects.filter(pk=option_id).update(vote_count=F("vote_count") - n)
+                removed = extra_votes.count()
+                Poll.objects.filter(pk=row["poll_id"]).update(total_votes=F("total_votes") - removed)
+                extra_votes.delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('votes', '0004_vote_poll'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_poll, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicate_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,145 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:02
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class PostgresOperations(migrations.SeparateDatabaseAndState):
+    """
+    `state_operations` describe the change; on PostgreSQL the database
+    runs `database_operations` instead (lock-light equivalents), anywhere
+    else the state operations themselves.
+    """
+
+    def _operations(self, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            return self.database_operations
+        return self.state_operations
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        for operation in self._operations(schema_editor):
+            to_state = from_state.clone()
+            operation.state_forwards(app_label, to_state)
+            operation.database_forwards(app_label, schema_editor, from_state, to_state)
+            from_state = to_state
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        operations = self._operations(schema_editor)
+        to_states = {}
+        for operation in operations:
+            to_states[operation] = to_state
+            to_state = to_state.clone()
+            operation.state_forwards(app_label, to_state)
+        for operation in reversed(operations):
+            from_state = to_state
+            to_state = to_states[operation]
+            operation.database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+# Partial unique indexes are what Django creates for these conditional
+# UniqueConstraints; built CONCURRENTLY they don't block writes. A failed
+# build leaves an INVALID index behind: drop it before running this again.
+UNIQUE_INDEXES = [
+    migrations.RunSQL(
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS unique_user_vote_per_poll "
+        "ON votes_vote (poll_id, user_id) WHERE user_id IS NOT NULL",
+        "DROP INDEX CONCURRENTLY IF EXISTS unique_user_vote_per_poll",
+    ),
+    migrations.RunSQL(
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS unique_guest_ip_vote_per_poll "
+        "ON votes_vote (poll_id, guest_ip) WHERE user_id IS NULL",
+        "DROP INDEX CONCURRENTLY IF EXISTS unique_guest_ip_vote_per_poll",
+    ),
+    migrations.RunSQL(
+        "DROP INDEX CONCURRENTLY IF EXISTS unique_user_vote_per_option",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS unique_user_vote_per_option "
+        "ON votes_vote (user_id, option_id) WHERE user_id IS NOT NULL",
+    ),
+    migrations.RunSQL(
+        "DROP INDEX CONCURRENTLY IF EXISTS unique_guest_ip_vote_per_option",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS unique_guest_ip_vote_per_option "
+        "ON votes_vote (guest_ip, option_id) WHERE user_id IS NULL",
+    ),
+]
+
+# SET NOT NULL scans the table under ACCESS EXCLUSIVE, unless a validated
+# CHECK already proves it. NOT VALID adds the check without a scan;
+# VALIDATE scans under SHARE UPDATE EXCLUSIVE, which lets writes through.
+POLL_NOT_NULL = [
+    migrations.RunSQL(
+        "ALTER TABLE votes_vote ADD CONSTRAINT vote_poll_id_not_null "
+        "CHECK (poll_id IS NOT NULL) NOT VALID",
+        "ALTER TABLE votes_vote DROP CONSTRAINT IF EXISTS vote_poll_id_not_null",
+    ),
+    migrations.RunSQL(
+        "ALTER TABLE votes_vote VALIDATE CONSTRAINT vote_poll_id_not_null",
+        migrations.RunSQL.noop,
+    ),
+    migrations.RunSQL(
+        "ALTER TABLE votes_vote ALTER COLUMN poll_id SET NOT NULL",
+        "ALTER TABLE votes_vote ALTER COLUMN poll_id DROP NOT NULL",
+    ),
+    migrations.RunSQL(
+        "ALTER TABLE votes_vote DROP CONSTRAINT vote_poll_id_not_null",
+        migrations.RunSQL.noop,
+    ),
+]
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('polls', '0003_poll_counter_slots'),
+        ('votes', '0005_backfill_vote_poll'),
+    ]
+
+    operations = [
+        PostgresOperations(
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='vote',
+                    name='unique_user_vote_per_option',
+                ),
+                migrations.RemoveConstraint(
+                    model_name='vote',
+                    name='unique_guest_ip_vote_per_option',
+                ),
+                migrations.AddConstraint(
+                    model_name='vote',
+                    constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('poll', 'user'), name='unique_user_vote_per_poll'),
+                ),
+                migrations.AddConstraint(
+                    model_name='vote',
+                    constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('poll', 'guest_ip'), name='unique_guest_ip_vote_per_poll'),
+                ),
+            ],
+            database_operations=UNIQUE_INDEXES,
+        ),
+        PostgresOperations(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='vote',
+                    index=models.Index(fields=['poll', 'option'], name='vote_poll_option_idx'),
+                ),
+            ],
+            database_operations=[
+                AddIndexConcurrently(
+                    model_name='vote',
+                    index=models.Index(fields=['poll', 'option'], name='vote_poll_option_idx'),
+                ),
+            ],
+        ),
+        PostgresOperations(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='vote',
+                    name='poll',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='polls.poll'),
+                ),
+            ],
+            database_operations=POLL_NOT_NULL,
+        ),
+    ]
@@ -1,10 +1,105 @@
-from django.db import models
+from django.db import connections, models, router, transaction
 from django.conf import settings
-from polls.models import Option
+from django.utils import timezone
+from polls.models import Poll, Option
 
 User = settings.AUTH_USER_MODEL
 
 
+class VoteQuerySet(models.QuerySet):
+
+    def _insert_ignoring_conflicts(self, rows, returning):
+        """
+        INSERT `rows` (dicts of field name → value, same keys) in one
+        statement, skipping those the one-vote-per-poll constraints reject
+        (ON CONFLICT DO NOTHING). Returns the `returning` columns of the
+        rows that went in, in no particular order.
+        """
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        qn = connection.ops.quote_name
+        meta = self.model._meta
+
+        fields = [meta.get_field(name.removesuffix("_id")) for name in rows[0]]
+        params = []
+        for row in rows:
+            params.extend(
+                field.get_db_prep_save(value, connection)
+                for field, value in zip(fields, row.values())
+            )
+
+        placeholders = f"({', '.join(['%s'] * len(fields))})"
+        sql = (
+            f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(f.column) for f in fields)}) "
+            f"VALUES {', '.join([placeholders] * len(rows))} "
+            f"ON CONFLICT DO NOTHING RETURNING {', '.join(qn(meta.get_field(name).column) for name in returning)}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return db, cursor.fetchall()
+
+    def insert_once(self, **fields):
+        """
+        Insert a vote in one round trip, letting the one-vote-per-poll
+        constraints decide (INSERT ... ON CONFLICT DO NOTHING RETURNING).
+        Returns the new Vote, or None if the voter already voted on the poll.
+        """
+        fields.setdefault("created_at", timezone.now())
+        db, rows = self._insert_ignoring_conflicts([fields], returning=["id"])
+        if not rows:
+            return None
+
+        vote = self.model(pk=rows[0][0], **fields)
+        vote._state.adding = False
+        vote._state.db = db
+        return vote
+
+    def insert_many(self, votes, batch_size=1000):
+        """
+        insert_once for unsaved Votes (poll_id set), `batch_size` rows per
+        statement. Returns the Votes that went in, with their pk; the
+        others lost to a vote already recorded for their voter.
+        """
+        inserted = []
+        now = timezone.now()
+        for start in range(0, len(votes), batch_size):
+            batch = votes[start:start + batch_size]
+            # Several NULL-IP guests may share a key: a list each
+            by_voter = {}
+            for vote in batch:
+                by_voter.setdefault(vote.voter_key, []).append(vote)
+
+            db, rows = self._insert_ignoring_conflicts(
+                [
+                    {
+                        "poll_id": vote.poll_id,
+                        "option_id": vote.option_id,
+                        "user_id": vote.user_id,
+                        "guest_ip": vote.guest_ip,
+                        "created_at": vote.created_at or now,
+                    }
+                    for vote in batch
+                ],
+                returning=["id", "poll", "user", "guest_ip"],
+            )
+            for pk, poll_id, user_id, guest_ip in rows:
+                key = Vote.make_voter_key(poll_id, user_id, None if guest_ip is None else str(guest_ip))
+                vote = by_voter[key].pop()
+                vote.pk = pk
+                vote._state.adding = False
+                vote._state.db = db
+                inserted.append(vote)
+        return inserted
+
+    def delete(self):
+        # Counted off in the same transaction (see votes.signals)
+        from .signals import votes_deleted
+
+        with transaction.atomic(using=self.db):
+            votes_deleted(self)
+            return super().delete()
+
+
 class Vote(models.Model):
     user = models.ForeignKey(
         User,
@@ -20,28 +115,108 @@ class Vote(models.Model):
         related_name="votes"
     )
 
+    # Copy of option.poll: "one vote per poll" is enforced and looked up
+    # on this column without joining Option (kept in step by save())
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name="votes",
+        db_index=False,  # leading column of the indexes below
+    )
+
     # For guests only
     guest_ip = models.GenericIPAddressField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = VoteQuerySet.as_manager()
+
     class Meta:
         constraints = [
             # Logged-in users: 1 vote per POLL
             models.UniqueConstraint(
-                fields=["user", "option"],
-                name="unique_user_vote_per_option",
+                fields=["poll", "user"],
+                name="unique_user_vote_per_poll",
                 condition=models.Q(user__isnull=False),
             ),
 
             # Guests: 1 vote per POLL per IP
             models.UniqueConstraint(
-                fields=["guest_ip", "option"],
-                name="unique_guest_ip_vote_per_option",
+                fields=["poll", "guest_ip"],
+                name="unique_guest_ip_vote_per_poll",
                 condition=models.Q(user__isnull=True),
             ),
         ]
+        indexes = [
+            # Per-option counts of a poll straight from the index (recounts)
+            models.Index(fields=["poll", "option"], name="vote_poll_option_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Also on updates: a vote moved to another option follows its poll
+        self.poll_id = self.option.poll_id
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"option", "option_id"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "poll"}
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from .signals import votes_deleted
+
+        with transaction.atomic(using=kwargs.get("using") or router.db_for_write(Vote, instance=self)):
+            votes_deleted(Vote.objects.filter(pk=self.pk))
+            return super().delete(*args, **kwargs)
+
+    @staticmethod
+    def make_voter_key(poll_id, user_id, guest_ip):
+        """Who may vote once on `poll_id`: a user, or a guest's IP."""
+        if user_id is not None:
+            return (poll_id, "user", user_id)
+        return (poll_id, "guest", guest_ip)
+
+    @property
+    def voter_key(self):
+        return self.make_voter_key(self.poll_id, self.user_id, self.guest_ip)
 
     def __str__(self):
         voter = self.user if self.user else f"Guest({self.guest_ip})"
         return f"{voter} -> {self.option}"
+
+
+class CounterFlush(models.Model):
+    """
+    Ledger of Redis counter batches already applied to Postgres.
+    Lets the flusher replay a batch after a crash without double counting.
+    """
+    batch_id = models.UUIDField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"CounterFlush({self.batch_id})"
+
+
+class OptionCounterSlot(models.Model):
+    """
+    One of N counter rows for an option ("sharded" counter backend).
+    Votes increment a random slot so concurrent voters don't all queue on
+    one row lock; `manage.py compact_vote_counters` folds the slots back
+    into Option.vote_count / Poll.total_votes.
+    """
+    option = models.ForeignKey(
+        Option,
+        on_delete=models.CASCADE,
+        related_name="counter_slots",
+    )
+    slot = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["option", "slot"],
+                name="unique_counter_slot_per_option",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.option_id}[{self.slot}] = {self.count}"
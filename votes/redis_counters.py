@@ -0,0 +1,227 @@
+"""
+Redis counter tier for hot polls.
+
+Votes HINCRBY a per-poll "pending" hash instead of updating the Option /
+Poll rows. Readers overlay those pending increments on the flushed
+columns, and `manage.py flush_vote_counters` writes them back to Postgres
+in batches.
+
+Flush protocol (crash-safe):
+  1. SMOVE the poll id from the dirty set to the flushing set.
+  2. RENAMENX the pending hash to an in-flight hash and tag it with a batch id.
+  3. Apply the in-flight deltas + record the batch id in CounterFlush,
+     in one DB transaction.
+  4. Delete the in-flight hash and SREM the poll from the flushing set.
+A flusher that dies anywhere in between leaves the poll in the flushing
+set; the next run replays it, and the CounterFlush ledger makes the
+replay a no-op if step 3 had already committed. Readers skip in-flight
+hashes whose batch is in the ledger too: between steps 3 and 4 their
+deltas are already in the columns.
+"""
+import uuid
+from datetime import timedelta
+
+import redis
+from django.db import transaction
+from django.utils import timezone
+
+from core.redis import get_redis
+from core.utils import bulk_increment
+from polls.models import Poll, Option
+from .models import CounterFlush
+
+DIRTY_KEY = "votex:tally:dirty"
+FLUSHING_KEY = "votex:tally:flushing"
+LOCK_KEY = "votex:tally:flusher-lock"
+
+TOTAL_FIELD = "total"
+BATCH_FIELD = "_batch"
+
+
+def _pending_key(poll_id):
+    return f"votex:tally:{poll_id}:pending"
+
+
+def _inflight_key(poll_id):
+    return f"votex:tally:{poll_id}:inflight"
+
+
+# ---------------------------------------------
+# WRITE PATH
+# ---------------------------------------------
+def incr(poll_id, option_id, n=1):
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.hincrby(_pending_key(poll_id), option_id, n)
+    pipe.hincrby(_pending_key(poll_id), TOTAL_FIELD, n)
+    pipe.sadd(DIRTY_KEY, poll_id)
+    pipe.execute()
+    return True
+
+
+# ---------------------------------------------
+# READ PATH
+# ---------------------------------------------
+def _parse(hashes):
+    merged = {}
+    for h in hashes:
+        for field, value in h.items():
+            if field == BATCH_FIELD:
+                continue
+            key = field if field == TOTAL_FIELD else int(field)
+            merged[key] = merged.get(key, 0) + int(value)
+    return merged
+
+
+def pending_deltas(poll_ids):
+    """
+    Increments not yet flushed to Postgres, in one round trip:
+    {poll_id: {"total": n, option_id: n, ...}}
+
+    In-flight batches already recorded in CounterFlush are left out, so
+    a reader never adds deltas the columns already hold.
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    for poll_id in poll_ids:
+        pipe.hgetall(_pending_key(poll_id))
+        pipe.hgetall(_inflight_key(poll_id))
+    raw = pipe.execute()
+
+    # In-flight hashes are rare (a flush is running or crashed), so the
+    # ledger is only queried when there is one
+    batches = {h[BATCH_FIELD] for h in raw[1::2] if BATCH_FIELD in h}
+    applied = set()
+    if batches:
+        applied = {
+            str(b) for b in CounterFlush.objects.filter(
+                batch_id__in=batches
+            ).values_list("batch_id", flat=True)
+        }
+
+    deltas = {}
+    for i, poll_id in enumerate(poll_ids):
+        pending, inflight = raw[2 * i:2 * i + 2]
+        if inflight.get(BATCH_FIELD) in applied:
+            inflight = {}
+        merged = _parse([pending, inflight])
+        if merged:
+            deltas[poll_id] = merged
+    return deltas
+
+
+# ---------------------------------------------
+# FLUSHER
+# ---------------------------------------------
+def acquire_lock(token, ttl):
+    return bool(get_redis().set(LOCK_KEY, token, nx=True, ex=ttl))
+
+
+def refresh_lock(token, ttl):
+    r = get_redis()
+    if r.get(LOCK_KEY) == token:
+        r.expire(LOCK_KEY, ttl)
+        return True
+    return False
+
+
+def release_lock(token):
+    r = get_redis()
+    if r.get(LOCK_KEY) == token:
+        r.delete(LOCK_KEY)
+
+
+def _claim(r, count):
+    candidates = r.srandmember(DIRTY_KEY, count)
+    if not candidates:
+        return []
+
+    pipe = r.pipeline(transaction=False)
+    for poll_id in candidates:
+        pipe.smove(DIRTY_KEY, FLUSHING_KEY, poll_id)
+    moved = pipe.execute()
+    return [int(p) for p, ok in zip(candidates, moved) if ok]
+
+
+def _flush_batch(r, poll_ids):
+    batch_id = str(uuid.uuid4())
+
+    # Move pending → in-flight. An in-flight hash that already exists was
+    # left by a crashed flusher and keeps its original batch id.
+    for poll_id in poll_ids:
+        inflight = _inflight_key(poll_id)
+        if not r.exists(inflight):
+            try:
+                r.renamenx(_pending_key(poll_id), inflight)
+            except redis.ResponseError:
+                continue  # nothing pending for this poll
+        r.hsetnx(inflight, BATCH_FIELD, batch_id)
+
+    pipe = r.pipeline(transaction=False)
+    for poll_id in poll_ids:
+        pipe.hgetall(_inflight_key(poll_id))
+    hashes = dict(zip(poll_ids, pipe.execute()))
+
+    batches = {h[BATCH_FIELD] for h in hashes.values() if BATCH_FIELD in h}
+
+    with transaction.atomic():
+        applied = {
+            str(b) for b in CounterFlush.objects.filter(
+                batch_id__in=batches
+            ).values_list("batch_id", flat=True)
+        }
+
+        option_deltas = {}
+        poll_deltas = {}
+        for poll_id, h in hashes.items():
+            if not h or h.get(BATCH_FIELD) in applied:
+                continue
+            for key, value in _parse([h]).items():
+                if key == TOTAL_FIELD:
+                    poll_deltas[poll_id] = value
+                else:
+                    option_deltas[key] = value
+
+        bulk_increment(Option, "vote_count", option_deltas)
+        bulk_increment(Poll, "total_votes", poll_deltas)
+        CounterFlush.objects.bulk_create(
+            [CounterFlush(batch_id=b) for b in batches - applied]
+        )
+
+    pipe = r.pipeline(transaction=False)
+    for poll_id in poll_ids:
+        pipe.delete(_inflight_key(poll_id))
+    pipe.srem(FLUSHING_KEY, *poll_ids)
+    pipe.execute()
+
+
+def flush(batch_size=500):
+    """
+    Write pending increments to Postgres. Polls left in flight by a
+    previous run are replayed first. Only drains what was dirty when the
+    call started, so it returns even under constant vote traffic.
+
+    Returns the number of polls flushed.
+    """
+    r = get_redis()
+    flushed = 0
+
+    recovered = [int(p) for p in r.smembers(FLUSHING_KEY)]
+    for i in range(0, len(recovered), batch_size):
+        chunk = recovered[i:i + batch_size]
+        _flush_batch(r, chunk)
+        flushed += len(chunk)
+
+    remaining = r.scard(DIRTY_KEY)
+    while remaining > 0:
+        poll_ids = _claim(r, min(batch_size, remaining))
+        if not poll_ids:
+            break
+        _flush_batch(r, poll_ids)
+        flushed += len(poll_ids)
+        remaining -= len(poll_ids)
+
+    return flushed
+
+
+def prune_ledger(max_age=timedelta(days=1)):
+    """Drop ledger rows old enough that no in-flight batch can refer to them."""
+    CounterFlush.objects.filter(created_at__lt=timezone.now() - max_age).delete()
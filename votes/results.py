@@ -0,0 +1,149 @@
+"""
+Cached poll results.
+
+Entries are keyed by poll and tagged with a per-poll version. Committed
+votes bump the version, and so do committed poll / option / allow-list
+changes (polls.cache.invalidate_poll), so the next read recomputes (one
+worker at a time, see core.cache); RESULTS_CACHE_TTL bounds staleness
+should a bump ever be lost, and RESULTS_CACHE_STALE_TTL bounds how long
+other workers may be served the previous results while that recompute
+runs.
+
+Every bump also bumps a global poll list version. Both are the validators
+behind the poll detail / results / list ETags (see core.etags). A bump
+also purges the poll's responses from shared caches (core.edge_cache).
+
+A poll's version key is only created for a poll that exists, lives for
+RESULTS_VERSION_TTL and is deleted with the poll: arbitrary ids can't
+leave keys behind.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from core import edge_cache
+from core.cache import get_or_compute
+from polls.models import Poll
+from .counters import pending_deltas
+
+
+def _version_key(poll_id):
+    return f"votex:poll:{poll_id}:results-version"
+
+
+def _results_key(poll_id):
+    return f"votex:poll:{poll_id}:results"
+
+
+LIST_VERSION_KEY = "votex:polls:list-version"
+
+
+def _initial_version():
+    # Start from a timestamp so a lost version key can't
+    # resurrect entries cached under an old version number
+    return time.time_ns() // 1000
+
+
+# ---------------------------------------------
+# VERSIONING
+# ---------------------------------------------
+def _get_counter(key, exists=None):
+    version = cache.get(key)
+    if version is None:
+        if exists is not None and not exists():
+            raise Http404("Poll not found.")
+        # Expiry is harmless: the counter restarts from a later timestamp
+        cache.add(key, _initial_version(), timeout=settings.RESULTS_VERSION_TTL)
+        version = cache.get(key)
+    return version
+
+
+def _bump_counter(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=settings.RESULTS_VERSION_TTL)
+
+
+def get_version(poll_id):
+    """The poll's version; raises Http404 for an unknown poll."""
+    return _get_counter(
+        _version_key(poll_id),
+        exists=lambda: Poll.objects.filter(pk=poll_id).exists(),
+    )
+
+
+def get_list_version():
+    return _get_counter(LIST_VERSION_KEY)
+
+
+def bump_version(poll_id):
+    _bump_counter(_version_key(poll_id))
+    # Lists show vote counts too
+    _bump_counter(LIST_VERSION_KEY)
+    # Shared caches: the poll's results, share link and list pages
+    edge_cache.purge([edge_cache.poll_key(poll_id)])
+
+
+def forget_version(poll_id):
+    """A deleted poll: drop its version and results, bump the lists."""
+    cache.delete_many([_version_key(poll_id), _results_key(poll_id)])
+    _bump_counter(LIST_VERSION_KEY)
+    edge_cache.purge([edge_cache.poll_key(poll_id)])
+
+
+# ---------------------------------------------
+# RESULTS
+# ---------------------------------------------
+def compute_results(poll_id):
+    """Build the results payload with a single query."""
+    rows = list(
+        Poll.objects.filter(pk=poll_id)
+        .values(
+            "title",
+            "description",
+            "total_votes",
+            "options__id",
+            "options__text",
+            "options__vote_count",
+        )
+        .order_by("options__id")
+    )
+    if not rows:
+        raise Http404("Poll not found.")
+
+    delta = pending_deltas([poll_id]).get(poll_id, {})
+
+    return {
+        "poll_id": poll_id,
+        "title": rows[0]["title"],
+        "description": rows[0]["description"] or "",
+        "total_votes": rows[0]["total_votes"] + delta.get("total", 0),
+        "options": [
+            {
+                "id": row["options__id"],
+                "text": row["options__text"],
+                "vote_count": row["options__vote_count"] + delta.get(row["options__id"], 0),
+            }
+            for row in rows
+            if row["options__id"] is not None
+        ],
+    }
+
+
+def get_results(poll_id, version=None):
+    """
+    Results payload for a poll, from cache when possible.
+    Returns a tuple (data, status) with status "hit", "miss" or "stale".
+    Pass the `version` already read (e.g. for an ETag) to pin the entry to it.
+    """
+    return get_or_compute(
+        _results_key(poll_id),
+        lambda: compute_results(poll_id),
+        ttl=settings.RESULTS_CACHE_TTL,
+        stale_ttl=settings.RESULTS_CACHE_STALE_TTL,
+        version=get_version(poll_id) if version is None else version,
+        name="results",
+    )
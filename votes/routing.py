@@ -0,0 +1,6 @@
+from django.urls import path
+from .consumers import PollResultsConsumer
+
+websocket_urlpatterns = [
+    path("ws/polls/<int:poll_id>/results/", PollResultsConsumer.as_asgi()),
+]
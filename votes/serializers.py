@@ -1,10 +1,33 @@
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from django.db import transaction
+from django.db.models import OuterRef
 from django.utils import timezone
 from core.utils import get_client_ip
+from polls import access
+from polls.cache import get_poll_entry
+from polls.models import Option
 from .models import Vote
+from . import counters, ingest, live, results, voted
+
+
+class VoteOptionField(serializers.PrimaryKeyRelatedField):
+    """
+    Loads the option with its poll, and whether the voter is on the
+    poll's allow-list, in a single query.
+    """
+
+    def get_queryset(self):
+        user = self.context["request"].user
+        queryset = Option.objects.select_related("poll")
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(voter_allowed=access.member_exists(OuterRef("poll_id"), user.id))
 
 
 class VoteSerializer(serializers.ModelSerializer):
+    option = VoteOptionField()
+
     class Meta:
         model = Vote
         fields = ["id", "option", "created_at"]
@@ -28,55 +51,101 @@ class VoteSerializer(serializers.ModelSerializer):
             if not request.user.is_authenticated:
                 raise serializers.ValidationError("Login required to vote.")
 
-            if poll.visibility == "private" and poll.owner != request.user:
+            if poll.visibility == "private" and poll.owner_id != request.user.id:
                 raise serializers.ValidationError("You cannot vote on this poll.")
 
-            if poll.visibility == "restricted" and request.user not in poll.allowed_users.all():
+            if poll.visibility == "restricted" and not option.voter_allowed:
                 raise serializers.ValidationError("You are not allowed to vote here.")
 
         # ------------------------------
         # 3. Guest voting
         # ------------------------------
-        if not request.user.is_authenticated:
-            if not poll.allow_guest_votes:
-                raise serializers.ValidationError("Guest voting disabled.")
+        if not request.user.is_authenticated and not poll.allow_guest_votes:
+            raise serializers.ValidationError("Guest voting disabled.")
 
-            guest_ip = get_client_ip(request)
-            # Check guest already voted on THIS POLL (not per option)
-            if Vote.objects.filter(option__poll=poll, guest_ip=guest_ip).exists():
-                raise serializers.ValidationError("Guest already voted.")
+        # Duplicate votes are caught by the insert itself (see create)
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        request = self.context["request"]
+        option = validated_data["option"]
 
-            return attrs  # Guest is allowed
+        if request.user.is_authenticated:
+            voter = {"user_id": request.user.id}
+            duplicate = "You already voted."
+        else:
+            voter = {"guest_ip": get_client_ip(request)}
+            duplicate = "Guest already voted."
+
+        # One vote per POLL: the unique constraints reject a second one,
+        # including one racing this request
+        vote = Vote.objects.insert_once(poll_id=option.poll_id, option_id=option.pk, **voter)
+        if vote is None:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [duplicate]})
+
+        # Counters are bumped in the same transaction as the insert;
+        # cached results are invalidated and pushed to live subscribers
+        # once it commits
+        counters.record_vote(option)
+        transaction.on_commit(lambda: results.bump_version(option.poll_id))
+        transaction.on_commit(lambda: live.schedule_broadcast(option.poll_id))
+        transaction.on_commit(
+            lambda: voted.record(option.poll_id, option.pk, vote.user_id, vote.guest_ip)
+        )
+        return vote
 
-        # ------------------------------
-        # 4. Authenticated user voting
-        # ------------------------------
+
+class VoteIngestSerializer(serializers.Serializer):
+    """
+    Async ingestion (votes.ingest): the VoteSerializer checks, answered
+    from the poll cache and the voted sets, with the same messages. Votes
+    still queued aren't in the voted sets yet: the consumer rejects those
+    duplicates and reports them on the receipt.
+    """
+    option = serializers.IntegerField()
+
+    def validate_option(self, value):
+        if ingest.poll_id_for_option(value) is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+    def validate(self, attrs):
+        request = self.context["request"]
         user = request.user
+        poll_id = ingest.poll_id_for_option(attrs["option"])
+        entry = get_poll_entry(poll_id)
 
-        # Check if user voted in THIS POLL already
-        if Vote.objects.filter(option__poll=poll, user=user).exists():
+        if entry["expires_at"] and timezone.now() > entry["expires_at"]:
+            raise serializers.ValidationError("This poll has expired.")
+
+        if entry["visibility"] != "public":
+
+            if not user.is_authenticated:
+                raise serializers.ValidationError("Login required to vote.")
+
+            if entry["visibility"] == "private" and entry["owner_id"] != user.id:
+                raise serializers.ValidationError("You cannot vote on this poll.")
+
+            if entry["visibility"] == "restricted" and not access.is_member(poll_id, user.id):
+                raise serializers.ValidationError("You are not allowed to vote here.")
+
+        if not user.is_authenticated:
+            if not entry["data"]["allow_guest_votes"]:
+                raise serializers.ValidationError("Guest voting disabled.")
+            if voted.voted_option(poll_id, guest_ip=get_client_ip(request)) is not None:
+                raise serializers.ValidationError("Guest already voted.")
+        elif voted.voted_option(poll_id, user_id=user.id) is not None:
             raise serializers.ValidationError("You already voted.")
 
+        attrs["poll_id"] = poll_id
         return attrs
 
-    def create(self, validated_data):
+    def enqueue(self):
+        """Queue the vote; returns the receipt id, or None if the queue is unavailable."""
         request = self.context["request"]
-        option = validated_data["option"]
-
-        # ------------------------------
-        # Logged-in user
-        # ------------------------------
         if request.user.is_authenticated:
-            return Vote.objects.create(
-                user=request.user,
-                option=option
-            )
-
-        # ------------------------------
-        # Guest
-        # ------------------------------
-        guest_ip = get_client_ip(request)
-        return Vote.objects.create(
-            guest_ip=guest_ip,
-            option=option
-        )
+            voter = {"user_id": request.user.id}
+        else:
+            voter = {"guest_ip": get_client_ip(request)}
+        return ingest.enqueue(self.validated_data["poll_id"], self.validated_data["option"], **voter)
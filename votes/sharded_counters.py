@@ -0,0 +1,114 @@
+"""
+Sharded counter rows for popular options.
+
+Each option gets up to `Poll.counter_slots` OptionCounterSlot rows. A vote
+increments one slot at random, so concurrent voters on the same option
+spread their row locks across N rows instead of queueing on one. Readers
+add the slot sums to the compacted Option.vote_count / Poll.total_votes,
+and `compact()` periodically folds the slots back into those columns.
+"""
+import random
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Least
+
+from core.utils import bulk_increment
+from polls.models import Poll, Option
+from .models import OptionCounterSlot
+
+
+# ---------------------------------------------
+# WRITE PATH
+# ---------------------------------------------
+def incr(option_id, slots, n=1):
+    """Add `n` to a random slot. Must run inside the vote transaction."""
+    slot = random.randrange(max(slots, 1))
+    rows = OptionCounterSlot.objects.filter(option_id=option_id, slot=slot)
+
+    if rows.update(count=F("count") + n):
+        return
+
+    try:
+        with transaction.atomic():
+            OptionCounterSlot.objects.create(option_id=option_id, slot=slot, count=n)
+    except IntegrityError:
+        # Another voter created the slot first
+        rows.update(count=F("count") + n)
+
+
+# ---------------------------------------------
+# READ PATH
+# ---------------------------------------------
+def pending_deltas(poll_ids):
+    """
+    Slot sums not yet compacted, in one aggregate query:
+    {poll_id: {"total": n, option_id: n, ...}}
+    """
+    rows = (
+        OptionCounterSlot.objects.filter(option__poll_id__in=poll_ids, count__gt=0)
+        .values("option_id", "option__poll_id")
+        .annotate(n=Sum("count"))
+        .order_by()
+    )
+
+    deltas = {}
+    for row in rows:
+        delta = deltas.setdefault(row["option__poll_id"], {"total": 0})
+        delta[row["option_id"]] = row["n"]
+        delta["total"] += row["n"]
+    return deltas
+
+
+# ---------------------------------------------
+# COMPACTION
+# ---------------------------------------------
+def compact(poll_ids=None, chunk_size=100, hot_threshold=None, max_slots=None):
+    """
+    Fold slot rows into Option.vote_count / Poll.total_votes and reset
+    them to zero. Polls that folded at least `hot_threshold` votes since
+    the last run get their slot count doubled (up to `max_slots`).
+
+    Returns a tuple (votes_folded, polls_raised).
+    """
+    slots = OptionCounterSlot.objects.filter(count__gt=0)
+    if poll_ids:
+        slots = slots.filter(option__poll_id__in=poll_ids)
+
+    dirty_polls = sorted(
+        set(slots.values_list("option__poll_id", flat=True).order_by())
+    )
+
+    folded = 0
+    raised = 0
+    for i in range(0, len(dirty_polls), chunk_size):
+        chunk = dirty_polls[i:i + chunk_size]
+
+        with transaction.atomic():
+            # Lock only the slot rows; voters on these slots wait for the
+            # fold instead of racing it
+            rows = list(
+                OptionCounterSlot.objects.select_for_update(of=("self",))
+                .filter(option__poll_id__in=chunk, count__gt=0)
+                .values_list("pk", "option_id", "option__poll_id", "count")
+            )
+
+            option_deltas = {}
+            poll_deltas = {}
+            for _, option_id, poll_id, count in rows:
+                option_deltas[option_id] = option_deltas.get(option_id, 0) + count
+                poll_deltas[poll_id] = poll_deltas.get(poll_id, 0) + count
+
+            bulk_increment(Option, "vote_count", option_deltas)
+            bulk_increment(Poll, "total_votes", poll_deltas)
+            OptionCounterSlot.objects.filter(pk__in=[r[0] for r in rows]).update(count=0)
+
+            if hot_threshold and max_slots:
+                hot = [pk for pk, n in poll_deltas.items() if n >= hot_threshold]
+                raised += Poll.objects.filter(
+                    pk__in=hot, counter_slots__lt=max_slots
+                ).update(counter_slots=Least(F("counter_slots") * 2, max_slots))
+
+        folded += sum(poll_deltas.values())
+
+    return folded, raised
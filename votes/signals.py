@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import User
+from polls.models import Poll, Option
+from .models import Vote
+from . import counters, live, results, voted
+
+
+# Votes going with their option or poll: those voters may vote again
+@receiver(post_delete, sender=Poll)
+def poll_deleted(sender, instance, **kwargs):
+    voted.forget(instance.pk)
+
+
+@receiver(post_delete, sender=Option)
+def option_deleted(sender, instance, **kwargs):
+    voted.forget(instance.poll_id)
+
+
+def votes_deleted(votes):
+    """
+    Count the votes of queryset `votes`, about to be deleted, off the
+    counters in the deleting transaction. Once it commits, their polls'
+    voted sets are reloaded and their results refreshed.
+    """
+    deltas = {
+        (row["poll_id"], row["option_id"]): row["n"]
+        for row in votes.order_by().values("poll_id", "option_id").annotate(n=Count("id"))
+    }
+    if not deltas:
+        return
+    counters.record_deletions(deltas)
+
+    def after_commit():
+        for poll_id in {poll_id for poll_id, _ in deltas}:
+            voted.forget(poll_id)
+            results.bump_version(poll_id)
+            live.schedule_broadcast(poll_id)
+
+    transaction.on_commit(after_commit)
+
+
+# Votes cascading from a user or an option are counted before the
+# delete, in one query; a deleted poll takes all its counters along.
+# Direct deletes are counted by Vote.delete / VoteQuerySet.delete: a
+# Vote receiver would make every cascade load the rows it deletes
+@receiver(pre_delete, sender=User)
+def voter_deleting(sender, instance, **kwargs):
+    votes_deleted(Vote.objects.filter(user=instance))
+
+
+@receiver(pre_delete, sender=Option)
+def option_deleting(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Poll) and getattr(origin, "model", None) is not Poll:
+        votes_deleted(Vote.objects.filter(option=instance))
+
+
+# Live subscribers were only checked when they joined: anything that can
+# take access away has them check again, once it commits
+@receiver(post_save, sender=Poll)
+@receiver(post_delete, sender=Poll)
+def poll_access_changed(sender, instance, **kwargs):
+    poll_id = instance.pk
+    transaction.on_commit(lambda: live.recheck_access(poll_id))
+
+
+@receiver(m2m_changed, sender=Poll.allowed_users.through)
+def allowed_users_removed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_remove", "post_clear"):
+        return
+    if not reverse:
+        poll_ids = [instance.pk]
+    elif action == "post_clear":
+        # polls.signals noted them before the clear
+        poll_ids = list(getattr(instance, "_cleared_poll_ids", ()))
+    else:
+        poll_ids = list(pk_set or ())
+
+    def after_commit():
+        for poll_id in poll_ids:
+            live.recheck_access(poll_id)
+
+    transaction.on_commit(after_commit)
@@ -0,0 +1,199 @@
+"""
+Server-Sent Events results streams (ASGI only).
+
+Each worker keeps one upstream channel-layer subscription per poll with
+local SSE clients (a `PollStream`), fed by the same broadcasts as the
+WebSocket feed (votes.live). Clients are plain coroutines waiting on an
+asyncio.Event, so an idle connection costs no thread.
+
+A client's access is checked again whenever the upstream subscription
+gets an access re-check (votes.live.recheck_access); one that lost it is
+sent no more frames and its response ends.
+
+Every frame carries the poll's results version as its SSE id. The stream
+keeps the counts of its last few versions so a client reconnecting with
+Last-Event-ID gets only the options that changed since; anything older
+gets a full snapshot.
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.http import Http404
+
+from polls.access import can_view
+from polls.cache import get_poll_entry
+from .live import results_group
+from .results import get_results, get_version
+
+logger = logging.getLogger(__name__)
+
+
+def _counts(data):
+    return {
+        "total_votes": data["total_votes"],
+        "options": {o["id"]: o["vote_count"] for o in data["options"]},
+    }
+
+
+def _frame(event, version, payload):
+    return f"id: {version}\nevent: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+class PollStream:
+    """Shared upstream subscription for one poll in this worker."""
+
+    def __init__(self, poll_id):
+        self.poll_id = poll_id
+        self.listeners = set()
+        self.version = None
+        self.data = None
+        self.history = OrderedDict()  # version → counts
+        self.access_changes = 0
+        self.task = None
+
+    def publish(self, version, data):
+        # Versions only move forward; drop late or duplicate deliveries
+        if self.version is not None and version <= self.version:
+            return
+        self.version = version
+        self.data = data
+        self.history[version] = _counts(data)
+        while len(self.history) > settings.RESULTS_STREAM_HISTORY:
+            self.history.popitem(last=False)
+
+        for listener in self.listeners:
+            listener.set()
+
+    def access_changed(self):
+        self.access_changes += 1
+        for listener in self.listeners:
+            listener.set()
+
+    async def _listen(self):
+        layer = get_channel_layer()
+        group = results_group(self.poll_id)
+        while True:
+            channel = await layer.new_channel()
+            try:
+                await layer.group_add(group, channel)
+                while True:
+                    message = await layer.receive(channel)
+                    if message.get("type") == "results.update" and "version" in message:
+                        self.publish(message["version"], message["results"])
+                    elif message.get("type") == "results.access":
+                        self.access_changed()
+            except asyncio.CancelledError:
+                await layer.group_discard(group, channel)
+                raise
+            except Exception:
+                # Updates carry absolute counts: the next one after
+                # resubscribing catches clients up
+                logger.warning("Results stream for poll %s lost its subscription", self.poll_id, exc_info=True)
+                await asyncio.sleep(1)
+
+
+_streams = {}
+
+
+async def subscribe(poll_id):
+    """
+    Register a local listener for poll_id and return (stream, listener).
+    Raises Http404 for an unknown poll.
+    """
+    stream = _streams.get(poll_id)
+    if stream is None:
+        stream = _streams[poll_id] = PollStream(poll_id)
+        if get_channel_layer() is not None:
+            stream.task = asyncio.create_task(stream._listen())
+
+    listener = asyncio.Event()
+    stream.listeners.add(listener)
+
+    try:
+        if stream.version is None:
+            # Subscribed before reading, so nothing published in between is lost
+            version = await database_sync_to_async(get_version)(poll_id)
+            data, _ = await database_sync_to_async(get_results)(poll_id)
+            stream.publish(version, data)
+    except BaseException:
+        unsubscribe(stream, listener)
+        raise
+
+    return stream, listener
+
+
+def unsubscribe(stream, listener):
+    stream.listeners.discard(listener)
+    if not stream.listeners:
+        if stream.task is not None:
+            stream.task.cancel()
+        if _streams.get(stream.poll_id) is stream:
+            del _streams[stream.poll_id]
+
+
+async def _can_still_view(poll_id, viewer):
+    try:
+        entry = await database_sync_to_async(get_poll_entry)(poll_id)
+    except Http404:
+        return False
+    return await database_sync_to_async(can_view)(entry, viewer)
+
+
+async def event_stream(poll_id, last_event_id=None, viewer=None):
+    """
+    SSE frames for one client: a snapshot (or a delta when resuming from
+    a version still in the stream's history), then a delta per update
+    and a heartbeat comment whenever the poll is quiet. `viewer` is the
+    user the stream was opened for; it ends once they can't view the poll.
+
+    Subscribes on first iteration, i.e. on the server's event loop: a
+    view behind sync middleware runs in a short-lived loop of its own.
+    """
+    stream, listener = await subscribe(poll_id)
+
+    seen_version = None
+    seen = None
+    if last_event_id is not None and last_event_id in stream.history:
+        seen_version, seen = last_event_id, stream.history[last_event_id]
+
+    access_changes = stream.access_changes
+    try:
+        yield f"retry: {settings.RESULTS_STREAM_RETRY_MS}\n\n"
+
+        while True:
+            listener.clear()
+
+            if stream.access_changes != access_changes:
+                access_changes = stream.access_changes
+                if not await _can_still_view(poll_id, viewer):
+                    return
+
+            version = stream.version
+            if seen_version is None or version > seen_version:
+                current = stream.history[version]
+                if seen is None:
+                    yield _frame("snapshot", version, {"version": version, **stream.data})
+                else:
+                    changed = [
+                        {"id": option_id, "vote_count": count}
+                        for option_id, count in current["options"].items()
+                        if seen["options"].get(option_id) != count
+                    ]
+                    yield _frame("delta", version, {
+                        "version": version,
+                        "total_votes": current["total_votes"],
+                        "options": changed,
+                    })
+                seen_version, seen = version, current
+
+            try:
+                await asyncio.wait_for(listener.wait(), timeout=settings.RESULTS_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+    finally:
+        unsubscribe(stream, listener)
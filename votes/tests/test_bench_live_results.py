@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from polls.models import Poll
+
+
+class TestBenchLiveResults(TransactionTestCase):
+    # Subscribers connect through the ASGI app, whose database access
+    # runs in another thread: the bench poll must be committed
+
+    def test_small_run_reports_and_compares(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = os.path.join(tmp, "run.json")
+            out = StringIO()
+            call_command(
+                "bench_live_results",
+                "--subscribers", "5",
+                "--votes", "3",
+                "--warmup", "1",
+                "--rate", "50",
+                "--interval", "0",
+                "--json", report_path,
+                stdout=out,
+            )
+
+            with open(report_path) as f:
+                report = json.load(f)
+            metrics = report["metrics"]
+            self.assertEqual(metrics["expected_deliveries"], 15)
+            self.assertEqual(metrics["deliveries"], 15)
+            self.assertEqual(metrics["messages"], 15)  # a push per vote
+            self.assertIsNotNone(metrics["latency_p99_ms"])
+
+            out = StringIO()
+            call_command(
+                "bench_live_results",
+                "--subscribers", "5",
+                "--votes", "3",
+                "--warmup", "1",
+                "--rate", "50",
+                "--interval", "0",
+                "--baseline", report_path,
+                "--tolerance", "1000",
+                stdout=out,
+            )
+            self.assertIn("No regressions", out.getvalue())
+
+            # Votes within one broadcast interval share their pushes
+            call_command(
+                "bench_live_results",
+                "--subscribers", "5",
+                "--votes", "10",
+                "--warmup", "0",
+                "--rate", "100",
+                "--interval", "0.5",
+                "--json", report_path,
+                stdout=StringIO(),
+            )
+            with open(report_path) as f:
+                metrics = json.load(f)["metrics"]
+            self.assertEqual(metrics["deliveries"], 50)
+            self.assertLess(metrics["messages"], 25)
+
+        # The bench poll is cleaned up
+        self.assertFalse(Poll.objects.exists())
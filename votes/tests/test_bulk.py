@@ -0,0 +1,164 @@
+import json
+from unittest import mock
+
+import msgpack
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from votes.models import Vote, VoteQuerySet
+
+
+class TestBulkVoteUpload(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+
+        self.poll = Poll.objects.create(owner=self.owner, title="Kiosk", allow_guest_votes=True)
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+        self.rust = Option.objects.create(poll=self.poll, text="Rust")
+
+    def upload_jsonl(self, lines, user=None):
+        self.client.force_authenticate(user or self.owner)
+        body = b"\n".join(
+            line if isinstance(line, bytes) else json.dumps(line).encode() for line in lines
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/votes/bulk/", body, content_type="application/x-ndjson")
+            results = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+        return res, results
+
+    def test_jsonl_upload_reports_each_item(self):
+        res, results = self.upload_jsonl([
+            {"option": self.python.pk, "guest_ip": "10.0.0.1", "ref": "k1/1"},
+            {"option": self.rust.pk, "guest_ip": "10.0.0.2"},
+            {"option": self.rust.pk, "guest_ip": "10.0.0.1"},
+            b"{not json",
+            {"option": 999999, "guest_ip": "10.0.0.3"},
+            {"option": self.python.pk, "guest_ip": "10.0.0.4"},
+        ])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertEqual(results[0], {"index": 0, "ref": "k1/1", "status": "persisted"})
+        self.assertEqual(results[1]["status"], "persisted")
+        self.assertEqual(results[2], {"index": 2, "status": "rejected", "detail": "Guest already voted."})
+        self.assertEqual(results[3], {"index": 3, "status": "rejected", "detail": "Line 4: invalid JSON."})
+        self.assertEqual(results[4]["detail"], "Invalid option.")
+        self.assertEqual(results[5]["status"], "persisted")
+        self.assertEqual(results[6], {"summary": {"persisted": 3, "rejected": 3}})
+
+        self.python.refresh_from_db()
+        self.rust.refresh_from_db()
+        self.poll.refresh_from_db()
+        self.assertEqual((self.python.vote_count, self.rust.vote_count, self.poll.total_votes), (2, 1, 3))
+        self.assertEqual(Vote.objects.filter(poll=self.poll).count(), 3)
+
+    def test_reupload_is_idempotent(self):
+        lines = [
+            {"option": self.python.pk, "guest_ip": "10.0.0.1"},
+            {"option": self.rust.pk, "guest_ip": "fd00::2"},
+        ]
+        self.upload_jsonl(lines)
+        _, results = self.upload_jsonl(lines)
+
+        self.assertEqual(results[-1], {"summary": {"persisted": 2, "rejected": 0}})
+        self.assertEqual(Vote.objects.count(), 2)
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.total_votes, 2)
+
+    @override_settings(VOTE_BULK_CHUNK_SIZE=2)
+    def test_msgpack_upload_across_chunks(self):
+        restricted = Poll.objects.create(owner=self.owner, title="Board", visibility="restricted")
+        board = Option.objects.create(poll=restricted, text="Yes")
+
+        body = b"".join(msgpack.packb(item) for item in [
+            {"option": self.python.pk, "guest_ip": "10.0.0.1"},
+            {"option": board.pk, "guest_ip": "10.0.0.1"},
+            {"option": self.python.pk, "guest_ip": "10.0.0.2"},
+            {"option": self.rust.pk, "guest_ip": "FD00::0002"},
+            # Same voter again, in the next chunk, spelled differently
+            {"option": self.python.pk, "guest_ip": "fd00::2"},
+        ])
+        self.client.force_authenticate(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/votes/bulk/", body, content_type="application/msgpack")
+            unpacker = msgpack.Unpacker(raw=False)
+            unpacker.feed(b"".join(res.streaming_content))
+            results = list(unpacker)
+
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        self.assertEqual(
+            [r.get("detail") for r in results[:5]],
+            [None, "Login required to vote.", None, None, "Guest already voted."],
+        )
+        self.assertEqual(Vote.objects.count(), 3)
+
+    def test_only_the_owner_can_upload(self):
+        _, results = self.upload_jsonl(
+            [{"option": self.python.pk, "guest_ip": "10.0.0.1"}],
+            user=self.voter,
+        )
+        self.assertEqual(results[0]["detail"], "You cannot upload votes for this poll.")
+        self.assertFalse(Vote.objects.exists())
+
+        self.client.force_authenticate(None)
+        res = self.client.post("/api/votes/bulk/", b"{}", content_type="application/x-ndjson")
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bad_items_are_rejected(self):
+        _, results = self.upload_jsonl([
+            [1, 2],
+            {"option": "1", "guest_ip": "10.0.0.1"},
+            {"option": self.python.pk},
+            {"option": self.python.pk, "guest_ip": "nope"},
+            {"option": self.python.pk, "guest_ip": 7},
+        ])
+        self.assertEqual([r["status"] for r in results[:5]], ["rejected"] * 5)
+        self.assertEqual(results[2]["detail"], "guest_ip: this field is required.")
+        self.assertEqual(results[4]["detail"], "guest_ip: enter a valid IPv4 or IPv6 address.")
+
+    def test_votes_cannot_be_cast_for_users(self):
+        _, results = self.upload_jsonl([{"option": self.python.pk, "user": self.voter.pk}])
+        self.assertEqual(results[0]["detail"], "user: only guest votes can be uploaded.")
+        self.assertFalse(Vote.objects.exists())
+
+        # The user can still vote themselves
+        self.client.force_authenticate(self.voter)
+        res = self.client.post("/api/votes/", {"option": self.python.pk})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+    def test_votes_lost_to_a_racing_insert_are_not_counted(self):
+        insert_many = VoteQuerySet.insert_many
+
+        def racing(queryset, votes, **kwargs):
+            # A synchronous vote commits after the chunk's duplicate check
+            Vote.objects.create(option=self.rust, guest_ip="10.0.0.1")
+            return insert_many(queryset, votes, **kwargs)
+
+        with mock.patch.object(VoteQuerySet, "insert_many", racing):
+            _, results = self.upload_jsonl([
+                {"option": self.python.pk, "guest_ip": "10.0.0.1"},
+                {"option": self.python.pk, "guest_ip": "10.0.0.2"},
+            ])
+
+        self.assertEqual(results[0]["detail"], "Guest already voted.")
+        self.assertEqual(results[-1], {"summary": {"persisted": 1, "rejected": 1}})
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 1)
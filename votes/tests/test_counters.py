@@ -0,0 +1,174 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.models import Poll, Option
+from votes.models import Vote, OptionCounterSlot
+
+
+class TestVoteCounters(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="public",
+            allow_guest_votes=True,
+        )
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+        self.rust = Option.objects.create(poll=self.poll, text="Rust")
+
+    def test_vote_updates_counters(self):
+        """A committed vote bumps both the option and the poll counter."""
+        self.client.force_authenticate(self.voter)
+        res = self.client.post("/api/votes/", {"option": self.python.id})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+        self.python.refresh_from_db()
+        self.poll.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 1)
+        self.assertEqual(self.poll.total_votes, 1)
+
+    def test_serializers_read_counters(self):
+        """Detail and results read the stored counters."""
+        Option.objects.filter(pk=self.rust.pk).update(vote_count=3)
+        Poll.objects.filter(pk=self.poll.pk).update(total_votes=3)
+
+        self.client.force_authenticate(self.voter)
+        detail = self.client.get(f"/api/polls/{self.poll.id}/")
+        self.assertEqual(detail.data["total_votes"], 3)
+        votes = {o["id"]: o["votes"] for o in detail.data["options"]}
+        self.assertEqual(votes[self.rust.id], 3)
+
+        results = self.client.get(f"/api/votes/results/{self.poll.id}/")
+        self.assertEqual(results.data["total_votes"], 3)
+
+    def test_rebuild_command_fixes_drift(self):
+        """rebuild_vote_counts recounts from the Vote table."""
+        Vote.objects.create(user=self.voter, option=self.rust)
+        Vote.objects.create(guest_ip="10.0.0.1", option=self.rust)
+        Option.objects.filter(pk=self.python.pk).update(vote_count=7)
+
+        call_command("rebuild_vote_counts", "--dry-run", stdout=StringIO())
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 7)
+
+        call_command("rebuild_vote_counts", stdout=StringIO())
+        self.python.refresh_from_db()
+        self.rust.refresh_from_db()
+        self.poll.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 0)
+        self.assertEqual(self.rust.vote_count, 2)
+        self.assertEqual(self.poll.total_votes, 2)
+
+    def test_deleted_votes_leave_the_counters(self):
+        """Votes deleted directly or with their voter are counted off."""
+        self.client.force_authenticate(self.voter)
+        self.client.post("/api/votes/", {"option": self.python.id})
+        self.client.force_authenticate(None)
+        self.client.post("/api/votes/", {"option": self.python.id}, REMOTE_ADDR="10.0.0.1")
+        self.client.post("/api/votes/", {"option": self.rust.id}, REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(self.client.get(f"/api/votes/results/{self.poll.id}/").data["total_votes"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.voter.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.filter(guest_ip="10.0.0.2").delete()
+
+        self.python.refresh_from_db()
+        self.rust.refresh_from_db()
+        self.poll.refresh_from_db()
+        self.assertEqual((self.python.vote_count, self.rust.vote_count, self.poll.total_votes), (1, 0, 1))
+        self.assertEqual(self.client.get(f"/api/votes/results/{self.poll.id}/").data["total_votes"], 1)
+
+        # An option's votes leave the poll total with it
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python.delete()
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.total_votes, 0)
+
+
+@override_settings(VOTE_COUNTER_BACKEND="sharded")
+class TestShardedCounters(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="public",
+            allow_guest_votes=True,
+            counter_slots=4,
+        )
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+
+    def guest_vote(self, ip):
+        res = self.client.post(
+            "/api/votes/", {"option": self.python.id}, REMOTE_ADDR=ip
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+    def test_votes_spread_over_slots_and_reads_sum_them(self):
+        for i in range(12):
+            self.guest_vote(f"10.0.0.{i}")
+
+        self.assertEqual(
+            sum(OptionCounterSlot.objects.values_list("count", flat=True)), 12
+        )
+        self.assertLessEqual(OptionCounterSlot.objects.count(), 4)
+
+        res = self.client.get(f"/api/votes/results/{self.poll.id}/")
+        self.assertEqual(res.data["total_votes"], 12)
+        self.assertEqual(res.data["options"][0]["vote_count"], 12)
+
+    @override_settings(VOTE_COUNTER_HOT_THRESHOLD=5, VOTE_COUNTER_MAX_SLOTS=6)
+    def test_compaction_folds_slots_and_raises_hot_polls(self):
+        for i in range(5):
+            self.guest_vote(f"10.0.0.{i}")
+
+        call_command("compact_vote_counters", stdout=StringIO())
+
+        self.python.refresh_from_db()
+        self.poll.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 5)
+        self.assertEqual(self.poll.total_votes, 5)
+        self.assertEqual(self.poll.counter_slots, 6)
+        self.assertFalse(OptionCounterSlot.objects.filter(count__gt=0).exists())
+
+        res = self.client.get(f"/api/votes/results/{self.poll.id}/")
+        self.assertEqual(res.data["total_votes"], 5)
+
+    def test_deleted_votes_are_folded_first(self):
+        for i in range(3):
+            self.guest_vote(f"10.0.0.{i}")
+
+        # Slots can't go negative: they are compacted, then decremented
+        Vote.objects.filter(guest_ip="10.0.0.0").delete()
+        self.assertFalse(OptionCounterSlot.objects.filter(count__gt=0).exists())
+        self.python.refresh_from_db()
+        self.poll.refresh_from_db()
+        self.assertEqual((self.python.vote_count, self.poll.total_votes), (2, 2))
@@ -0,0 +1,227 @@
+from unittest import mock
+
+import fakeredis
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from votes import ingest
+from votes.models import Vote, VoteQuerySet
+
+
+@override_settings(VOTE_INGEST_MODE="async", VOTE_INGEST_LOCAL_WORKER=False)
+class TestAsyncIngestion(APITestCase):
+    """Async ingestion through the in-process queue (no REDIS_URL)."""
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+        ingest.local_queue.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="public",
+            allow_guest_votes=True,
+        )
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+        self.rust = Option.objects.create(poll=self.poll, text="Rust")
+
+    def vote(self, option, user=None):
+        self.client.force_authenticate(user)
+        return self.client.post("/api/votes/", {"option": option.pk}, format="json")
+
+    def receipt(self, receipt_id):
+        return self.client.get(f"/api/votes/receipts/{receipt_id}/")
+
+    def drain(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest.drain()
+
+    def test_vote_is_acknowledged_then_persisted(self):
+        res = self.vote(self.python, self.voter)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED, res.data)
+        receipt_id = res.data["receipt"]
+
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(self.receipt(receipt_id).data["status"], ingest.QUEUED)
+
+        self.drain()
+
+        self.assertTrue(Vote.objects.filter(user=self.voter, option=self.python).exists())
+        self.python.refresh_from_db()
+        self.poll.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 1)
+        self.assertEqual(self.poll.total_votes, 1)
+
+        res = self.receipt(receipt_id)
+        self.assertEqual(res.data["status"], ingest.PERSISTED)
+        self.assertEqual(res.data["option"], self.python.pk)
+
+    def test_second_vote_on_poll_is_rejected_on_its_receipt(self):
+        first = self.vote(self.python).data["receipt"]
+        retry = self.vote(self.python).data["receipt"]
+        other = self.vote(self.rust).data["receipt"]
+
+        self.drain()
+
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(self.receipt(first).data["status"], ingest.PERSISTED)
+        # Same option again: a retried request, not a second vote
+        self.assertEqual(self.receipt(retry).data["status"], ingest.PERSISTED)
+        rejected = self.receipt(other).data
+        self.assertEqual(rejected["status"], ingest.REJECTED)
+        self.assertEqual(rejected["detail"], "Guest already voted.")
+
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.total_votes, 1)
+
+    def test_guests_without_an_address_are_all_accepted(self):
+        # As on the synchronous path, which the unique index lets through
+        Vote.objects.create(option=self.python, guest_ip=None)
+        receipts = []
+        for option in (self.python, self.rust):
+            res = self.client.post("/api/votes/", {"option": option.pk}, format="json", REMOTE_ADDR="")
+            self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED, res.data)
+            receipts.append(res.data["receipt"])
+
+        self.drain()
+
+        for receipt_id in receipts:
+            self.assertEqual(self.receipt(receipt_id).data["status"], ingest.PERSISTED)
+        self.assertEqual(Vote.objects.filter(guest_ip__isnull=True).count(), 3)
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.total_votes, 2)
+
+    def test_votes_lost_to_a_racing_insert_are_not_counted(self):
+        receipt_id = self.vote(self.python, self.voter).data["receipt"]
+        insert_many = VoteQuerySet.insert_many
+
+        def racing(queryset, votes, **kwargs):
+            # A synchronous vote commits after the batch's duplicate check
+            Vote.objects.create(user=self.voter, option=self.rust)
+            return insert_many(queryset, votes, **kwargs)
+
+        with mock.patch.object(VoteQuerySet, "insert_many", racing):
+            self.drain()
+
+        receipt = self.receipt(receipt_id).data
+        self.assertEqual(receipt["status"], ingest.DUPLICATE)
+        self.assertEqual(receipt["detail"], "You already voted.")
+        self.assertEqual(Vote.objects.get(user=self.voter).option, self.rust)
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 0)
+
+    def test_forwarded_for_must_be_an_address(self):
+        res = self.client.post(
+            "/api/votes/", {"option": self.python.pk},
+            HTTP_X_FORWARDED_FOR="not-an-ip", REMOTE_ADDR="10.0.0.9",
+        )
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED, res.data)
+        self.drain()
+        self.assertEqual(Vote.objects.get().guest_ip, "10.0.0.9")
+
+        with self.assertRaises(ValueError):
+            ingest.enqueue(self.poll.pk, self.python.pk, guest_ip="not-an-ip")
+
+    def test_bad_entry_is_dead_lettered_alone(self):
+        good = self.vote(self.python, self.voter).data["receipt"]
+        bad = {"receipt": "bad", "poll": self.poll.pk, "option": "nope", "user": "", "guest_ip": ""}
+        ingest.local_queue.append(bad)
+        ingest.set_receipt("bad", ingest.QUEUED)
+
+        with self.assertLogs("votes.ingest", "ERROR"):
+            self.drain()
+
+        self.assertEqual(self.receipt(good).data["status"], ingest.PERSISTED)
+        self.assertEqual(self.receipt("bad").data["status"], ingest.REJECTED)
+        self.assertEqual(list(ingest.local_queue.dead), [bad])
+        self.assertEqual(len(ingest.local_queue), 0)
+
+    def test_cheap_checks_reject_before_queueing(self):
+        self.poll.allow_guest_votes = False
+        self.poll.save()
+
+        res = self.vote(self.python)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Guest voting disabled.", str(res.data))
+
+        res = self.vote(Option(pk=999999))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(ingest.local_queue), 0)
+
+    def test_unknown_receipt(self):
+        self.assertEqual(self.receipt("nope").status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(VOTE_INGEST_MODE="async", VOTE_INGEST_CLAIM_IDLE_MS=0, VOTED_BACKFILL_BACKGROUND=False)
+class TestRedisStreamIngestion(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = mock.patch("core.redis._client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.poll = Poll.objects.create(owner=owner, title="Stream", allow_guest_votes=True)
+        self.option = Option.objects.create(poll=self.poll, text="Yes")
+
+    def test_unacked_batch_is_redelivered(self):
+        for i in range(3):
+            res = self.client.post(
+                "/api/votes/", {"option": self.option.pk}, REMOTE_ADDR=f"10.0.0.{i}"
+            )
+            self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED, res.data)
+        self.assertEqual(self.redis.xlen(ingest.STREAM_KEY), 3)
+
+        # A consumer reads the batch and dies before persisting it
+        queue = ingest.get_queue()
+        self.assertEqual(len(queue.read("crashed", 10)), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ingest.drain(queue, "survivor"), 3)
+
+        self.assertEqual(Vote.objects.filter(option=self.option).count(), 3)
+        self.assertEqual(self.redis.xlen(ingest.STREAM_KEY), 0)
+
+    def test_falls_back_to_sync_vote_when_redis_is_down(self):
+        with mock.patch.object(ingest.RedisStreamQueue, "append", side_effect=OSError):
+            res = self.client.post("/api/votes/", {"option": self.option.pk})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_poison_entry_is_not_redelivered(self):
+        self.client.post("/api/votes/", {"option": self.option.pk}, REMOTE_ADDR="10.0.0.1")
+        queue = ingest.get_queue()
+        queue.append({"receipt": "bad", "poll": self.poll.pk, "option": "nope", "user": "", "guest_ip": ""})
+
+        with self.assertLogs("votes.ingest", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ingest.drain(queue, "worker"), 2)
+
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(self.redis.xlen(ingest.STREAM_KEY), 0)
+        self.assertEqual(self.redis.xrange(ingest.DEAD_LETTER_KEY)[0][1]["receipt"], "bad")
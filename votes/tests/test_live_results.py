@@ -0,0 +1,203 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from asgi import application
+from core.circuit_breaker import get_breaker
+from core.tests.flaky_redis import FlakyConnection, flaky_cache_settings
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from votes import live
+
+IN_MEMORY_LAYER = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, RESULTS_BROADCAST_INTERVAL=0)
+class TestLiveResults(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+        live._pending.clear()
+
+        # The communicator only stubs this out while sending or receiving;
+        # the consumer keeps running in between and would close the
+        # connection holding the test's transaction
+        patcher = mock.patch("channels.db.close_old_connections")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.member = User.objects.create_user(
+            username="member",
+            email="member@example.com",
+            password="member123",
+        )
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="public",
+            allow_guest_votes=True,
+        )
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+
+    def _connect(self, poll_id, user=None):
+        path = f"/ws/polls/{poll_id}/results/"
+        if user is not None:
+            path += f"?token={AccessToken.for_user(user)}"
+        return WebsocketCommunicator(application, path)
+
+    def _vote(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/votes/", {"option": self.python.id})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+    def test_snapshot_then_update_on_vote(self):
+        async def scenario():
+            communicator = self._connect(self.poll.id)
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+            snapshot = await communicator.receive_json_from()
+            self.assertEqual(snapshot["results"]["total_votes"], 0)
+
+            await sync_to_async(self._vote)()
+
+            update = await communicator.receive_json_from()
+            self.assertEqual(update["results"]["total_votes"], 1)
+            self.assertEqual(update["results"]["options"][0]["vote_count"], 1)
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_private_poll_rejects_anonymous(self):
+        self.poll.visibility = "private"
+        self.poll.save()
+
+        async def scenario():
+            communicator = self._connect(self.poll.id)
+            await communicator.connect()
+            closed = await communicator.receive_output()
+            self.assertEqual(closed, {"type": "websocket.close", "code": 4403})
+
+        async_to_sync(scenario)()
+
+    def test_restricted_poll_accepts_allowed_user_token(self):
+        self.poll.visibility = "restricted"
+        self.poll.save()
+        self.poll.allowed_users.add(self.member)
+
+        async def scenario():
+            communicator = self._connect(self.poll.id, user=self.member)
+            await communicator.connect()
+            snapshot = await communicator.receive_json_from()
+            self.assertEqual(snapshot["results"]["poll_id"], self.poll.id)
+            await communicator.disconnect()
+
+            communicator = self._connect(self.poll.id, user=self.owner)
+            await communicator.connect()
+            closed = await communicator.receive_output()
+            self.assertEqual(closed["code"], 4403)
+
+        async_to_sync(scenario)()
+
+    def test_subscribers_who_lose_access_are_closed(self):
+        other = User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="other123",
+        )
+        self.poll.visibility = "restricted"
+        self.poll.save()
+        self.poll.allowed_users.add(self.member, other)
+
+        def remove_member():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.poll.allowed_users.remove(self.member)
+
+        async def scenario():
+            member = self._connect(self.poll.id, user=self.member)
+            await member.connect()
+            await member.receive_json_from()
+            staying = self._connect(self.poll.id, user=other)
+            await staying.connect()
+            await staying.receive_json_from()
+
+            await sync_to_async(remove_member)()
+            closed = await member.receive_output()
+            self.assertEqual(closed, {"type": "websocket.close", "code": 4403})
+
+            # Members still on the list keep their feed
+            await sync_to_async(self.client.force_authenticate)(other)
+            await sync_to_async(self._vote)()
+            update = await staying.receive_json_from()
+            self.assertEqual(update["results"]["total_votes"], 1)
+            await staying.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_public_poll_subscribers_are_closed_when_it_goes_private(self):
+        def make_private():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.poll.visibility = "private"
+                self.poll.save()
+
+        async def scenario():
+            communicator = self._connect(self.poll.id)
+            await communicator.connect()
+            await communicator.receive_json_from()
+
+            await sync_to_async(make_private)()
+            closed = await communicator.receive_output()
+            self.assertEqual(closed["code"], 4403)
+
+        async_to_sync(scenario)()
+
+    def test_unknown_poll_closes_with_404(self):
+        async def scenario():
+            communicator = self._connect(999999)
+            await communicator.connect()
+            closed = await communicator.receive_output()
+            self.assertEqual(closed["code"], 4404)
+
+        async_to_sync(scenario)()
+
+    @override_settings(RESULTS_BROADCAST_INTERVAL=1)
+    def test_broadcasts_are_coalesced_per_interval(self):
+        with mock.patch("votes.live.threading.Timer") as timer:
+            for _ in range(5):
+                live.schedule_broadcast(self.poll.id)
+        self.assertEqual(timer.call_count, 1)
+
+        # Once the window's push goes out, the next vote schedules another
+        live.broadcast(self.poll.id)
+        with mock.patch("votes.live.threading.Timer") as timer:
+            live.schedule_broadcast(self.poll.id)
+        self.assertEqual(timer.call_count, 1)
+
+    @override_settings(RESULTS_BROADCAST_INTERVAL=1, CACHES=flaky_cache_settings())
+    def test_broadcasts_are_coalesced_while_the_cache_is_down(self):
+        FlakyConnection.fail = True
+        self.addCleanup(FlakyConnection.reset)
+        self.addCleanup(get_breaker("cache").reset)
+
+        with mock.patch("votes.live.threading.Timer") as timer:
+            for _ in range(5):
+                live.schedule_broadcast(self.poll.id)
+        self.assertEqual(timer.call_count, 1)
+
+        live.broadcast(self.poll.id)
+        with mock.patch("votes.live.threading.Timer") as timer:
+            live.schedule_broadcast(self.poll.id)
+        self.assertEqual(timer.call_count, 1)
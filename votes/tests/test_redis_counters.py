@@ -0,0 +1,116 @@
+from io import StringIO
+from unittest import mock
+
+import fakeredis
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.models import Poll, Option
+from votes import redis_counters
+from votes.models import CounterFlush
+
+
+@override_settings(VOTE_COUNTER_BACKEND="redis")
+class TestRedisCounterTier(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = mock.patch("core.redis._client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.voters = [
+            User.objects.create_user(
+                username=f"voter{i}",
+                email=f"voter{i}@example.com",
+                password="voter123",
+            )
+            for i in range(3)
+        ]
+
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="public",
+        )
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+        self.rust = Option.objects.create(poll=self.poll, text="Rust")
+
+    def vote(self, user, option):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/votes/", {"option": option.id})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+    def test_votes_go_to_redis_and_results_read_them(self):
+        """Votes skip the DB counters but show up in results immediately."""
+        self.vote(self.voters[0], self.python)
+        self.vote(self.voters[1], self.python)
+        self.vote(self.voters[2], self.rust)
+
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 0)
+
+        res = self.client.get(f"/api/votes/results/{self.poll.id}/")
+        self.assertEqual(res.data["total_votes"], 3)
+        counts = {o["id"]: o["vote_count"] for o in res.data["options"]}
+        self.assertEqual(counts, {self.python.id: 2, self.rust.id: 1})
+
+        listing = self.client.get("/api/polls/")
+        self.assertEqual(listing.data["results"][0]["total_votes"], 3)
+
+    def test_flush_writes_back_to_postgres(self):
+        self.vote(self.voters[0], self.python)
+        self.vote(self.voters[1], self.rust)
+
+        call_command("flush_vote_counters", "--once", stdout=StringIO())
+
+        self.python.refresh_from_db()
+        self.poll.refresh_from_db()
+        self.assertEqual(self.python.vote_count, 1)
+        self.assertEqual(self.poll.total_votes, 2)
+        self.assertEqual(redis_counters.pending_deltas([self.poll.id]), {})
+
+        # Reads are unchanged after the flush
+        res = self.client.get(f"/api/votes/results/{self.poll.id}/")
+        self.assertEqual(res.data["total_votes"], 2)
+
+    def test_replayed_batch_is_not_applied_twice(self):
+        """A flusher that crashed after committing must not double count."""
+        self.vote(self.voters[0], self.python)
+
+        # Simulate a crash after the DB commit, before Redis cleanup
+        pipeline = self.redis.pipeline
+        with mock.patch.object(self.redis, "pipeline", side_effect=[
+            pipeline(transaction=False),  # claim dirty polls
+            pipeline(transaction=False),  # read in-flight hashes
+            RuntimeError("crash"),        # Redis cleanup
+        ]):
+            with self.assertRaises(RuntimeError):
+                redis_counters.flush()
+
+        self.assertEqual(CounterFlush.objects.count(), 1)
+        self.assertTrue(self.redis.sismember(redis_counters.FLUSHING_KEY, self.poll.id))
+
+        # The in-flight hash is still there, but its deltas are already
+        # in the columns: readers must not add them again
+        self.assertEqual(redis_counters.pending_deltas([self.poll.id]), {})
+        res = self.client.get(f"/api/votes/results/{self.poll.id}/")
+        self.assertEqual(res.data["total_votes"], 1)
+
+        redis_counters.flush()
+
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.total_votes, 1)
+        self.assertEqual(self.redis.scard(redis_counters.FLUSHING_KEY), 0)
@@ -0,0 +1,96 @@
+import os
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import get_poll_entry, poll_cache
+from polls.models import Poll, Option
+from votes import results
+from votes.checks import check_shared_results_cache
+
+
+class TestResultsCache(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="public",
+            allow_guest_votes=True,
+        )
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+        self.rust = Option.objects.create(poll=self.poll, text="Rust")
+        self.url = f"/api/votes/results/{self.poll.id}/"
+
+    def test_second_read_is_a_cache_hit_without_queries(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+
+    def test_miss_is_a_single_query(self):
+        get_poll_entry(self.poll.id)  # the poll and its version are known
+
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url)
+        self.assertEqual(len(res.data["options"]), 2)
+
+    def test_committed_vote_invalidates(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vote = self.client.post("/api/votes/", {"option": self.rust.id})
+        self.assertEqual(vote.status_code, status.HTTP_201_CREATED, vote.data)
+
+        res = self.client.get(self.url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["total_votes"], 1)
+
+    def test_unknown_poll_is_404(self):
+        res = self.client.get("/api/votes/results/999999/")
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        # Nothing is left behind for made-up ids
+        self.assertIsNone(cache.get(results._version_key(999999)))
+
+    def test_deleted_poll_drops_its_version(self):
+        self.client.get(self.url)
+        key = results._version_key(self.poll.id)
+        self.assertIsNotNone(cache.get(key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poll.delete()
+        self.assertIsNone(cache.get(key))
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIsNone(cache.get(key))
+
+
+class TestSharedResultsCacheCheck(SimpleTestCase):
+    def run_check(self, backend, workers):
+        caches = {"default": {"BACKEND": backend}}
+        with override_settings(CACHES=caches), mock.patch.dict(os.environ, {"WEB_CONCURRENCY": workers}):
+            return check_shared_results_cache(None)
+
+    def test_several_workers_need_a_shared_cache(self):
+        errors = self.run_check("django.core.cache.backends.locmem.LocMemCache", "4")
+        self.assertEqual([e.id for e in errors], ["votes.E001"])
+
+    def test_a_single_worker_may_use_process_memory(self):
+        self.assertEqual(self.run_check("django.core.cache.backends.locmem.LocMemCache", "1"), [])
+        self.assertEqual(self.run_check("core.cache_backends.ResilientRedisCache", "4"), [])
@@ -0,0 +1,214 @@
+import json
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from asgi import application
+from users.models import User
+from polls.models import Poll, Option
+from votes import streams
+
+IN_MEMORY_LAYER = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@override_settings(
+    CHANNEL_LAYERS=IN_MEMORY_LAYER,
+    RESULTS_BROADCAST_INTERVAL=0,
+    RESULTS_STREAM_HEARTBEAT=0.05,
+)
+class TestResultsStream(APITransactionTestCase):
+    # Django's ASGI handler runs each request's sync code in its own
+    # thread, so the streams need committed rows
+
+    def setUp(self):
+        cache.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="public",
+            allow_guest_votes=True,
+        )
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+        self.rust = Option.objects.create(poll=self.poll, text="Rust")
+        self.url = f"/api/votes/results/{self.poll.id}/stream/"
+
+    def _vote(self, option):
+        res = self.client.post("/api/votes/", {"option": option.id})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+
+    async def _open(self, headers=(), query=b""):
+        """Open the stream through the ASGI app, like a real client."""
+        communicator = ApplicationCommunicator(application, {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": self.url,
+            "raw_path": self.url.encode(),
+            "query_string": query,
+            "root_path": "",
+            "headers": [(b"host", b"testserver"), *headers],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        })
+        await communicator.send_input({"type": "http.request", "body": b""})
+        start = await communicator.receive_output(timeout=5)
+        self.assertEqual(start["status"], 200)
+        self.assertIn((b"Content-Type", b"text/event-stream"), start["headers"])
+        return communicator
+
+    @staticmethod
+    async def _next_chunk(communicator):
+        return (await communicator.receive_output(timeout=5))["body"].decode()
+
+    async def _next_event(self, communicator):
+        """Next data frame as (event, id, payload), skipping retry / heartbeats."""
+        while True:
+            chunk = await self._next_chunk(communicator)
+            if not chunk.startswith("id:"):
+                continue
+            fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+            return fields["event"], int(fields["id"]), json.loads(fields["data"])
+
+    @staticmethod
+    async def _disconnect(communicator):
+        await communicator.send_input({"type": "http.disconnect"})
+        await communicator.wait(timeout=5)
+
+    async def test_snapshot_then_delta(self):
+        client = await self._open()
+
+        event, first_id, payload = await self._next_event(client)
+        self.assertEqual(event, "snapshot")
+        self.assertEqual(payload["total_votes"], 0)
+        self.assertEqual(len(payload["options"]), 2)
+
+        await sync_to_async(self._vote)(self.rust)
+
+        event, second_id, payload = await self._next_event(client)
+        self.assertEqual(event, "delta")
+        self.assertGreater(second_id, first_id)
+        self.assertEqual(payload["total_votes"], 1)
+        self.assertEqual(payload["options"], [{"id": self.rust.id, "vote_count": 1}])
+        await self._disconnect(client)
+
+    async def test_resume_from_last_event_id_sends_only_changes(self):
+        first = await self._open()
+        _, first_id, _ = await self._next_event(first)
+
+        # The first connection keeps the stream (and its history) alive
+        await sync_to_async(self._vote)(self.python)
+        await self._next_event(first)
+
+        resumed = await self._open(headers=[(b"last-event-id", str(first_id).encode())])
+        event, _, payload = await self._next_event(resumed)
+        self.assertEqual(event, "delta")
+        self.assertEqual(payload["options"], [{"id": self.python.id, "vote_count": 1}])
+
+        await self._disconnect(resumed)
+        await self._disconnect(first)
+
+    async def test_heartbeat_when_quiet(self):
+        client = await self._open()
+        await self._next_event(client)
+
+        self.assertEqual(await self._next_chunk(client), ": heartbeat\n\n")
+        await self._disconnect(client)
+
+    async def test_one_upstream_subscription_per_poll(self):
+        a = await self._open()
+        b = await self._open()
+        await self._next_event(a)
+        await self._next_event(b)
+
+        stream = streams._streams[self.poll.id]
+        self.assertEqual(len(stream.listeners), 2)
+
+        await self._disconnect(a)
+        self.assertEqual(len(stream.listeners), 1)
+        await self._disconnect(b)
+        self.assertNotIn(self.poll.id, streams._streams)
+        self.assertTrue(stream.task.cancelled() or stream.task.done())
+
+    async def test_unknown_poll_is_404(self):
+        response = await self.async_client.get("/api/votes/results/999999/stream/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_hidden_polls_need_access(self):
+        def restrict():
+            member = User.objects.create_user(
+                username="member",
+                email="member@example.com",
+                password="member123",
+            )
+            outsider = User.objects.create_user(
+                username="outsider",
+                email="outsider@example.com",
+                password="outsider123",
+            )
+            self.poll.visibility = "restricted"
+            self.poll.save()
+            self.poll.allowed_users.add(member)
+            return str(AccessToken.for_user(member)), str(AccessToken.for_user(outsider))
+
+        member_token, outsider_token = await sync_to_async(restrict)()
+
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(self.url, {"token": outsider_token})
+        self.assertEqual(response.status_code, 403)
+
+        client = await self._open(query=f"token={member_token}".encode())
+        event, _, _ = await self._next_event(client)
+        self.assertEqual(event, "snapshot")
+        await self._disconnect(client)
+
+        client = await self._open(headers=[(b"authorization", f"Bearer {member_token}".encode())])
+        await self._next_event(client)
+        await self._disconnect(client)
+
+    async def test_streams_end_when_the_viewer_loses_access(self):
+        def restrict():
+            member = User.objects.create_user(
+                username="member",
+                email="member@example.com",
+                password="member123",
+            )
+            self.poll.visibility = "restricted"
+            self.poll.save()
+            self.poll.allowed_users.add(member)
+            return member, str(AccessToken.for_user(member))
+
+        member, token = await sync_to_async(restrict)()
+        client = await self._open(query=f"token={token}".encode())
+        await self._next_event(client)
+
+        await sync_to_async(self.poll.allowed_users.remove)(member)
+
+        # No more frames, just the end of the response
+        for _ in range(10):
+            message = await client.receive_output(timeout=5)
+            self.assertNotIn(b"id:", message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        else:
+            self.fail("The stream kept going")
+        await client.wait(timeout=5)
+        self.assertNotIn(self.poll.id, streams._streams)
+
+    def test_refused_under_wsgi(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 501)
+
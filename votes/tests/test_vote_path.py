@@ -0,0 +1,140 @@
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+
+from users.models import User
+from polls.models import Poll, Option
+from votes.models import Vote
+from votes.serializers import VoteSerializer
+
+
+class TestVoteQueries(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            visibility="restricted",
+        )
+        self.poll.allowed_users.add(self.voter)
+        self.option = Option.objects.create(poll=self.poll, text="Python")
+        self.other = Option.objects.create(poll=self.poll, text="Rust")
+
+    def test_vote_request_query_count(self):
+        self.client.force_authenticate(self.voter)
+
+        # Option + poll + allow-list check, INSERT ... RETURNING, two
+        # counter UPDATEs, and the savepoint around them
+        with self.assertNumQueries(6):
+            res = self.client.post("/api/votes/", {"option": self.option.pk})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(res.data["option"], self.option.pk)
+
+        vote = Vote.objects.get()
+        self.assertEqual(res.data["id"], vote.pk)
+        self.assertEqual(vote.poll_id, self.poll.pk)
+
+    def test_duplicate_is_reported_by_the_insert(self):
+        self.client.force_authenticate(self.voter)
+        self.client.post("/api/votes/", {"option": self.option.pk})
+
+        with self.assertNumQueries(5):
+            res = self.client.post("/api/votes/", {"option": self.other.pk})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["errors"]["non_field_errors"], ["You already voted."])
+
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.vote_count, 0)
+
+    def test_vote_racing_past_validation_is_rejected(self):
+        self.client.force_authenticate(self.voter)
+        validate = VoteSerializer.validate
+
+        def validate_then_lose_race(serializer, attrs):
+            attrs = validate(serializer, attrs)
+            # Another request commits its vote between the checks and the insert
+            Vote.objects.create(option=self.other, user=self.voter)
+            return attrs
+
+        with mock.patch.object(VoteSerializer, "validate", validate_then_lose_race):
+            res = self.client.post("/api/votes/", {"option": self.option.pk})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["errors"]["non_field_errors"], ["You already voted."])
+        self.assertEqual(list(Vote.objects.values_list("option_id", flat=True)), [self.other.pk])
+
+    def test_moving_a_vote_moves_its_poll(self):
+        vote = Vote.objects.create(option=self.option, user=self.voter)
+        elsewhere = Poll.objects.create(owner=self.owner, title="Editors")
+        vote.option = Option.objects.create(poll=elsewhere, text="Vim")
+        vote.save(update_fields=["option"])
+
+        vote.refresh_from_db()
+        self.assertEqual(vote.poll_id, elsewhere.pk)
+
+    def test_restricted_poll_rejects_users_not_allowed(self):
+        self.client.force_authenticate(self.owner)
+        res = self.client.post("/api/votes/", {"option": self.option.pk})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("You are not allowed to vote here.", str(res.data))
+
+
+class TestConcurrentDuplicateVotes(APITransactionTestCase):
+    # Real commits: each thread votes on its own connection
+
+    def test_parallel_duplicates_record_one_vote(self):
+        cache.clear()
+        owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        poll = Poll.objects.create(owner=owner, title="Race", allow_guest_votes=True)
+        options = [Option.objects.create(poll=poll, text=text) for text in "ABCD"]
+
+        workers = 8
+        barrier = threading.Barrier(workers)
+        codes = []
+
+        def vote(n):
+            try:
+                client = APIClient()
+                barrier.wait()
+                res = client.post(
+                    "/api/votes/",
+                    {"option": options[n % len(options)].pk},
+                    REMOTE_ADDR="10.0.0.1",
+                )
+                codes.append(res.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=vote, args=(n,)) for n in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(codes.count(status.HTTP_201_CREATED), 1, codes)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), workers - 1, codes)
+        self.assertEqual(Vote.objects.filter(poll=poll).count(), 1)
+
+        poll.refresh_from_db()
+        self.assertEqual(poll.total_votes, 1)
+        self.assertEqual(sum(o.vote_count for o in poll.options.all()), 1)
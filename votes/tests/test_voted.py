@@ -0,0 +1,125 @@
+from unittest import mock
+
+import fakeredis
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from polls.cache import poll_cache
+from polls.models import Poll, Option
+from votes import voted
+from votes.models import Vote
+
+
+@override_settings(VOTED_BACKFILL_BACKGROUND=False)
+class TestVotedSets(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        poll_cache.l1.clear()
+
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = mock.patch("core.redis._client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="owner123",
+        )
+        self.voter = User.objects.create_user(
+            username="voter",
+            email="voter@example.com",
+            password="voter123",
+        )
+        self.poll = Poll.objects.create(
+            owner=self.owner,
+            title="Favorite Language",
+            allow_guest_votes=True,
+        )
+        self.python = Option.objects.create(poll=self.poll, text="Python")
+        self.rust = Option.objects.create(poll=self.poll, text="Rust")
+
+    def vote(self, option, user=None, ip="10.0.0.1"):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/votes/", {"option": option.pk}, REMOTE_ADDR=ip)
+
+    def my_vote(self, user=None, ip="10.0.0.1"):
+        self.client.force_authenticate(user)
+        return self.client.get(f"/api/votes/me/{self.poll.pk}/", REMOTE_ADDR=ip).data["voted_option_id"]
+
+    def test_committed_votes_are_answered_from_the_set(self):
+        self.assertEqual(self.vote(self.python, self.voter).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.vote(self.rust, ip="10.0.0.1").status_code, status.HTTP_201_CREATED)
+
+        with mock.patch.object(voted, "_db_lookup") as db_lookup:
+            self.assertEqual(self.my_vote(self.voter), self.python.pk)
+            self.assertEqual(self.my_vote(ip="10.0.0.1"), self.rust.pk)
+        db_lookup.assert_not_called()
+
+        # Guest IPs are stored hashed
+        self.assertNotIn("10.0.0.1", str(self.redis.hgetall(f"votex:poll:{self.poll.pk}:voters")))
+
+    def test_lazy_backfill_from_the_database(self):
+        Vote.objects.create(option=self.rust, user=self.voter)
+        Vote.objects.create(option=self.python, guest_ip="10.0.0.9")
+
+        # First lookup misses, answers from the database and backfills the poll
+        self.assertEqual(self.my_vote(self.voter), self.rust.pk)
+
+        with mock.patch.object(voted, "_db_lookup") as db_lookup:
+            self.assertEqual(self.my_vote(ip="10.0.0.9"), self.python.pk)
+            self.assertIsNone(self.my_vote(ip="10.0.0.2"))
+        db_lookup.assert_not_called()
+
+    @override_settings(VOTED_BACKFILL_BACKGROUND=True)
+    def test_backfill_runs_off_the_request(self):
+        Vote.objects.create(option=self.rust, user=self.voter)
+
+        with mock.patch.object(voted, "_executor") as executor:
+            self.assertEqual(self.my_vote(self.voter), self.rust.pk)
+            # Later misses don't start a second backfill while one is pending
+            self.assertIsNone(self.my_vote(ip="10.0.0.9"))
+        executor.submit.assert_called_once_with(voted._run_backfill, self.poll.pk)
+
+        with mock.patch.object(voted, "close_old_connections"):
+            voted._run_backfill(self.poll.pk)
+        with mock.patch.object(voted, "_db_lookup") as db_lookup:
+            self.assertEqual(self.my_vote(self.voter), self.rust.pk)
+        db_lookup.assert_not_called()
+
+    def test_guests_without_an_address_never_count_as_voted(self):
+        self.assertEqual(self.vote(self.python, ip="").status_code, status.HTTP_201_CREATED)
+
+        self.assertIsNone(self.my_vote(ip=""))
+        self.assertEqual(self.redis.hkeys(f"votex:poll:{self.poll.pk}:voters"), [])
+        self.assertEqual(self.vote(self.rust, ip="").status_code, status.HTTP_201_CREATED)
+
+    def test_deleted_option_frees_its_voters(self):
+        self.vote(self.rust, self.voter)
+        self.rust.delete()
+
+        self.assertIsNone(self.my_vote(self.voter))
+        self.assertEqual(self.vote(self.python, self.voter).status_code, status.HTTP_201_CREATED)
+
+    def test_falls_back_to_the_database_when_redis_fails(self):
+        self.vote(self.python, self.voter)
+
+        with mock.patch.object(self.redis, "hmget", side_effect=OSError):
+            self.assertEqual(self.my_vote(self.voter), self.python.pk)
+
+    def test_database_allows_one_vote_per_poll(self):
+        Vote.objects.create(option=self.python, user=self.voter)
+        Vote.objects.create(option=self.python, guest_ip="10.0.0.1")
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(option=self.rust, user=self.voter)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(option=self.rust, guest_ip="10.0.0.1")
+
+        self.assertEqual(Vote.objects.get(user=self.voter).poll_id, self.poll.pk)
@@ -1,8 +1,18 @@
 from django.urls import path
-from .views import VoteCreateView, PollResultsView, UserVoteView
+from .views import (
+    VoteCreateView,
+    BulkVoteUploadView,
+    VoteReceiptView,
+    PollResultsView,
+    PollResultsStreamView,
+    UserVoteView,
+)
 
 urlpatterns = [
     path("", VoteCreateView.as_view(), name="vote-create"),
+    path("bulk/", BulkVoteUploadView.as_view(), name="vote-bulk"),
+    path("receipts/<str:receipt_id>/", VoteReceiptView.as_view(), name="vote-receipt"),
     path("results/<int:poll_id>/", PollResultsView.as_view(), name="poll-results"),
+    path("results/<int:poll_id>/stream/", PollResultsStreamView.as_view(), name="poll-results-stream"),
     path("me/<int:poll_id>/", UserVoteView.as_view(), name="user-vote"),  # NEW
 ]
@@ -1,25 +1,123 @@
-from rest_framework import generics, permissions
+import json
+
+import msgpack
+from channels.db import database_sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Count
 
-from polls.models import Poll
-from .models import Vote
-from .serializers import VoteSerializer
+from .serializers import VoteSerializer, VoteIngestSerializer
 from .serializers_results import PollResultsSerializer
+from .results import get_results, get_version
+from . import bulk, ingest, streams, voted
+from core import edge_cache
+from core.channels_auth import get_user_for_token
+from core.cache import STALE
+from core.etags import is_not_modified, make_etag, no_store, not_modified, set_validators
+from core.idempotency import IdempotentCreateMixin
+from core.parsers import (
+    JSONLinesParser,
+    JSONLinesAliasParser,
+    MessagePackParser,
+    MessagePackAliasParser,
+)
 from core.utils import get_client_ip
+from polls.access import can_view
+from polls.cache import get_poll_entry
 
 
 # ---------------------------------------------
 # CREATE VOTE  (/api/votes/)
 # ---------------------------------------------
-class VoteCreateView(generics.CreateAPIView):
+class VoteCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = VoteSerializer
 
     def get_permissions(self):
         # Guests and authenticated users allowed (handled in serializer)
         return [permissions.AllowAny()]
 
+    def create(self, request, *args, **kwargs):
+        if not ingest.ingest_enabled():
+            return super().create(request, *args, **kwargs)
+
+        # Async ingestion: queue the vote, persist it in a later batch
+        serializer = VoteIngestSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        receipt_id = serializer.enqueue()
+        if receipt_id is None:
+            # Queue unavailable: vote synchronously instead
+            return super().create(request, *args, **kwargs)
+
+        return Response(
+            {"receipt": receipt_id, "status": ingest.QUEUED},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+# ---------------------------------------------
+# BULK VOTE UPLOAD  (/api/votes/bulk/)
+# ---------------------------------------------
+class BulkVoteUploadView(APIView):
+    """
+    Votes collected offline, streamed as JSON lines
+    (application/x-ndjson) or concatenated msgpack objects
+    (application/msgpack), one guest vote per item:
+        {"option": 12, "guest_ip": "10.0.0.5", "ref": "kiosk-3/0001"}
+        {"option": 12, "guest_ip": "10.0.0.6"}
+
+    Answers 200 with one result per item, in the request's format,
+    streamed as chunks are persisted (see votes.bulk):
+        {"index": 0, "ref": "kiosk-3/0001", "status": "persisted"}
+        {"index": 1, "status": "rejected", "detail": "Guest voting disabled."}
+        {"summary": {"persisted": 1, "rejected": 1}}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [
+        JSONLinesParser,
+        JSONLinesAliasParser,
+        MessagePackParser,
+        MessagePackAliasParser,
+    ]
+
+    def post(self, request):
+        items = request.data
+        results = bulk.process(items, request.user)
+
+        if request.content_type.startswith(("application/msgpack", "application/x-msgpack")):
+            body = (msgpack.packb(result) for result in results)
+            content_type = "application/msgpack"
+        else:
+            body = (json.dumps(result).encode() + b"\n" for result in results)
+            content_type = "application/x-ndjson"
+
+        return StreamingHttpResponse(body, content_type=content_type)
+
+
+# ---------------------------------------------
+# VOTE RECEIPT  (/api/votes/receipts/<receipt_id>/)
+# ---------------------------------------------
+class VoteReceiptView(APIView):
+    """
+    Status of a vote queued by async ingestion:
+    {
+        "receipt": "3f2c...",
+        "status": "queued" | "persisted" | "rejected",
+        "poll": 4,
+        "option": 12,
+        "detail": "You already voted."   # rejected only
+    }
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, receipt_id):
+        receipt = ingest.get_receipt(receipt_id)
+        if receipt is None:
+            raise Http404("Unknown or expired receipt.")
+        return Response({"receipt": receipt_id, **receipt})
+
 
 # ---------------------------------------------
 # POLL RESULTS  (/api/votes/results/<poll_id>/)
@@ -29,30 +127,92 @@ class PollResultsView(generics.GenericAPIView):
     serializer_class = PollResultsSerializer
 
     def get(self, request, poll_id):
-        poll = (
-            Poll.objects
-            .select_related("owner")
-            .prefetch_related("options")
-            .get(pk=poll_id)
-        )
+        # Unknown polls 404 before anything is cached for them
+        entry = get_poll_entry(poll_id)
+
+        # Cached per poll + version (bumped on every vote and poll change),
+        # which is also the ETag. No version (cache unreachable): no ETag
+        version = get_version(poll_id)
+        etag = None if version is None else make_etag("results", poll_id, version)
+        if is_not_modified(request, etag):
+            response = not_modified(request, etag)
+        else:
+            data, cache_status = get_results(poll_id, version=version)
 
-        # Count votes per option
-        options = poll.options.annotate(
-            vote_count=Count("votes")
-        ).values("id", "text", "vote_count")
+            serializer = self.get_serializer(data)
+            response = Response(serializer.data)
+            response["X-Cache"] = cache_status.upper()
+            set_validators(response, request, None if cache_status == STALE else etag)
 
-        total_votes = Vote.objects.filter(option__poll=poll).count()
+        if etag is None:
+            return no_store(response)
+        # Results don't depend on the caller: public polls' are shareable
+        if entry["visibility"] == "public":
+            edge_cache.share(response, [edge_cache.poll_key(poll_id)])
+        return response
 
-        data = {
-            "poll_id": poll.id,
-            "title": poll.title,
-            "description": poll.description or "",
-            "total_votes": total_votes,
-            "options": list(options),
-        }
 
-        serializer = self.get_serializer(data)
-        return Response(serializer.data)
+# ---------------------------------------------
+# POLL RESULTS STREAM  (/api/votes/results/<poll_id>/stream/)
+# ---------------------------------------------
+class PollResultsStreamView(View):
+    """
+    Server-Sent Events feed of a poll's results (see votes.streams).
+    Resumes from the Last-Event-ID header, or ?last_event_id= for
+    clients that can't set it.
+
+    Same visibility rules as the WebSocket feed. The viewer is
+    authenticated by a Bearer token, or ?token=<access token> since
+    EventSource can't set headers, else by the session.
+    """
+
+    async def get(self, request, poll_id):
+        # Under WSGI the stream would pin a worker thread per client
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"detail": "Results streaming is only served by the ASGI app."},
+                status=501,
+            )
+
+        try:
+            entry = await database_sync_to_async(get_poll_entry)(poll_id)
+        except Http404:
+            return JsonResponse({"detail": "Poll not found."}, status=404)
+
+        viewer = await self._viewer(request)
+        if not await database_sync_to_async(can_view)(entry, viewer):
+            return JsonResponse({"detail": "You cannot view this poll."}, status=403)
+
+        try:
+            # Also warms the results cache for the stream's first read
+            await database_sync_to_async(get_results)(poll_id)
+        except Http404:
+            return JsonResponse({"detail": "Poll not found."}, status=404)
+
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        response = StreamingHttpResponse(
+            streams.event_stream(poll_id, last_event_id, viewer),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Don't let nginx-style proxies buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    async def _viewer(request):
+        token = request.GET.get("token")
+        scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+        if scheme == "Bearer" and credentials:
+            token = credentials
+        if token:
+            return await get_user_for_token(token)
+        return await request.auser()
 
 
 # ---------------------------------------------
@@ -69,23 +229,11 @@ class UserVoteView(APIView):
 
     def get(self, request, poll_id):
         user = request.user
-        ip = get_client_ip(request)
 
-        # Logged-in user
+        # Answered from the poll's voted set when Redis is configured
         if user.is_authenticated:
-            vote = Vote.objects.filter(
-                user=user,
-                option__poll_id=poll_id
-            ).first()
-
-        # Guest user
+            option_id = voted.voted_option(poll_id, user_id=user.id)
         else:
-            vote = Vote.objects.filter(
-                guest_ip=ip,
-                option__poll_id=poll_id
-            ).first()
-
-        if not vote:
-            return Response({"voted_option_id": None})
+            option_id = voted.voted_option(poll_id, guest_ip=get_client_ip(request))
 
-        return Response({"voted_option_id": vote.option.id})
+        return Response({"voted_option_id": option_id})
@@ -0,0 +1,184 @@
+"""
+"Already voted" sets: who voted on which poll, kept in Redis.
+
+One hash per poll maps each voter to the option they picked: "u:<user id>"
+for users, "g:<keyed hash of the IP>" for guests, so raw IPs never reach
+Redis. Votes are added once their transaction commits. A miss on a poll
+whose hash isn't complete yet is answered by the database, and starts a
+backfill of the hash (one per poll at a time, across processes) that
+loads it in chunks from a background thread (VOTED_BACKFILL_BACKGROUND)
+and then marks it complete.
+
+Guests without a resolvable IP can't be told apart, and the database
+takes any number of their votes (the unique index skips NULL IPs): they
+are never looked up or stored, and always count as not having voted.
+
+Without Redis, or while it is failing, every lookup goes to the database.
+A write lost to a Redis blip can leave a complete hash without a voter
+for up to VOTED_SET_TTL; the Vote unique constraints stay the final guard.
+"""
+import hashlib
+import hmac
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from core.redis import get_redis, guarded
+from .models import Vote
+
+logger = logging.getLogger(__name__)
+
+LOADED_FIELD = "_loaded"
+BACKFILL_CHUNK = 5000
+# Refreshed after every chunk: a backfill that dies frees its poll quickly
+BACKFILL_LOCK_TTL = 60
+
+_MISS = object()
+
+
+def _key(poll_id):
+    return f"votex:poll:{poll_id}:voters"
+
+
+def _backfill_lock_key(poll_id):
+    return f"votex:poll:{poll_id}:voters-backfill"
+
+
+def voter_field(user_id=None, guest_ip=None):
+    if user_id is not None:
+        return f"u:{user_id}"
+    digest = hmac.new(settings.SECRET_KEY.encode(), str(guest_ip).encode(), hashlib.sha256)
+    return f"g:{digest.hexdigest()[:24]}"
+
+
+# ---------------------------------------------
+# LOOKUPS
+# ---------------------------------------------
+def _db_lookup(poll_id, user_id, guest_ip):
+    votes = Vote.objects.filter(poll_id=poll_id)
+    if user_id is not None:
+        votes = votes.filter(user_id=user_id)
+    else:
+        # Matches the partial unique index on (poll, guest_ip)
+        votes = votes.filter(user__isnull=True, guest_ip=guest_ip)
+    return votes.values_list("option_id", flat=True).first()
+
+
+def _redis_lookup(poll_id, field):
+    option_id, loaded = get_redis().hmget(_key(poll_id), field, LOADED_FIELD)
+    if option_id is not None:
+        return int(option_id)
+    if loaded is not None:
+        return None  # complete hash: never voted
+    return _MISS
+
+
+def voted_option(poll_id, user_id=None, guest_ip=None):
+    """ID of the option the user (or guest IP) voted for on poll_id, or None."""
+    if user_id is None and guest_ip is None:
+        return None
+    if get_redis() is not None:
+        found = guarded(_redis_lookup, poll_id, voter_field(user_id, guest_ip), fallback=_MISS)
+        if found is not _MISS:
+            return found
+        guarded(_start_backfill, poll_id)
+
+    return _db_lookup(poll_id, user_id, guest_ip)
+
+
+# ---------------------------------------------
+# WRITES
+# ---------------------------------------------
+def _write(entries):
+    pipe = get_redis().pipeline(transaction=False)
+    polls = set()
+    for poll_id, option_id, user_id, guest_ip in entries:
+        if user_id is None and guest_ip is None:
+            continue
+        pipe.hset(_key(poll_id), voter_field(user_id, guest_ip), option_id)
+        polls.add(poll_id)
+    for poll_id in polls:
+        pipe.expire(_key(poll_id), settings.VOTED_SET_TTL)
+    pipe.execute()
+
+
+def record(poll_id, option_id, user_id=None, guest_ip=None):
+    """Add a committed vote. Call from transaction.on_commit."""
+    record_many([(poll_id, option_id, user_id, guest_ip)])
+
+
+def record_many(entries):
+    """Add committed votes, given as (poll_id, option_id, user_id, guest_ip)."""
+    if entries and get_redis() is not None:
+        guarded(_write, entries)
+
+
+def forget(poll_id):
+    """Drop a poll's hash (votes deleted); the next lookup backfills it."""
+    if get_redis() is not None:
+        guarded(lambda: get_redis().delete(_key(poll_id)))
+
+
+# ---------------------------------------------
+# BACKFILL
+# ---------------------------------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _start_backfill(poll_id):
+    global _executor
+
+    # One backfill per poll at a time; the others use the database meanwhile
+    if not get_redis().set(_backfill_lock_key(poll_id), 1, nx=True, ex=BACKFILL_LOCK_TTL):
+        return
+    if not settings.VOTED_BACKFILL_BACKGROUND:
+        _backfill(poll_id)
+        return
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voted-backfill")
+    _executor.submit(_run_backfill, poll_id)
+
+
+def _run_backfill(poll_id):
+    try:
+        guarded(_backfill, poll_id)
+    except Exception:
+        # Lookups keep using the database; the next miss retries
+        logger.exception("Backfill of the voted set of poll %s failed", poll_id)
+    finally:
+        close_old_connections()
+
+
+def _backfill(poll_id):
+    """Load poll_id's hash from the database. Holds the backfill lock."""
+    r = get_redis()
+    lock = _backfill_lock_key(poll_id)
+    try:
+        # Votes committing meanwhile are added by their own on-commit write
+        rows = (
+            Vote.objects.filter(poll_id=poll_id)
+            .values_list("option_id", "user_id", "guest_ip")
+            .iterator(chunk_size=BACKFILL_CHUNK)
+        )
+        chunk = []
+        for option_id, user_id, guest_ip in rows:
+            chunk.append((poll_id, option_id, user_id, guest_ip))
+            if len(chunk) >= BACKFILL_CHUNK:
+                _write(chunk)
+                r.expire(lock, BACKFILL_LOCK_TTL)
+                chunk = []
+        if chunk:
+            _write(chunk)
+
+        pipe = r.pipeline(transaction=False)
+        pipe.hset(_key(poll_id), LOADED_FIELD, 1)
+        pipe.expire(_key(poll_id), settings.VOTED_SET_TTL)
+        pipe.execute()
+    finally:
+        r.delete(lock)